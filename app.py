@@ -1,9 +1,14 @@
 import streamlit as st
 from auth.authentication import authenticator
 from database.models import db
-from database.operations import db_ops
+from database.operations import db_ops, epoch_day, task_cursor
+from database.transfer import export_table, import_table, format_for
+from database.writer import write_queue
 from utils.sentiment_analyzer import text_analyzer
 from utils.visualizations import viz
+import io
+import os
+import sqlite3
 import time
 # Add this with your other imports at the top of app.py
 import plotly.express as px
@@ -20,6 +25,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Load VADER/TextBlob in the background while the login page renders
+text_analyzer.warm_up()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -71,6 +79,23 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# "Live updates" hold a script thread per session while they poll, so they are
+# off unless enabled, and each run polls for at most LIVE_MAX_SECONDS
+LIVE_UPDATES = os.environ.get('TEAM_OPTIMIZER_LIVE_UPDATES', '0') == '1'
+LIVE_MAX_SECONDS = float(os.environ.get('TEAM_OPTIMIZER_LIVE_MAX_SECONDS', '300'))
+
+# Seconds between change checks while live updates are on
+LIVE_POLL_SECONDS = 3
+
+# Tasks fetched per "Load more" click in the Task Manager
+TASK_PAGE_SIZE = 25
+
+# Weeks of completions behind the Productivity tab's flow metrics
+FLOW_WEEKS = 12
+
+# Settings > Account data export/import: label -> table
+TRANSFER_DATASETS = {"Tasks": "tasks", "Mood history": "mood_entries", "Profile": "users"}
+
 def main():
     # Initialize session state
     if 'authenticated' not in st.session_state:
@@ -118,14 +143,20 @@ def show_main_app():
         
         st.markdown("---")
         
-        # Quick stats from database
+        # Quick stats from database (one round trip, shared with the dashboard)
         user_id = st.session_state.user['id']
         team_id = st.session_state.user['team_id']
-        
         if team_id:
-            team_stats = db_ops.get_team_stats(team_id)
-            task_stats = db_ops.get_task_stats(user_id)
-            today_mood = db_ops.get_today_mood_stats(user_id)
+            detailed = page == "Dashboard"
+            snapshot, _ = load_if_changed(
+                'dashboard_snapshot',
+                (user_id, team_id, detailed, epoch_day()),
+                team_id,
+                lambda: db_ops.get_dashboard_snapshot(user_id, team_id, detailed=detailed)
+            )
+            team_stats = snapshot.team_stats
+            task_stats = snapshot.task_stats
+            today_mood = snapshot.today_mood
             
             st.subheader("Quick Stats")
             col1, col2 = st.columns(2)
@@ -157,6 +188,56 @@ def show_main_app():
     elif page == "Settings":
         show_settings()
 
+def load_if_changed(name, params, team_id, loader):
+    """Reuse this session's last result until the team's change counter moves.
+    
+    Returns (value, version) so callers can watch for the next change.
+    """
+    version = db.team_version(team_id)
+    cached = st.session_state.get(name)
+    if cached and cached[0] == (params, version):
+        return cached[1], version
+    
+    value = loader()
+    st.session_state[name] = ((params, version), value)
+    return value, version
+
+def load_task_pages(name, params, team_id, fetch_page):
+    """Task pages loaded so far in this session, starting over when the team changes.
+    
+    fetch_page(after) returns one page of TASK_PAGE_SIZE tasks. Users without
+    a team have no change counter, so their list is re-read on every run.
+    """
+    version = db.team_version(team_id) if team_id else None
+    state = st.session_state.get(name)
+    if not state or state['key'] != (params, version) or version is None:
+        tasks = fetch_page(None)
+        state = {'key': (params, version), 'tasks': tasks, 'more': len(tasks) == TASK_PAGE_SIZE}
+        st.session_state[name] = state
+    return state, version
+
+def load_more_button(name, fetch_page):
+    """Fetch the next keyset page into the session's task list"""
+    state = st.session_state[name]
+    if state['more'] and st.button("⬇️ Load more", key=f"{name}_more"):
+        tasks = fetch_page(task_cursor(state['tasks'][-1]))
+        state['tasks'].extend(tasks)
+        state['more'] = len(tasks) == TASK_PAGE_SIZE
+        st.rerun()
+
+def watch_team_changes(team_id, version):
+    """Poll cheaply and rerun the page once the team changes, for at most
+    LIVE_MAX_SECONDS; after that the page stays as is until the next interaction"""
+    status = st.empty()
+    deadline = time.monotonic() + LIVE_MAX_SECONDS
+    while time.monotonic() < deadline:
+        status.caption(f"🔴 Live · last checked {datetime.now().strftime('%H:%M:%S')}")
+        time.sleep(LIVE_POLL_SECONDS)
+        if db.has_team_changed(team_id, version):
+            st.rerun()
+    status.caption(f"⏸️ Live updates paused at {datetime.now().strftime('%H:%M:%S')} · "
+                   "interact with the page to resume")
+
 def show_dashboard():
     """Dashboard with real data"""
     st.title("📊 Dashboard")
@@ -168,11 +249,18 @@ def show_dashboard():
         st.warning("You are not part of a team yet. Please ask your admin to add you.")
         return
     
-    # Get data from database
-    team_stats = db_ops.get_team_stats(team_id)
-    task_stats = db_ops.get_task_stats(user_id)
-    today_mood = db_ops.get_today_mood_stats(user_id)
-    team_mood_summary = db_ops.get_team_mood_summary(team_id)
+    # Get data from database (reused from the sidebar unless the team changed)
+    snapshot, version = load_if_changed(
+        'dashboard_snapshot',
+        (user_id, team_id, True, epoch_day()),
+        team_id,
+        lambda: db_ops.get_dashboard_snapshot(user_id, team_id)
+    )
+    
+    team_stats = snapshot.team_stats
+    task_stats = snapshot.task_stats
+    today_mood = snapshot.today_mood
+    team_mood_summary = snapshot.team_mood_summary
     
     # Row 1: Key Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -238,10 +326,10 @@ def show_dashboard():
     with col2:
         st.subheader("Active Tasks")
         
-        user_tasks = db_ops.get_user_tasks(user_id)
+        user_tasks = snapshot.active_tasks
         
         if user_tasks:
-            for task in user_tasks[:5]:  # Show only 5 tasks
+            for task in user_tasks:  # Snapshot holds only the top 5 tasks
                 task_class = "task-card"
                 if task['priority'] == 'urgent':
                     task_class += " urgent-task"
@@ -278,13 +366,17 @@ def show_dashboard():
     st.markdown("---")
     st.subheader("Your Mood Trends")
     
-    mood_history = db_ops.get_user_mood_history(user_id, days=7)
+    mood_history = snapshot.mood_history
     
     if not mood_history.empty:
         fig = viz.create_mood_trend_chart(mood_history)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No mood history yet. Start tracking your mood!")
+    
+    if LIVE_UPDATES and st.toggle("Live updates", key="dashboard_live",
+                                  help="Refresh automatically when teammates log moods or move tasks"):
+        watch_team_changes(team_id, version)
 
 def show_mood_tracker():
     """Enhanced Mood Tracker with Computer Vision"""
@@ -416,7 +508,8 @@ def show_combined_analysis(user_id):
                     text_input=mood_text if mood_text.strip() else None,
                     image_file=image_file,
                     manual_mood=manual_mood if manual_mood != 7 else None,
-                    manual_stress=manual_stress if manual_stress != 5 else None
+                    manual_stress=manual_stress if manual_stress != 5 else None,
+                    team_id=st.session_state.user['team_id']
                 )
                 
                 # Save to database
@@ -453,14 +546,9 @@ def show_text_analysis(user_id):
             st.error("Please describe your feelings")
         else:
             with st.spinner("Analyzing text sentiment..."):
-                # Analyze text
-                text_result = text_analyzer.analyze_sentiment(mood_text)
-                
-                # Calculate stress
-                calculated_stress = text_analyzer.calculate_stress_level(
-                    mood_text, 
-                    text_result['score']
-                )
+                # Analyze text and calculate stress in one pass
+                text_result = text_analyzer.analyze(mood_text, team_id=st.session_state.user['team_id'])
+                calculated_stress = text_result['stress']
                 
                 # Use manual or calculated values
                 final_mood = manual_mood if manual_mood != 7 else text_result['score']
@@ -556,10 +644,20 @@ def analyze_and_save_visual(user_id, image_file):
             else:
                 st.error(f"Analysis failed: {result.get('error', 'Unknown error')}")
 
+def flash(message):
+    """Success message to show after the st.rerun() that follows a write"""
+    st.session_state['flash'] = message
+
+def show_flash():
+    message = st.session_state.pop('flash', None)
+    if message:
+        st.success(message)
+
 def show_quick_check(user_id):
     """Quick mood check without detailed analysis"""
     st.subheader("⚡ Quick Mood Check")
     st.write("Quickly log your mood without detailed analysis")
+    show_flash()
     
     quick_moods = [
         ("😊 Excellent", 9, 2, "#06D6A0"),
@@ -574,13 +672,14 @@ def show_quick_check(user_id):
         with cols[idx]:
             if st.button(label, use_container_width=True, 
                         help=f"Mood: {mood}/10, Stress: {stress}/10"):
-                db_ops.create_mood_entry(
+                write_queue.write(
+                    db_ops.create_mood_entry,
                     user_id=user_id,
                     text_entry=f"Quick check: {label}",
                     text_sentiment=mood,
                     stress_level=stress
                 )
-                st.success(f"{label} mood saved!")
+                flash(f"{label} mood saved!")
                 st.rerun()
     
     # Custom quick entry
@@ -594,13 +693,14 @@ def show_quick_check(user_id):
         note = st.text_input("Quick note (optional)", placeholder="Brief note...")
         
         if st.button("Save Quick Entry"):
-            db_ops.create_mood_entry(
+            write_queue.write(
+                db_ops.create_mood_entry,
                 user_id=user_id,
                 text_entry=note if note else "Quick mood entry",
                 text_sentiment=custom_mood,
                 stress_level=custom_stress
             )
-            st.success("Quick entry saved!")
+            flash("Quick entry saved!")
             st.rerun()
 
 def show_mood_history(user_id):
@@ -617,6 +717,12 @@ def show_mood_history(user_id):
         if st.button("Refresh", use_container_width=True):
             st.rerun()
     
+    # Full-text search over the notes written with each entry
+    query = st.text_input("🔍 Search your notes", key="mood_search",
+                          placeholder="e.g. deadline, tired, meeting")
+    if query:
+        show_search_results(db_ops.search(query, user_id=user_id, kinds=('mood',)))
+    
     # Get history
     history = db_ops.get_user_mood_history(user_id, days)
     
@@ -668,6 +774,23 @@ def show_mood_history(user_id):
     else:
         st.info("No mood history found. Start tracking your mood!")
 
+def show_search_results(results):
+    """List search hits with their highlighted snippets, best match first"""
+    if not results:
+        st.info("No matches found.")
+        return
+    
+    for result in results:
+        if result['kind'] == 'mood':
+            st.markdown(f"📝 **{result['created_at'][:10]}** · mood {result['combined_score'] or 0:.1f}/10 "
+                        f"— {result['snippet']}")
+        else:
+            assignee = f" · {result['assigned_name']}" if result['assigned_name'] else ''
+            status = result['status'].replace('_', ' ').title()
+            st.markdown(f"📋 **{result['title']}** ({status}{assignee})")
+            if result['snippet']:
+                st.caption(result['snippet'])
+
 def show_combined_results(combined_result, entry_id):
     """Display combined analysis results"""
     st.success(f"✅ Mood entry #{entry_id} saved successfully!")
@@ -748,10 +871,20 @@ def show_emotion_chart(emotions):
 def show_task_manager():
     """Complete Task Manager with CRUD Operations"""
     st.title("📋 Task Manager")
+    show_flash()
     
     user_id = st.session_state.user['id']
     team_id = st.session_state.user['team_id']
     
+    # Searches the team's tasks, or your own without a team
+    query = st.text_input("🔍 Search tasks", key="task_search",
+                          placeholder="Words from a task title or description")
+    if query:
+        if team_id:
+            show_search_results(db_ops.search(query, team_id=team_id, kinds=('task',)))
+        else:
+            show_search_results(db_ops.search(query, user_id=user_id, kinds=('task',)))
+    
     # Tabs for different views
     tab1, tab2, tab3 = st.tabs(["My Tasks", "Team Tasks", "Create Task"])
     
@@ -765,11 +898,17 @@ def show_task_manager():
             key="my_tasks_filter"
         )
         
-        # Get user tasks
-        tasks = db_ops.get_user_tasks(
-            user_id, 
-            status_filter if status_filter != "All" else None
-        )
+        # Get user tasks, one page at a time
+        def fetch_my_tasks(after):
+            return db_ops.get_user_tasks(
+                user_id,
+                status_filter if status_filter != "All" else None,
+                page_size=TASK_PAGE_SIZE,
+                after=after
+            )
+        
+        my_tasks, _ = load_task_pages('my_tasks', (user_id, status_filter), team_id, fetch_my_tasks)
+        tasks = my_tasks['tasks']
         
         if tasks:
             for task in tasks:
@@ -844,27 +983,26 @@ def show_task_manager():
                 with action_cols[0]:
                     if task['status'] != 'completed':
                         if st.button("✅ Complete", key=f"complete_{task['id']}"):
-                            db_ops.update_task_status(task['id'], 'completed')
-                            st.success("Task marked as completed!")
-                            time.sleep(1)
+                            write_queue.write(db_ops.update_task_status, task['id'], 'completed')
+                            flash("Task marked as completed!")
                             st.rerun()
                 
                 with action_cols[1]:
                     if task['status'] != 'in_progress':
                         if st.button("▶️ Start", key=f"start_{task['id']}"):
-                            db_ops.update_task_status(task['id'], 'in_progress')
-                            st.success("Task marked as in progress!")
-                            time.sleep(1)
+                            write_queue.write(db_ops.update_task_status, task['id'], 'in_progress')
+                            flash("Task marked as in progress!")
                             st.rerun()
                 
                 with action_cols[2]:
                     if st.button("🗑️ Delete", key=f"delete_{task['id']}"):
-                        db_ops.delete_task(task['id'])
-                        st.success("Task deleted!")
-                        time.sleep(1)
+                        write_queue.write(db_ops.delete_task, task['id'])
+                        flash("Task deleted!")
                         st.rerun()
                 
                 st.markdown('</div>', unsafe_allow_html=True)
+            
+            load_more_button('my_tasks', fetch_my_tasks)
         else:
             st.info("No tasks found. Create your first task!")
     
@@ -872,7 +1010,15 @@ def show_task_manager():
         st.subheader("Team Tasks")
         
         if team_id:
-            team_tasks = db_ops.get_team_tasks(team_id)
+            live_team_tasks = LIVE_UPDATES and st.toggle("Live updates", key="team_tasks_live",
+                                                         help="Refresh automatically when teammates move tasks")
+            def fetch_team_tasks(after):
+                return db_ops.get_team_tasks(team_id, page_size=TASK_PAGE_SIZE, after=after)
+            
+            team_pages, team_tasks_version = load_task_pages(
+                'team_tasks', team_id, team_id, fetch_team_tasks
+            )
+            team_tasks = team_pages['tasks']
             
             if team_tasks:
                 # Group by status
@@ -912,6 +1058,8 @@ def show_task_manager():
                                           unsafe_allow_html=True)
                             
                             st.markdown('</div>', unsafe_allow_html=True)
+                
+                load_more_button('team_tasks', fetch_team_tasks)
             else:
                 st.info("No team tasks found.")
         else:
@@ -950,6 +1098,10 @@ def show_task_manager():
                     
                     st.success(f"Task '{title}' created successfully!")
                     st.balloons()
+    
+    # Runs after every tab has rendered, since it blocks until the team changes
+    if team_id and live_team_tasks:
+        watch_team_changes(team_id, team_tasks_version)
 
 def show_team_info():
     """Team Information Page"""
@@ -1032,7 +1184,6 @@ def show_team_info():
         st.subheader("Recent Team Activity")
         
         # Get recent mood entries
-        conn = db.get_connection()
         query = '''
         SELECT u.username, me.text_entry, me.combined_score, me.created_at
         FROM mood_entries me
@@ -1043,8 +1194,8 @@ def show_team_info():
         '''
         
         import pandas as pd
-        recent_activity = pd.read_sql_query(query, conn, params=(team_id,))
-        conn.close()
+        with db.connection() as conn:
+            recent_activity = pd.read_sql_query(query, conn, params=(team_id,))
         
         if not recent_activity.empty:
             for _, row in recent_activity.iterrows():
@@ -1070,6 +1221,10 @@ def show_team_management():
     
 def show_analytics():
     """Analytics Page"""
+    # pyarrow and DuckDB cost about half a second to import; only this page needs them
+    from database.snapshots import snapshots
+    from database.analytics import get_engine, can_query_snapshots, ROLLING_WINDOW_DAYS
+    
     st.title("📈 Analytics")
     
     user_id = st.session_state.user['id']
@@ -1079,6 +1234,18 @@ def show_analytics():
         st.warning("Analytics are available only for team members.")
         return
     
+    # Columnar snapshots (python -m database.manage snapshot) spare SQLite
+    # the org-wide scans, at the cost of lagging behind until the next export
+    use_snapshot = False
+    if snapshots.available() and can_query_snapshots():
+        source = st.radio("Data source", ["Live database", "Snapshot"], horizontal=True,
+                          help="Snapshots are exported with `python -m database.manage snapshot`")
+        use_snapshot = source == "Snapshot"
+    
+    engine = get_engine(snapshots if use_snapshot else None)
+    st.caption(f"Aggregations run on {engine.name}"
+               + (f" over the snapshot exported {snapshots.exported_at()}" if use_snapshot else ""))
+    
     # Tabs for different analytics
     tab1, tab2, tab3 = st.tabs(["Mood Analytics", "Productivity", "Team Insights"])
     
@@ -1086,39 +1253,41 @@ def show_analytics():
         st.subheader("Mood Analytics")
         
         # Get mood history
-        mood_history = db_ops.get_user_mood_history(user_id, days=30)
+        mood_history = engine.daily_moods(user_id, days=30)
         
         if not mood_history.empty:
-            col1, col2 = st.columns(2)
+            mood_stats = engine.mood_stats(user_id, days=30)
+            col1, col2, col3 = st.columns(3)
             
             with col1:
-                avg_mood = mood_history['avg_mood'].mean()
-                st.metric("30-Day Avg Mood", f"{avg_mood:.1f}/10")
+                st.metric("30-Day Avg Mood", f"{mood_stats['mean']:.1f}/10")
             
             with col2:
-                mood_std = mood_history['avg_mood'].std()
+                mood_std = mood_stats['std'] or 0
                 stability = "High" if mood_std < 1.5 else "Medium" if mood_std < 2.5 else "Low"
                 st.metric("Mood Stability", stability, 
                          f"Std: {mood_std:.2f}")
             
+            with col3:
+                st.metric("Median Day", f"{mood_stats['p50']:.1f}/10",
+                         f"P10–P90: {mood_stats['p10']:.1f}–{mood_stats['p90']:.1f}", delta_color="off")
+            
             # Mood trend chart using our viz module
             fig = viz.create_mood_trend_chart(mood_history)
             st.plotly_chart(fig, use_container_width=True)
             
+            st.caption(f"{ROLLING_WINDOW_DAYS}-day rolling average")
+            st.line_chart(mood_history.set_index('date')[['avg_mood', 'rolling_mood']].sort_index())
+            
             # Mood distribution using Plotly Graph Objects instead of Plotly Express
             st.subheader("Mood Distribution")
             
             # Create histogram with Plotly Graph Objects
             import plotly.graph_objects as go
             
-            # Create bins
+            # Days per 1-point bucket of the daily average
             bins = list(range(1, 12))  # 1 to 11 for 1-10 scale
-            hist_data = []
-            
-            for i in range(len(bins)-1):
-                count = ((mood_history['avg_mood'] >= bins[i]) & 
-                        (mood_history['avg_mood'] < bins[i+1])).sum()
-                hist_data.append(count)
+            hist_data = engine.mood_histogram(user_id, days=30)
             
             # Create x labels (ranges)
             x_labels = [f"{bins[i]}-{bins[i+1]}" for i in range(len(bins)-1)]
@@ -1149,22 +1318,35 @@ def show_analytics():
         task_stats = db_ops.get_task_stats(user_id)
         
         if task_stats['total'] > 0:
-            col1, col2, col3 = st.columns(3)
+            # Read from weekly completion sums kept by the task_events triggers
+            flow = db_ops.get_task_flow(user_id, weeks=FLOW_WEEKS)
+            
+            col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 completion_rate = task_stats['completion_rate']
                 st.metric("Completion Rate", f"{completion_rate}%")
             
             with col2:
-                # Calculate average days to complete (placeholder)
-                avg_days = 2.5
-                st.metric("Avg Time to Complete", f"{avg_days} days")
+                cycle = flow['avg_cycle_days']
+                st.metric("Avg Cycle Time", f"{cycle} days" if cycle is not None else "—",
+                          help="From first start to completion")
             
             with col3:
-                # Calculate on-time completion
-                total_completed = task_stats['completed']
-                on_time_rate = 85  # Placeholder
-                st.metric("On-Time Rate", f"{on_time_rate}%")
+                lead = flow['avg_lead_days']
+                st.metric("Avg Lead Time", f"{lead} days" if lead is not None else "—",
+                          help="From creation to completion")
+            
+            with col4:
+                on_time = flow['on_time_rate']
+                st.metric("On-Time Rate", f"{on_time}%" if on_time is not None else "—",
+                          help="Completions with a deadline that were done by it")
+            
+            st.caption(f"Cycle, lead and on-time figures cover the {flow['completed']} task(s) "
+                       f"completed in the last {FLOW_WEEKS} weeks")
+            
+            st.subheader("Weekly Throughput")
+            st.bar_chart(flow['throughput'].set_index('week')['completed'])
             
             # Task completion chart
             fig = viz.create_task_completion_chart(task_stats)
@@ -1199,7 +1381,7 @@ def show_analytics():
         st.subheader("Team Insights")
         
         team_stats = db_ops.get_team_stats(team_id)
-        team_mood_summary = db_ops.get_team_mood_summary(team_id)
+        team_mood_summary = engine.member_summaries(team_id)
         
         if team_mood_summary:
             # Team overview metrics
@@ -1227,6 +1409,8 @@ def show_analytics():
                     "Member": member['username'],
                     "Avg Mood": f"{member['avg_mood']:.1f}",
                     "Avg Stress": f"{member['avg_stress']:.1f}",
+                    "Median Day Mood": f"{member['median_mood']:.1f}" if member['median_mood'] is not None else "-",
+                    "P90 Day Stress": f"{member['p90_stress']:.1f}" if member['p90_stress'] is not None else "-",
                     "Entries": member['total_entries']
                 })
             
@@ -1277,7 +1461,7 @@ def show_settings():
     st.title("⚙️ Settings")
     
     user_id = st.session_state.user['id']
-    user = db.get_user_by_id(user_id)
+    user = db_ops.get_user_by_id(user_id)
     
     if not user:
         st.error("User not found!")
@@ -1324,6 +1508,7 @@ def show_settings():
             if team_info:
                 st.write(f"**Current Team:** {team_info['name']}")
                 st.write(f"**Team Admin:** {team_info.get('admin_name', 'Unknown')}")
+                st.write(f"**Team Code:** `{team_info['team_code']}`")
             
             if st.button("Go to Team Management", type="primary"):
                 st.switch_page("pages/6_Team_Management.py")
@@ -1390,13 +1575,10 @@ def show_settings():
             st.session_state.allow_visual_tracking = allow_visual
             
             # Update database
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE users SET allow_visual_tracking = ? WHERE id = ?
-            ''', (1 if allow_visual else 0, user_id))
-            conn.commit()
-            conn.close()
+            with db.connection() as conn:
+                conn.execute('''
+                    UPDATE users SET allow_visual_tracking = ? WHERE id = ?
+                ''', (1 if allow_visual else 0, user_id))
             
             st.success("Privacy settings saved!")
     
@@ -1448,21 +1630,17 @@ def show_settings():
                     st.error("Password must be at least 6 characters")
                 else:
                     # Verify current password
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT password_hash FROM users WHERE id = ?', (user_id,))
-                    result = cursor.fetchone()
-                    conn.close()
+                    with db.connection() as conn:
+                        result = conn.execute(
+                            'SELECT password_hash FROM users WHERE id = ?', (user_id,)
+                        ).fetchone()
                     
                     if result and db.verify_password(current_password, result[0]):
                         # Update password
                         new_hash = db.hash_password(new_password)
-                        conn = db.get_connection()
-                        cursor = conn.cursor()
-                        cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?', 
-                                     (new_hash, user_id))
-                        conn.commit()
-                        conn.close()
+                        with db.connection() as conn:
+                            conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', 
+                                         (new_hash, user_id))
                         
                         st.success("Password changed successfully!")
                     else:
@@ -1475,8 +1653,35 @@ def show_settings():
         col1, col2 = st.columns(2)
         
         with col1:
+            data_label = st.selectbox("Data", list(TRANSFER_DATASETS), key="transfer_table")
+            data_format = st.radio("Format", ["csv", "jsonl"], horizontal=True, key="transfer_format")
+            table = TRANSFER_DATASETS[data_label]
+            
             if st.button("Export My Data"):
-                st.info("Data export feature coming soon!")
+                buffer = io.StringIO()
+                rows = export_table(db, table, buffer, data_format, user_id=user_id)
+                st.download_button(
+                    f"⬇️ Download {rows} rows",
+                    buffer.getvalue(),
+                    file_name=f"{table}.{data_format}",
+                    mime="text/csv" if data_format == "csv" else "application/x-ndjson"
+                )
+            
+            if table != "users":
+                upload = st.file_uploader(f"Import {data_label.lower()} into my account",
+                                          type=["csv", "jsonl", "ndjson"], key="transfer_upload")
+                if upload and st.button("Import"):
+                    try:
+                        result = import_table(
+                            db, table,
+                            io.TextIOWrapper(upload, encoding="utf-8", newline=""),
+                            format_for(upload.name),
+                            user_id=user_id
+                        )
+                        st.success(f"Imported {result['imported']} rows!")
+                    except (ValueError, KeyError, sqlite3.Error) as e:
+                        # Bad values, missing fields and rows the schema rejects
+                        st.error(f"Import failed: {e}")
         
         with col2:
             if st.button("Delete My Account", type="secondary"):
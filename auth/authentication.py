@@ -110,21 +110,12 @@ class Authenticator:
                             st.error("Team code is required")
                             return
                         
-                        # Try to extract team ID from code
-                        try:
-                            if team_code.startswith("TEAM-"):
-                                # Extract numeric ID from code
-                                team_id = int(team_code.split('-')[1], 16) % 10000  # Simple extraction
-                            else:
-                                team_id = int(team_code)  # Assume it's direct team ID
-                            
-                            success, message = self.db.add_user_to_team(user_id, team_id)
-                            if success:
-                                st.success(f"✅ Account created! {message}")
-                            else:
-                                st.warning(f"Account created but could not join team: {message}")
-                        except:
-                            st.warning("Account created but team code was invalid. You can join a team later in settings.")
+                        success, message = self.db.add_user_to_team(user_id, team_code)
+                        if success:
+                            st.success(f"✅ Account created! {message}")
+                        else:
+                            st.warning(f"Account created but could not join team: {message}. "
+                                       "You can join a team later in settings.")
                     
                     else:  # Skip for now
                         st.success("✅ Account created successfully!")
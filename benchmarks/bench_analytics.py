@@ -0,0 +1,105 @@
+"""Analytics engine latency: SQLite vs DuckDB at 1M and 10M mood entries.
+
+Seeds a team-structured database, exports a Parquet snapshot and times
+every Analytics page aggregation on each available engine. DuckDB over the
+live file needs its sqlite extension; it is skipped if that cannot load.
+
+    python benchmarks/bench_analytics.py [--rows 1000000 10000000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from database.models import Database
+from database.analytics import SQLiteEngine, DuckDBEngine, duckdb
+from database.snapshots import SnapshotStore
+
+
+def seed(db, rows, teams=100, members=50, days=730):
+    """rows mood entries spread over teams * members users and the past `days` days"""
+    users = teams * members
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO teams (name) VALUES (?)", [(f'team{t}',) for t in range(teams)])
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+            [(f'user{u}', f'user{u}@example.com', u % teams + 1) for u in range(users)]
+        )
+        # Generated in SQL; the rollup triggers fire per row as in production
+        conn.execute(f'''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < {rows})
+        INSERT INTO mood_entries (user_id, text_sentiment, combined_score, stress_level, created_at)
+        SELECT 1 + abs(random()) % {users},
+               1 + abs(random()) % 90 / 10.0,
+               1 + abs(random()) % 90 / 10.0,
+               1 + abs(random()) % 10,
+               datetime('now', '-' || (abs(random()) % {days}) || ' days')
+        FROM n
+        ''')
+
+
+def timed(call, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def workload(engine):
+    # A team's first member: year-long personal views plus the team table
+    return {
+        'daily_moods': lambda: engine.daily_moods(1, days=365),
+        'mood_stats': lambda: engine.mood_stats(1, days=365),
+        'mood_histogram': lambda: engine.mood_histogram(1, days=365),
+        'member_summaries': lambda: engine.member_summaries(1, days=365),
+    }
+
+
+def run(rows, repeat):
+    workdir = tempfile.mkdtemp()
+    db = Database(os.path.join(workdir, 'bench.db'))
+
+    start = time.perf_counter()
+    seed(db, rows)
+    print(f"\n{rows:,} mood entries (seeded in {time.perf_counter() - start:.0f}s)")
+
+    engines = {'sqlite': SQLiteEngine(db)}
+    if duckdb is not None:
+        store = SnapshotStore(os.path.join(workdir, 'snapshots'))
+        start = time.perf_counter()
+        store.export(db)
+        print(f"snapshot export: {time.perf_counter() - start:.1f}s")
+        engines['duckdb/snapshot'] = DuckDBEngine.over_snapshots(store)
+        try:
+            engines['duckdb/sqlite'] = DuckDBEngine.over_sqlite(db.db_name)
+        except duckdb.Error as e:
+            print(f"duckdb/sqlite skipped: {str(e).splitlines()[0]}")
+
+    print(f"{'query':20}" + ''.join(f"{name:>18}" for name in engines))
+    results = {name: {q: timed(call, repeat) for q, call in workload(engine).items()}
+               for name, engine in engines.items()}
+    for query in workload(engines['sqlite']):
+        print(f"{query:20}" + ''.join(f"{results[name][query]:>15.1f} ms" for name in engines))
+
+    for engine in engines.values():
+        engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
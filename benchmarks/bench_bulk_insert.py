@@ -0,0 +1,83 @@
+"""Mood-entry ingestion throughput: one create_mood_entry per row vs bulk.
+
+Also checks that the daily rollup still matches mood_entries afterwards.
+
+    python benchmarks/bench_bulk_insert.py [--rows 50000] [--single 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from database.models import Database
+from database.operations import DatabaseOperations
+
+
+def seed_users(db, members=20):
+    with db.connection() as conn:
+        conn.execute("INSERT INTO teams (name, created_by) VALUES ('Bench', 1)")
+        team_id = conn.execute('SELECT MAX(id) FROM teams').fetchone()[0]
+        return [
+            conn.execute(
+                "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+                (f'user{m}', f'user{m}@example.com', team_id)
+            ).lastrowid
+            for m in range(members)
+        ]
+
+
+def entries(user_ids, count, seed=0):
+    """Historical check-ins spread over the past year"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {
+            'user_id': rng.choice(user_ids),
+            'text_sentiment': rng.choice([None, rng.uniform(1, 10)]),
+            'visual_sentiment': rng.choice([None, rng.uniform(1, 10)]),
+            'stress_level': rng.randint(1, 10),
+            'created_at': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00"
+        }
+
+
+def rollup_matches(db):
+    with db.connection() as conn:
+        return conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT user_id, created_day, COUNT(*) FROM mood_entries GROUP BY user_id, created_day
+            EXCEPT
+            SELECT user_id, day, entries FROM mood_daily_rollup
+        )
+        ''').fetchone()[0] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--single', type=int, default=2000)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    ops = DatabaseOperations(db)
+    user_ids = seed_users(db)
+
+    start = time.perf_counter()
+    for entry in entries(user_ids, args.single):
+        entry.pop('created_at')  # create_mood_entry always stamps now
+        ops.create_mood_entry(**entry)
+    single = args.single / (time.perf_counter() - start)
+
+    result = ops.create_mood_entries_bulk(entries(user_ids, args.rows, seed=1))
+
+    print(f"create_mood_entry:        {single:>10.0f} rows/s")
+    print(f"create_mood_entries_bulk: {result['rows_per_second']:>10.0f} rows/s "
+          f"({result['inserted']} rows, ids {result['id_ranges']})")
+    print(f"rollup consistent:        {rollup_matches(db)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Connections opened and query latency per dashboard rerun.
+
+Compares the old one-connection-per-query behaviour with the pooled
+connection manager, replaying the calls that the sidebar and the dashboard
+make on every Streamlit rerun.
+
+    python benchmarks/bench_connections.py [--reruns 200] [--threads 8]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from database.models import Database
+from database.operations import DatabaseOperations
+
+
+class UnpooledDatabase(Database):
+    """The previous behaviour: a fresh sqlite3.connect for every query"""
+
+    def __init__(self, db_name):
+        self.opened = 0
+        self._lock = threading.Lock()
+        super().__init__(db_name)
+
+    def get_connection(self):
+        with self._lock:
+            self.opened += 1
+        return sqlite3.connect(self.db_name)
+
+    @contextmanager
+    def connection(self):
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def seed(db, members=8, moods_per_member=60, tasks_per_member=20):
+    with db.connection() as conn:
+        conn.execute("INSERT INTO teams (name, created_by) VALUES ('Bench', 1)")
+        team_id = conn.execute('SELECT MAX(id) FROM teams').fetchone()[0]
+        for m in range(members):
+            cur = conn.execute(
+                "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+                (f'user{m}', f'user{m}@example.com', team_id)
+            )
+            user_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO mood_entries (user_id, combined_score, stress_level, created_at) "
+                "VALUES (?, ?, ?, datetime('now', ?))",
+                [(user_id, 1 + i % 10, 1 + i % 9, f'-{i % 30} days') for i in range(moods_per_member)]
+            )
+            conn.executemany(
+                "INSERT INTO tasks (title, assigned_to, status, priority) VALUES (?, ?, ?, ?)",
+                [(f'task {i}', user_id, ('todo', 'in_progress', 'completed')[i % 3],
+                  ('low', 'medium', 'high', 'urgent')[i % 4]) for i in range(tasks_per_member)]
+            )
+    return team_id, user_id
+
+
+def dashboard_rerun(ops, user_id, team_id):
+    # Sidebar
+    ops.get_team_stats(team_id)
+    ops.get_task_stats(user_id)
+    ops.get_today_mood_stats(user_id)
+    # show_dashboard
+    ops.get_team_stats(team_id)
+    ops.get_task_stats(user_id)
+    ops.get_today_mood_stats(user_id)
+    ops.get_team_mood_summary(team_id)
+    ops.get_user_tasks(user_id)
+    ops.get_user_mood_history(user_id, days=7)
+
+
+def run(ops, user_id, team_id, reruns, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def session():
+        local = []
+        for _ in range(reruns // threads):
+            start = time.perf_counter()
+            dashboard_rerun(ops, user_id, team_id)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=session) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'reruns': len(latencies),
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'reruns_per_sec': len(latencies) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    unpooled = UnpooledDatabase(db_path)
+    team_id, user_id = seed(unpooled)
+    unpooled.opened = 0
+    before = run(DatabaseOperations(unpooled), user_id, team_id, args.reruns, args.threads)
+    before['connections_per_rerun'] = unpooled.opened / before['reruns']
+
+    pooled = Database(db_path)
+    opened = pooled.pool.stats()['opened']
+    after = run(DatabaseOperations(pooled), user_id, team_id, args.reruns, args.threads)
+    after['connections_per_rerun'] = (pooled.pool.stats()['opened'] - opened) / after['reruns']
+
+    print(f"{'':12}{'conn/rerun':>12}{'p50 ms':>10}{'p95 ms':>10}{'reruns/s':>10}")
+    for name, result in (('unpooled', before), ('pooled', after)):
+        print(f"{name:12}{result['connections_per_rerun']:>12.2f}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['reruns_per_sec']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
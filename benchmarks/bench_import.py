@@ -0,0 +1,70 @@
+"""Cold-start cost of the text sentiment analyzer.
+
+Each measurement runs in a fresh interpreter. "import" is what app.py now pays
+before rendering: importing utils.sentiment_analyzer with models loaded
+lazily. "import + models" adds loading VADER and TextBlob up front, as the
+module used to at import time. "first analysis" is the first call after a
+lazy import. With --app, also times a full run of app.py to the login page
+through Streamlit's AppTest.
+
+    python benchmarks/bench_import.py [--runs 5] [--app]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'import': "import utils.sentiment_analyzer",
+    'import + models': (
+        "from utils.sentiment_analyzer import text_analyzer\n"
+        "text_analyzer._models()"
+    ),
+    'first analysis': (
+        "from utils.sentiment_analyzer import text_analyzer\n"
+        "text_analyzer.analyze_sentiment('Stressed about the deadline but making progress')"
+    ),
+}
+
+APP_SCENARIO = (
+    "from streamlit.testing.v1 import AppTest\n"
+    "AppTest.from_file('app.py', default_timeout=120).run()"
+)
+
+TIMED = """import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def run_once(code):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    out = subprocess.run(
+        [sys.executable, '-c', TIMED.format(code=code)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--app', action='store_true', help="also time app.py up to the login page")
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if args.app:
+        scenarios['app.py to login page'] = APP_SCENARIO
+
+    print(f"{'scenario':<22}{'median ms':>12}{'min ms':>10}")
+    for name, code in scenarios.items():
+        times = [run_once(code) * 1000 for _ in range(args.runs)]
+        print(f"{name:<22}{statistics.median(times):>12.0f}{min(times):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Full-text search latency over 1M mood notes.
+
+Seeds mood notes (and a tenth as many tasks) drawn from a Zipf-distributed
+vocabulary, then times db_ops.search scoped to one user and to one team.
+bm25 weighs each term by how many rows contain it across the whole index,
+so a query's cost follows how common its words are, not the scope size.
+The "stopword" (in most notes) only filters and is not ranked; how many
+rows each word matches is counted once and cached, so the timings are best
+of --repeat after that first call.
+
+    python benchmarks/bench_search.py [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from database.models import Database
+from database.operations import DatabaseOperations
+
+VOCABULARY = [f'word{rank}' for rank in range(1, 5001)]
+WEIGHTS = [1 / rank for rank in range(1, 5001)]
+
+QUERIES = {
+    'stopword': 'word1',
+    'frequent word': 'word20',
+    'rare word': 'word2000',
+    'two words': 'word20 word50',
+}
+
+
+def note(rng):
+    return ' '.join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(5, 20)))
+
+
+def seed(db, rows, teams=100, members=50, batch=50_000):
+    rng = random.Random(0)
+    users = teams * members
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO teams (name) VALUES (?)", [(f'team{t}',) for t in range(teams)])
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+            [(f'user{u}', f'user{u}@example.com', u % teams + 1) for u in range(users)]
+        )
+
+    for start in range(0, rows, batch):
+        size = min(batch, rows - start)
+        # Inserted through the FTS triggers, as in production
+        with db.connection() as conn:
+            conn.executemany(
+                "INSERT INTO mood_entries (user_id, text_entry, combined_score, stress_level) VALUES (?, ?, 5, 5)",
+                [(rng.randint(1, users), note(rng)) for _ in range(size)]
+            )
+            conn.executemany(
+                "INSERT INTO tasks (title, description, assigned_to) VALUES (?, ?, ?)",
+                [(note(rng), note(rng), rng.randint(1, users)) for _ in range(size // 10)]
+            )
+
+
+def timed(call, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    ops = DatabaseOperations(db)
+
+    start = time.perf_counter()
+    seed(db, args.rows)
+    print(f"{args.rows:,} mood notes, {args.rows // 10:,} tasks (seeded in {time.perf_counter() - start:.0f}s)")
+    with db.connection() as conn:
+        # Merge the index segments the seed left behind, as after a quiet period
+        conn.execute("INSERT INTO mood_entries_fts (mood_entries_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('optimize')")
+
+    print(f"{'query':20}{'user':>12}{'team':>12}")
+    for label, text in QUERIES.items():
+        user = timed(lambda: ops.search(text, user_id=1), args.repeat)
+        team = timed(lambda: ops.search(text, team_id=1), args.repeat)
+        print(f"{label:20}{user:>9.2f} ms{team:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
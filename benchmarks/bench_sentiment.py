@@ -0,0 +1,63 @@
+"""Per-entry latency of text sentiment analysis at several text lengths.
+
+Times analyze() (sentiment and stress in one pass) against the two calls
+the app used to make, analyze_sentiment() then calculate_stress_level(),
+on generated journal entries of 10 to 1000 words.
+
+    python benchmarks/bench_sentiment.py [--words 10 50 200 1000] [--entries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sentiment_analyzer import TextSentimentAnalyzer
+
+FILLER = ('today', 'the', 'team', 'meeting', 'was', 'and', 'i', 'worked', 'on', 'release',
+          'with', 'review', 'feeling', 'about', 'sprint', 'project', 'code', 'lunch', 'later')
+KEYWORDS = ('stressed', 'deadline', 'tired', 'happy', 'great', 'progress', 'stuck', 'worried',
+            'productive', 'frustrated', 'okay', 'awesome', 'burnout', 'focused', 'problem')
+
+
+def entry(rng, words):
+    """A note of `words` words, roughly one in five a lexicon word"""
+    text = ' '.join(rng.choice(KEYWORDS if rng.random() < 0.2 else FILLER) for _ in range(words))
+    return text.capitalize() + '!'
+
+
+def per_entry_us(call, texts, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            call(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--entries', type=int, default=200)
+    args = parser.parse_args()
+
+    analyzer = TextSentimentAnalyzer()
+    rng = random.Random(0)
+
+    def two_calls(text):
+        result = analyzer.analyze_sentiment(text)
+        analyzer.calculate_stress_level(text, result['score'])
+
+    print(f"{'words':>6}{'analyze() us':>16}{'two calls us':>16}")
+    for words in args.words:
+        texts = [entry(rng, words) for _ in range(args.entries)]
+        single = per_entry_us(analyzer.analyze, texts)
+        double = per_entry_us(two_calls, texts)
+        print(f"{words:>6}{single:>16.0f}{double:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
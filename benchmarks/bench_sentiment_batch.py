@@ -0,0 +1,56 @@
+"""Throughput of TextSentimentAnalyzer.analyze_batch as worker processes are added.
+
+Scores generated journal entries in-process and then with pools of 2, 4, ...
+workers up to the CPU count, and reports entries/second and the speed-up
+over one worker.
+
+    python benchmarks/bench_sentiment_batch.py [--entries 10000 100000] [--words 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sentiment_analyzer import BATCH_CHUNKSIZE, TextSentimentAnalyzer
+from bench_sentiment import entry
+
+
+def worker_counts():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--words', type=int, default=50)
+    parser.add_argument('--chunksize', type=int, default=BATCH_CHUNKSIZE)
+    args = parser.parse_args()
+
+    analyzer = TextSentimentAnalyzer()
+    rng = random.Random(0)
+
+    print(f"{'entries':>8}{'workers':>9}{'seconds':>10}{'entries/s':>12}{'speed-up':>10}")
+    for entries in args.entries:
+        texts = [entry(rng, args.words) for _ in range(entries)]
+        baseline = None
+        for workers in worker_counts():
+            start = time.perf_counter()
+            for _ in analyzer.analyze_batch(texts, workers=workers, chunksize=args.chunksize):
+                pass
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{entries:>8}{workers:>9}{elapsed:>10.2f}{entries / elapsed:>12.0f}"
+                  f"{baseline / elapsed:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Write throughput with concurrent sessions: direct commits vs the write queue.
+
+Each simulated session logs quick mood checks and moves its tasks between
+statuses, waiting for every write to commit as the app does. Direct mode
+commits each write on the session's own connection; queued mode hands them
+to database.writer.WriteQueue.
+
+    python benchmarks/bench_write_queue.py [--sessions 50] [--writes 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from database.models import Database
+from database.operations import DatabaseOperations
+from database.writer import WriteQueue
+
+TASKS_PER_SESSION = 5
+STATUSES = ('todo', 'in_progress', 'completed')
+
+
+def seed(db, sessions):
+    """One user with a few tasks per session"""
+    with db.connection() as conn:
+        conn.execute("INSERT INTO teams (name, created_by) VALUES ('Bench', 1)")
+        team_id = conn.execute('SELECT MAX(id) FROM teams').fetchone()[0]
+        users = []
+        for s in range(sessions):
+            user_id = conn.execute(
+                "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+                (f'user{s}', f'user{s}@example.com', team_id)
+            ).lastrowid
+            tasks = [conn.execute("INSERT INTO tasks (title, assigned_to) VALUES (?, ?)",
+                                  (f'task {t}', user_id)).lastrowid
+                     for t in range(TASKS_PER_SESSION)]
+            users.append((user_id, tasks))
+    return users
+
+
+def session_writes(ops, user_id, tasks, writes, seed):
+    """The calls behind show_quick_check and the Task Manager buttons"""
+    rng = random.Random(seed)
+    for _ in range(writes):
+        if rng.random() < 0.5:
+            mood = rng.randint(1, 10)
+            yield ops.create_mood_entry, (user_id, f'Quick check: {mood}', mood, None, 11 - mood)
+        else:
+            yield ops.update_task_status, (rng.choice(tasks), rng.choice(STATUSES))
+
+
+def run(db, users, writes, write_queue=None):
+    ops = DatabaseOperations(db)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def session(index, user_id, tasks):
+        local = []
+        for fn, args in session_writes(ops, user_id, tasks, writes, index):
+            start = time.perf_counter()
+            try:
+                if write_queue is None:
+                    fn(*args)
+                else:
+                    write_queue.write(fn, *args)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors.append(e)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=session, args=(i, user_id, tasks))
+               for i, (user_id, tasks) in enumerate(users)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'errors': len(errors),
+        'writes_per_sec': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--writes', type=int, default=200, help='writes per session')
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ('direct', 'queued'):
+        db = Database(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+        users = seed(db, args.sessions)
+        write_queue = WriteQueue(db) if mode == 'queued' else None
+        results[mode] = run(db, users, args.writes, write_queue)
+        if write_queue is not None:
+            stats = write_queue.stats()
+            results[mode]['per_commit'] = stats['writes'] / stats['batches']
+            write_queue.close()
+        else:
+            results[mode]['per_commit'] = 1.0
+
+    print(f"{args.sessions} sessions x {args.writes} writes")
+    print(f"{'':10}{'writes/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per commit':>12}{'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:10}{r['writes_per_sec']:>10.0f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['per_commit']:>12.1f}{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
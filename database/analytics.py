@@ -0,0 +1,299 @@
+"""Analytical query engines for the Analytics page.
+
+Both engines answer the same questions with the same SQL over a
+mood_daily_rollup relation: daily moods with a rolling average, the mood
+histogram, percentiles and per-member summaries.
+
+SQLiteEngine reads the rollup through the app's connection pool.
+DuckDBEngine runs the queries columnar and vectorised. It either attaches
+the SQLite file read-only or loads the Parquet/Arrow snapshots, deriving
+the rollup from the exported entries. get_engine() picks DuckDB when it is
+installed and usable, and SQLite otherwise.
+"""
+import math
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from .models import db
+from .operations import epoch_day
+
+# auto | duckdb | sqlite
+ANALYTICS_ENGINE = os.environ.get('TEAM_OPTIMIZER_ANALYTICS_ENGINE', 'auto')
+
+ROLLING_WINDOW_DAYS = 7
+PERCENTILES = (10, 50, 90)
+
+# Daily averages for one user; $params work in both SQLite and DuckDB
+DAILY_MOOD_QUERY = f'''
+SELECT day,
+       mood_sum / NULLIF(mood_count, 0) AS avg_mood,
+       stress_sum / NULLIF(stress_count, 0) AS avg_stress,
+       entries,
+       AVG(mood_sum / NULLIF(mood_count, 0)) OVER (
+           ORDER BY day RANGE BETWEEN {ROLLING_WINDOW_DAYS - 1} PRECEDING AND CURRENT ROW
+       ) AS rolling_mood
+FROM mood_daily_rollup
+WHERE user_id = $user_id
+  AND day >= $since_day
+'''
+
+# Daily averages bucketed into [1, 2), [2, 3) ... [10, 11)
+MOOD_HISTOGRAM_QUERY = f'''
+SELECT CAST(FLOOR(avg_mood) AS INTEGER) AS bucket, COUNT(*) AS days
+FROM ({DAILY_MOOD_QUERY}) daily
+WHERE avg_mood >= 1 AND avg_mood < 11
+GROUP BY bucket
+'''
+
+MEMBER_DAILY_QUERY = '''
+SELECT u.id AS user_id, u.username, r.day,
+       r.mood_sum, r.mood_count, r.stress_sum, r.stress_count, r.entries, r.last_entry_at,
+       r.mood_sum / NULLIF(r.mood_count, 0) AS avg_mood,
+       r.stress_sum / NULLIF(r.stress_count, 0) AS avg_stress
+FROM users u
+JOIN mood_daily_rollup r ON r.user_id = u.id
+WHERE u.team_id = $team_id
+  AND r.day >= $since_day
+'''
+
+
+def _ranked(value, partition, p):
+    """Columns for _interpolated(p): the rank of each value and where the p-th percentile falls"""
+    window = f'PARTITION BY {partition}' if partition else ''
+    position = f'(COUNT({value}) OVER ({window}) - 1) * {p / 100}'
+    return f'''
+        {value} AS value_p{p},
+        ROW_NUMBER() OVER ({window} ORDER BY {value}) - 1 AS rank_p{p},
+        CAST({position} AS INTEGER) AS low_p{p},
+        {position} - CAST({position} AS INTEGER) AS frac_p{p}'''
+
+
+def _interpolated(p):
+    """SQLite has no quantile aggregate: interpolate between ranked rows like quantile_cont"""
+    return f'''SUM(CASE WHEN rank_p{p} = low_p{p} THEN value_p{p} * (1 - frac_p{p})
+                WHEN rank_p{p} = low_p{p} + 1 THEN value_p{p} * frac_p{p}
+                ELSE 0 END)'''
+
+
+class AnalyticsEngine:
+    """Shared query logic; subclasses provide _query(sql, params) -> DataFrame"""
+    name = None
+
+    def _query(self, sql, params):
+        raise NotImplementedError
+
+    def daily_moods(self, user_id, days=30):
+        """Per-day averages, newest first, with a ROLLING_WINDOW_DAYS rolling mood"""
+        daily = self._query(DAILY_MOOD_QUERY + ' ORDER BY day DESC',
+                            {'user_id': user_id, 'since_day': epoch_day() - int(days)})
+        daily.insert(0, 'date', pd.to_datetime(daily.pop('day'), unit='D').dt.strftime('%Y-%m-%d'))
+        return daily
+
+    def mood_histogram(self, user_id, days=30):
+        """Number of days whose average mood falls in each of the buckets 1-10"""
+        rows = self._query(MOOD_HISTOGRAM_QUERY,
+                           {'user_id': user_id, 'since_day': epoch_day() - int(days)})
+        counts = dict(zip(rows['bucket'], rows['days']))
+        return [int(counts.get(bucket, 0)) for bucket in range(1, 11)]
+
+    def mood_stats(self, user_id, days=30):
+        """Mean, sample std and PERCENTILES of the daily average mood"""
+        row = self._query(self._stats_query(f'({DAILY_MOOD_QUERY})', 'avg_mood'),
+                          {'user_id': user_id, 'since_day': epoch_day() - int(days)}).iloc[0]
+        
+        # Rounding can leave a constant series a hair below zero
+        variance = max(0.0, row['variance']) if pd.notna(row['variance']) else None
+        stats = {'mean': row['mean'], 'std': math.sqrt(variance) if variance is not None else None}
+        stats.update({f'p{p}': row[f'p{p}'] for p in PERCENTILES})
+        return {key: (None if pd.isna(value) else float(value)) for key, value in stats.items()}
+
+    def member_summaries(self, team_id, days=7):
+        """get_team_mood_summary rows plus each member's median daily mood and p90 daily stress"""
+        rows = self._query(self._member_query(), {'team_id': team_id, 'since_day': epoch_day() - int(days)})
+        return [
+            {
+                'username': r.username,
+                'avg_mood': round(r.avg_mood, 1) if pd.notna(r.avg_mood) else 0,
+                'avg_stress': round(r.avg_stress, 1) if pd.notna(r.avg_stress) else 0,
+                'total_entries': int(r.total_entries) if pd.notna(r.total_entries) else 0,
+                'last_entry': r.last_entry,
+                'median_mood': round(r.median_mood, 1) if pd.notna(r.median_mood) else None,
+                'p90_stress': round(r.p90_stress, 1) if pd.notna(r.p90_stress) else None
+            }
+            for r in rows.itertuples()
+        ]
+
+    def close(self):
+        pass
+
+
+class SQLiteEngine(AnalyticsEngine):
+    name = 'sqlite'
+
+    def __init__(self, database=None):
+        self.db = database or db
+
+    def _query(self, sql, params):
+        with self.db.connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _stats_query(self, relation, value):
+        ranked = ','.join(_ranked(value, None, p) for p in PERCENTILES)
+        percentiles = ', '.join(f'{_interpolated(p)} AS p{p}' for p in PERCENTILES)
+        x = f'value_p{PERCENTILES[0]}'
+        # Two passes: squared deviations from the mean never cancel below zero
+        # the way SUM(x*x) - SUM(x)^2/n can
+        return f'''
+        SELECT AVG({x}) AS mean,
+               SUM(({x} - mean_all) * ({x} - mean_all)) / NULLIF(COUNT({x}) - 1, 0) AS variance,
+               {percentiles}
+        FROM (SELECT {ranked}, AVG({value}) OVER () AS mean_all
+              FROM {relation} WHERE {value} IS NOT NULL)
+        '''
+
+    def _member_query(self):
+        return f'''
+        WITH member_days AS ({MEMBER_DAILY_QUERY}),
+        totals AS (
+            SELECT user_id, username,
+                   SUM(mood_sum) / NULLIF(SUM(mood_count), 0) AS avg_mood,
+                   SUM(stress_sum) / NULLIF(SUM(stress_count), 0) AS avg_stress,
+                   SUM(entries) AS total_entries,
+                   MAX(last_entry_at) AS last_entry
+            FROM member_days
+            GROUP BY user_id, username
+        ),
+        mood_ranks AS (
+            SELECT user_id, {_ranked('avg_mood', 'user_id', 50)}
+            FROM member_days WHERE avg_mood IS NOT NULL
+        ),
+        stress_ranks AS (
+            SELECT user_id, {_ranked('avg_stress', 'user_id', 90)}
+            FROM member_days WHERE avg_stress IS NOT NULL
+        )
+        SELECT totals.*,
+               (SELECT {_interpolated(50)} FROM mood_ranks m WHERE m.user_id = totals.user_id) AS median_mood,
+               (SELECT {_interpolated(90)} FROM stress_ranks s WHERE s.user_id = totals.user_id) AS p90_stress
+        FROM totals
+        ORDER BY user_id
+        '''
+
+
+class DuckDBEngine(AnalyticsEngine):
+    name = 'duckdb'
+
+    def __init__(self, conn, source):
+        self._conn = conn
+        self.source = source
+
+    @classmethod
+    def over_sqlite(cls, db_name):
+        """Attach the live SQLite file read-only (needs DuckDB's sqlite extension)"""
+        conn = duckdb.connect()
+        conn.execute('INSTALL sqlite')
+        conn.execute('LOAD sqlite')
+        conn.execute(f"ATTACH '{db_name}' AS src (TYPE SQLITE, READ_ONLY)")
+        conn.execute('CREATE VIEW users AS SELECT * FROM src.users')
+        conn.execute('CREATE VIEW mood_daily_rollup AS SELECT * FROM src.mood_daily_rollup')
+        return cls(conn, 'sqlite')
+
+    @classmethod
+    def over_snapshots(cls, store):
+        """Load a SnapshotStore's files into memory, rolled up per user and day.
+        
+        One columnar pass over the entries per export; every query after that
+        reads the in-memory rollup instead of rescanning the files.
+        """
+        conn = duckdb.connect()
+        conn.register('snapshot_users', store.dataset('users'))
+        conn.register('snapshot_moods', store.dataset('mood_entries'))
+        conn.execute('CREATE TABLE users AS SELECT * FROM snapshot_users')
+        conn.execute('''
+        CREATE TABLE mood_daily_rollup AS
+        SELECT user_id, created_day AS day,
+               CAST(IFNULL(SUM(combined_score), 0) AS DOUBLE) AS mood_sum,
+               COUNT(combined_score) AS mood_count,
+               CAST(IFNULL(SUM(stress_level), 0) AS DOUBLE) AS stress_sum,
+               COUNT(stress_level) AS stress_count,
+               COUNT(*) AS entries,
+               MAX(created_at) AS last_entry_at
+        FROM snapshot_moods
+        GROUP BY user_id, created_day
+        ORDER BY user_id, day
+        ''')
+        conn.unregister('snapshot_users')
+        conn.unregister('snapshot_moods')
+        return cls(conn, 'snapshot')
+
+    def _query(self, sql, params):
+        # A cursor per call: DuckDB connections are not shared across threads
+        with self._conn.cursor() as cursor:
+            return cursor.execute(sql, params).df()
+
+    def _stats_query(self, relation, value):
+        percentiles = ', '.join(f'quantile_cont({value}, {p / 100}) AS p{p}' for p in PERCENTILES)
+        return f'''
+        SELECT AVG({value}) AS mean, var_samp({value}) AS variance, {percentiles}
+        FROM {relation} WHERE {value} IS NOT NULL
+        '''
+
+    def _member_query(self):
+        return f'''
+        SELECT user_id, username,
+               SUM(mood_sum) / NULLIF(SUM(mood_count), 0) AS avg_mood,
+               SUM(stress_sum) / NULLIF(SUM(stress_count), 0) AS avg_stress,
+               SUM(entries) AS total_entries,
+               MAX(last_entry_at) AS last_entry,
+               quantile_cont(avg_mood, 0.5) AS median_mood,
+               quantile_cont(avg_stress, 0.9) AS p90_stress
+        FROM ({MEMBER_DAILY_QUERY}) member_days
+        GROUP BY user_id, username
+        ORDER BY user_id
+        '''
+
+    def close(self):
+        self._conn.close()
+
+
+def can_query_snapshots(preference=ANALYTICS_ENGINE):
+    """Snapshots are only read through DuckDB"""
+    return duckdb is not None and preference != 'sqlite'
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(store=None, preference=ANALYTICS_ENGINE, database=None):
+    """Engine for the live database, or for a SnapshotStore's files.
+
+    DuckDB engines are built once per source and rebuilt when a new snapshot
+    is exported. Falls back to SQLite when DuckDB is missing or cannot
+    attach the database file; snapshots need DuckDB.
+    """
+    database = database or db
+    if preference == 'sqlite' or duckdb is None:
+        return None if store else SQLiteEngine(database)
+
+    key = ('snapshot', store.root, store.exported_at()) if store else ('sqlite', database.db_name)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            try:
+                engine = (DuckDBEngine.over_snapshots(store) if store
+                          else DuckDBEngine.over_sqlite(database.db_name))
+            except duckdb.Error:
+                if store or preference == 'duckdb':
+                    raise
+                engine = SQLiteEngine(database)
+            for stale in [k for k in _engines if k[:2] == key[:2]]:
+                _engines.pop(stale).close()
+            _engines[key] = engine
+    return engine
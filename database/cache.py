@@ -0,0 +1,125 @@
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_TTL_SECONDS = float(os.environ.get('TEAM_OPTIMIZER_CACHE_TTL', '30'))
+
+
+class ReadCache:
+    """Process-wide read cache with a TTL and tag-based invalidation.
+
+    Every entry is tagged with the users/teams it was read for, e.g.
+    ('team', 3) or ('user', 7). Writes call invalidate() with the tags they
+    touch; anything else expires after the TTL. One instance is shared by
+    every Streamlit session in the process.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._tagged = {}              # tag -> set of keys
+        self._generation = {}          # tag -> bumped on every invalidation
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, tags, loader):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[2])
+
+            self.misses += 1
+            generations = [self._generation.get(tag, 0) for tag in tags]
+
+        value = loader()
+
+        with self._lock:
+            # A write invalidated one of our tags while we were loading, so
+            # the value may already be stale; hand it out but don't keep it
+            if generations == [self._generation.get(tag, 0) for tag in tags]:
+                self._store(key, tags, value, now + self.ttl)
+
+        return copy.deepcopy(value)
+
+    def _store(self, key, tags, value, expires_at):
+        self._drop(key)
+        self._entries[key] = (expires_at, tags, value)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for tag in entry[1]:
+                keys = self._tagged.get(tag)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tagged[tag]
+
+    def invalidate(self, *tags):
+        """Evict every entry carrying any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                if tag[1] is None:
+                    continue
+                self._generation[tag] = self._generation.get(tag, 0) + 1
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self._tagged):
+                self._generation[tag] = self._generation.get(tag, 0) + 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'entries': len(self._entries)
+            }
+
+
+def cached(scope):
+    """Cache a DatabaseOperations getter whose first argument is a `scope` id"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, scope_id, *args, **kwargs):
+            key = (method.__name__, scope_id, args, tuple(sorted(kwargs.items())))
+            return self.cache.get_or_load(
+                key,
+                [(scope, scope_id)],
+                lambda: method(self, scope_id, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+# Shared by Database and DatabaseOperations
+read_cache = ReadCache()
@@ -0,0 +1,123 @@
+"""Consumer API over the change log.
+
+Triggers (migrations.CHANGE_LOG) append one change_log row per task and mood
+entry insert/update/delete and per membership join/leave/role change, in
+the same transaction as the write, so every mutating method is covered
+without calling anything here. A consumer reads past its checkpoint,
+processes the batch and then advances the checkpoint:
+
+    for change in change_feed.read_changes(change_feed.checkpoint('search'), limit=500):
+        ...
+    change_feed.commit_checkpoint('search', change['seq'])
+
+or lets consume() do both. Rows every registered consumer has passed can be
+dropped with compact().
+"""
+from .models import db
+
+READ_LIMIT = 1000
+
+# The AUTOINCREMENT high-water mark survives compaction; MAX(seq) does not
+LATEST_SEQ_SQL = "IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)"
+CHANGE_COLUMNS = ('seq', 'entity', 'entity_id', 'op', 'user_id', 'team_id', 'created_at')
+
+
+class ChangeFeed:
+    def __init__(self, database=None):
+        self.db = database or db
+
+    def read_changes(self, since_seq=0, limit=READ_LIMIT, entities=None):
+        """Up to `limit` changes with seq > since_seq, oldest first"""
+        query = f"SELECT {', '.join(CHANGE_COLUMNS)} FROM change_log WHERE seq > ?"
+        params = [since_seq]
+        if entities:
+            query += f" AND entity IN ({', '.join('?' * len(entities))})"
+            params.extend(entities)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+
+        with self.db.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(zip(CHANGE_COLUMNS, row)) for row in rows]
+
+    def latest_seq(self):
+        with self.db.connection() as conn:
+            return conn.execute(f'SELECT {LATEST_SEQ_SQL}').fetchone()[0]
+
+    # ========== CHECKPOINTS ==========
+    def register(self, consumer, from_latest=False):
+        """Start tracking a consumer: from the oldest retained change, or from now"""
+        with self.db.connection() as conn:
+            conn.execute(f'''
+            INSERT INTO change_consumers (name, seq)
+            VALUES (?, CASE WHEN ? THEN {LATEST_SEQ_SQL} ELSE 0 END)
+            ON CONFLICT (name) DO NOTHING
+            ''', (consumer, from_latest))
+
+    def checkpoint(self, consumer):
+        """Last seq the consumer has processed (registering it at 0 if new)"""
+        self.register(consumer)
+        with self.db.connection() as conn:
+            return conn.execute('SELECT seq FROM change_consumers WHERE name = ?',
+                                (consumer,)).fetchone()[0]
+
+    def commit_checkpoint(self, consumer, seq):
+        """Record that the consumer has processed everything up to seq; never moves back"""
+        with self.db.connection() as conn:
+            conn.execute('''
+            INSERT INTO change_consumers (name, seq) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                seq = MAX(seq, excluded.seq),
+                updated_at = CURRENT_TIMESTAMP
+            ''', (consumer, seq))
+
+    def unregister(self, consumer):
+        """Stop holding back compaction for a consumer that has gone away"""
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM change_consumers WHERE name = ?', (consumer,))
+
+    def consumers(self):
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                'SELECT name, seq, updated_at FROM change_consumers ORDER BY name'
+            ).fetchall()
+        return [{'name': r[0], 'seq': r[1], 'updated_at': r[2]} for r in rows]
+
+    def consume(self, consumer, handler, limit=READ_LIMIT, entities=None):
+        """Pass the next batch after the consumer's checkpoint to handler(changes),
+        then advance the checkpoint; returns the number of changes handled.
+
+        If handler raises, the checkpoint stays put and the batch is read
+        again next time, so handlers should be idempotent.
+        """
+        since = self.checkpoint(consumer)
+        changes = self.read_changes(since, limit)
+        if not changes:
+            return 0
+
+        # Filtered after reading so entities a consumer skips still advance it
+        wanted = [c for c in changes if not entities or c['entity'] in entities]
+        if wanted:
+            handler(wanted)
+        self.commit_checkpoint(consumer, changes[-1]['seq'])
+        return len(wanted)
+
+    # ========== COMPACTION ==========
+    def compact(self, upto_seq=None):
+        """Delete changes every registered consumer has processed (and, if
+        given, only those up to upto_seq); returns the number deleted.
+
+        With no consumers registered nothing is deleted, so a consumer that
+        has not started yet cannot miss changes.
+        """
+        with self.db.connection() as conn:
+            horizon = conn.execute('SELECT MIN(seq) FROM change_consumers').fetchone()[0]
+            if horizon is None:
+                return 0
+            if upto_seq is not None:
+                horizon = min(horizon, upto_seq)
+            return conn.execute('DELETE FROM change_log WHERE seq <= ?', (horizon,)).rowcount
+
+
+# Create singleton instance
+change_feed = ChangeFeed()
@@ -0,0 +1,56 @@
+import sqlite3
+import threading
+
+
+class ChangeMonitor:
+    """Answers "has anything for team X changed since version V?" cheaply.
+
+    Holds one read-only connection of its own. PRAGMA data_version on that
+    connection only moves when some other connection commits, so as long as
+    it is unchanged the team versions cached here are still current and no
+    table is read at all. When it moves, the per-team counters maintained by
+    the team_changes triggers are re-read on demand, one primary-key lookup
+    per team.
+    """
+
+    def __init__(self, db_name, busy_timeout_ms=5000):
+        self.db_name = db_name
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versions = {}
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout_ms / 1000,
+                                         check_same_thread=False)
+            self._conn.execute('PRAGMA query_only = 1')
+        return self._conn
+
+    def team_version(self, team_id):
+        """Current change counter of a team (0 if it never changed)"""
+        with self._lock:
+            conn = self._connection()
+
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._versions.clear()
+            elif team_id in self._versions:
+                return self._versions[team_id]
+
+            row = conn.execute('SELECT version FROM team_changes WHERE team_id = ?',
+                               (team_id,)).fetchone()
+            self._versions[team_id] = row[0] if row else 0
+            return self._versions[team_id]
+
+    def has_changed(self, team_id, since_version):
+        return since_version is None or self.team_version(team_id) != since_version
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
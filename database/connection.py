@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that goes back to its pool instead of closing"""
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def discard(self):
+        """Really close the underlying sqlite handle"""
+        super().close()
+
+
+class ConnectionPool:
+    """Thread-aware pool of SQLite connections.
+
+    Connections are opened once (WAL mode, busy timeout) and reused across
+    Streamlit reruns and sessions. A thread that asks for a connection while
+    it already holds one gets the same connection back, so nested calls share
+    one transaction and only the outermost block commits.
+    """
+
+    def __init__(self, db_name, max_idle=8, busy_timeout_ms=5000, journal_mode='WAL'):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.busy_timeout_ms = busy_timeout_ms
+        self.journal_mode = journal_mode
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.opened = 0
+        self.acquired = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=PooledConnection
+        )
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        if self.journal_mode:
+            conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        conn.pool = self
+
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self):
+        """Get a connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        with self._lock:
+            self.acquired += 1
+            conn = self._idle.pop() if self._idle else None
+
+        if conn is None:
+            conn = self._open()
+
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.on_commit = []
+        return conn
+
+    def release(self, conn):
+        """Give a connection back; uncommitted work is discarded like close()"""
+        if getattr(self._local, 'conn', None) is not conn:
+            # Released from another thread or already released
+            return
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+        callbacks, self._local.on_commit = self._local.on_commit, []
+        if conn.in_transaction:
+            conn.rollback()
+            callbacks = []
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.discard()
+
+        for callback in callbacks:
+            callback()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the outermost block commits or rolls back"""
+        conn = self.acquire()
+        outermost = self._local.depth == 1
+        try:
+            yield conn
+            if outermost and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if outermost:
+                self._local.on_commit = []
+                if conn.in_transaction:
+                    conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def on_commit(self, callback):
+        """Run callback once the current thread's transaction has committed.
+
+        Dropped if the transaction rolls back; runs immediately when the
+        thread holds no connection.
+        """
+        if getattr(self._local, 'conn', None) is None:
+            callback()
+        else:
+            self._local.on_commit.append(callback)
+
+    def close_all(self):
+        """Close every idle connection (connections in use close on release)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'opened': self.opened,
+                'acquired': self.acquired,
+                'idle': len(self._idle)
+            }
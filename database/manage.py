@@ -0,0 +1,278 @@
+"""Headless maintenance commands for the Team Optimizer database.
+
+    python -m database.manage [--db PATH] rebuild-rollup
+    python -m database.manage [--db PATH] rebuild-search
+    python -m database.manage [--db PATH] check-plans
+    python -m database.manage [--db PATH] check-counters [--repair]
+    python -m database.manage [--db PATH] changes [--compact]
+    python -m database.manage [--db PATH] export TABLE PATH [--format csv|jsonl] [--user ID]
+    python -m database.manage [--db PATH] import TABLE PATH [--format csv|jsonl] [--user ID] [--keep-ids]
+    python -m database.manage [--db PATH] snapshot [--dir DIR] [--format parquet|arrow] [--full]
+    python -m database.manage [--db PATH] lexicon TEAM_ID [--add PHRASE CATEGORY] [--remove PHRASE CATEGORY]
+
+PATH may be - for stdout/stdin.
+"""
+import argparse
+import os
+import sys
+
+
+def rebuild_rollup(db, args):
+    rows = db.rebuild_mood_rollup()
+    print(f"Rebuilt mood_daily_rollup: {rows} user-day rows")
+    return 0
+
+
+def rebuild_search(db, args):
+    from .migrations import FTS_INDEXES, rebuild_search_indexes
+    with db.connection() as conn:
+        rebuild_search_indexes(conn)
+    print(f"Rebuilt full-text indexes: {', '.join(f'{table}_fts' for table in FTS_INDEXES)}")
+    return 0
+
+
+# Tables whose time-windowed reads must never fall back to a full scan
+WINDOWED_TABLES = ('mood_entries', 'mood_daily_rollup')
+
+
+def _traced(conn, *calls):
+    """Statements issued on conn while running calls"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        for call in calls:
+            call()
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def _full_scans(plan):
+    return [step for step in plan
+            if step.startswith('SCAN') and 'USING' not in step
+            and any(table in step for table in WINDOWED_TABLES)]
+
+
+def _sorts(plan):
+    return [step for step in plan if step.startswith('USE TEMP B-TREE FOR ORDER BY')]
+
+
+def check_plans(db, args):
+    """EXPLAIN QUERY PLAN every statement the time-windowed and sorted reads issue"""
+    from .operations import DatabaseOperations, epoch_day
+    ops = DatabaseOperations(db)
+
+    with db.connection() as conn:
+        user_id, team_id = conn.execute(
+            'SELECT id, team_id FROM users ORDER BY id LIMIT 1'
+        ).fetchone() or (1, 1)
+
+        windowed = _traced(
+            conn,
+            lambda: ops.get_user_mood_history(user_id, days=30),
+            lambda: ops.get_team_mood_summary(team_id),
+            lambda: ops.get_today_mood_stats(user_id),
+            lambda: ops.get_team_stats(team_id)
+        )
+        # The statement the rollup triggers run when an entry is edited
+        windowed.append(
+            f'SELECT COUNT(*) FROM mood_entries WHERE user_id = {user_id} '
+            f'AND created_day = {epoch_day()}'
+        )
+
+        # Per-user task pages must come straight off an index in sort order
+        sorted_reads = _traced(
+            conn,
+            lambda: ops.get_user_tasks(user_id, page_size=25),
+            lambda: ops.get_user_tasks(user_id, 'todo', page_size=25, after=(1, '', 0))
+        )
+
+        failures = 0
+        for statements, problems in ((windowed, _full_scans), (sorted_reads, _sorts)):
+            for sql in statements:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+                flagged = problems(plan)
+                failures += bool(flagged)
+
+                print(' '.join(sql.split()))
+                for step in plan:
+                    print(f"    {'!!' if step in flagged else '  '} {step}")
+
+    print(f"{failures} statement(s) scan a windowed table or sort a task page without an index")
+    return 1 if failures else 0
+
+
+def check_counters(db, args):
+    """Compare the trigger-maintained counters with a fresh count"""
+    from .migrations import counter_mismatches, rebuild_counters
+
+    with db.connection() as conn:
+        mismatches = counter_mismatches(conn)
+        failures = sum(len(rows) for rows in mismatches.values())
+
+        for table, rows in mismatches.items():
+            for stored, expected in rows:
+                print(f"{table}: stored {stored} != counted {expected}")
+
+        if failures and args.repair:
+            rows = rebuild_counters(conn)
+            print("Rebuilt " + ', '.join(f"{table} ({count} rows)" for table, count in rows.items()))
+
+    print(f"{failures} counter row(s) out of step")
+    return 1 if failures and not args.repair else 0
+
+
+def changes(db, args):
+    from .changefeed import ChangeFeed
+    feed = ChangeFeed(db)
+
+    print(f"Latest change seq: {feed.latest_seq()}")
+    for consumer in feed.consumers():
+        print(f"  {consumer['name']}: at {consumer['seq']} (updated {consumer['updated_at']})")
+
+    if args.compact:
+        print(f"Compacted {feed.compact()} change(s) every consumer has processed")
+    return 0
+
+
+def _open_text(path, mode):
+    if path == '-':
+        return open((sys.stdout if mode == 'w' else sys.stdin).fileno(), mode,
+                    encoding='utf-8', newline='', closefd=False)
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def export_data(db, args):
+    from .transfer import export_table, format_for
+    fmt = args.format or format_for(args.path)
+
+    with _open_text(args.path, 'w') as fp:
+        rows = export_table(db, args.table, fp, fmt, user_id=args.user, include_secrets=True)
+    print(f"Exported {rows} {args.table} rows", file=sys.stderr)
+    return 0
+
+
+def import_data(db, args):
+    from .transfer import import_table, format_for
+    fmt = args.format or format_for(args.path)
+
+    with _open_text(args.path, 'r') as fp:
+        result = import_table(db, args.table, fp, fmt, user_id=args.user, keep_ids=args.keep_ids)
+    print(f"Imported {result['imported']} {args.table} rows in {result['batches']} batch(es)",
+          file=sys.stderr)
+    return 0
+
+
+def snapshot(db, args):
+    from .snapshots import SnapshotStore, SNAPSHOT_DIR
+    store = SnapshotStore(args.dir or SNAPSHOT_DIR, args.format)
+
+    try:
+        tables = store.export(db, full=args.full)
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    for table, info in tables.items():
+        print(f"{table}: {info['rows']} rows" +
+              (f" (watermark id {info['watermark']})" if 'watermark' in info else ''))
+    return 0
+
+
+def lexicon(db, args):
+    from .operations import DatabaseOperations
+    ops = DatabaseOperations(db)
+
+    if args.add:
+        ok, message = ops.add_lexicon_entry(args.team, *args.add)
+        print(message, file=sys.stderr)
+        if not ok:
+            return 1
+    if args.remove and not ops.remove_lexicon_entry(args.team, *args.remove):
+        print(f"No {args.remove[1]} phrase '{args.remove[0]}'", file=sys.stderr)
+        return 1
+
+    for phrase, category in ops.get_team_lexicon(args.team):
+        print(f"{category:<10}{phrase}")
+    return 0
+
+
+TRANSFER_ARGUMENTS = [
+    (('table',), {'choices': ('users', 'tasks', 'mood_entries')}),
+    (('path',), {'help': "CSV or JSONL file, or - for stdout/stdin"}),
+    (('--format',), {'choices': ('csv', 'jsonl'), 'help': "Default: from the file extension"}),
+    (('--user',), {'type': int, 'help': "Only this user's rows (export) / assign rows to this user (import)"}),
+]
+
+COMMANDS = {
+    'rebuild-rollup': (rebuild_rollup, "Recompute the daily mood rollup from mood_entries"),
+    'rebuild-search': (rebuild_search, "Re-index mood notes and tasks for full-text search"),
+    'check-plans': (check_plans, "Fail if a mood window scans or a task page sorts without an index"),
+    'check-counters': (check_counters, "Fail if the task/member counters differ from a fresh count"),
+    'changes': (changes, "Show the change log position of every consumer"),
+    'export': (export_data, "Stream a table to CSV or JSONL"),
+    'import': (import_data, "Stream CSV or JSONL rows into a table in batches"),
+    'snapshot': (snapshot, "Export new mood entries and the dimension tables to Parquet/Arrow"),
+    'lexicon': (lexicon, "List or edit a team's custom sentiment vocabulary"),
+}
+
+# Extra arguments per command (flags, add_argument kwargs)
+COMMAND_ARGUMENTS = {
+    'export': TRANSFER_ARGUMENTS,
+    'import': TRANSFER_ARGUMENTS + [
+        (('--keep-ids',), {'action': 'store_true', 'help': "Keep the ids from the file (restore into an empty database)"}),
+    ],
+    'check-counters': [
+        (('--repair',), {'action': 'store_true', 'help': "Rebuild the counters when they are out of step"}),
+    ],
+    'changes': [
+        (('--compact',), {'action': 'store_true', 'help': "Delete changes every consumer has processed"}),
+    ],
+    'snapshot': [
+        (('--dir',), {'help': "Snapshot directory (default: $TEAM_OPTIMIZER_SNAPSHOT_DIR or snapshots)"}),
+        (('--format',), {'choices': ('parquet', 'arrow'), 'default': 'parquet'}),
+        (('--full',), {'action': 'store_true', 'help': "Re-export every mood entry instead of only new ones"}),
+    ],
+    'lexicon': [
+        (('team',), {'type': int, 'metavar': 'TEAM_ID'}),
+        (('--add',), {'nargs': 2, 'metavar': ('PHRASE', 'CATEGORY')}),
+        (('--remove',), {'nargs': 2, 'metavar': ('PHRASE', 'CATEGORY')}),
+    ],
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m database.manage',
+                                     description="Team Optimizer database maintenance")
+    parser.add_argument('--db', help="SQLite file (default: $TEAM_OPTIMIZER_DB or team_optimizer.db)")
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, kwargs in COMMAND_ARGUMENTS.get(name, ()):
+            subparser.add_argument(*flags, **kwargs)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Must be set before models is imported so the singleton opens the same file
+    if args.db:
+        os.environ['TEAM_OPTIMIZER_DB'] = args.db
+
+    from .models import db
+
+    handler, _ = COMMANDS[args.command]
+    try:
+        return handler(db, args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,855 @@
+"""Versioned schema migrations.
+
+Every step runs once, in order, inside its own transaction and is recorded
+in the schema_version table. A step is either a list of SQL statements or a
+callable that receives the connection. Append new steps to MIGRATIONS; never
+edit or reorder a step that has shipped.
+"""
+import hashlib
+
+BASE_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        team_id INTEGER,
+        role TEXT DEFAULT 'member',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        allow_visual_tracking BOOLEAN DEFAULT 1
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS teams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        created_by INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (created_by) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS mood_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        text_entry TEXT,
+        text_sentiment REAL,
+        visual_sentiment REAL,
+        combined_score REAL,
+        stress_level INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        assigned_to INTEGER,
+        status TEXT DEFAULT 'todo',
+        priority TEXT DEFAULT 'medium',
+        deadline DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assigned_to) REFERENCES users (id)
+    )
+    ''',
+]
+
+# Indexes for the hot queries in DatabaseOperations:
+# per-user mood history, team membership lookups and per-user task lists.
+HOT_QUERY_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_mood_entries_user_created ON mood_entries (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_users_team ON users (team_id)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_assignee_status_deadline ON tasks (assigned_to, status, deadline)',
+]
+
+# Per-user, per-day mood aggregates. Inserts fold into the day's row; deletes
+# and edits recompute just the affected (user_id, day) from mood_entries,
+# since min/max cannot be un-applied.
+_ROLLUP_COLUMNS = '''user_id, day, mood_sum, mood_count, mood_min, mood_max,
+    stress_sum, stress_count, stress_min, stress_max, entries, last_entry_at'''
+
+_ROLLUP_AGGREGATES = '''
+    IFNULL(SUM(combined_score), 0), COUNT(combined_score),
+    MIN(combined_score), MAX(combined_score),
+    IFNULL(SUM(stress_level), 0), COUNT(stress_level),
+    MIN(stress_level), MAX(stress_level),
+    COUNT(*), MAX(created_at)
+'''
+
+_ROLLUP_TRIGGERS = ('trg_mood_rollup_insert', 'trg_mood_rollup_delete', 'trg_mood_rollup_update')
+
+# Days since 1970-01-01 (UTC). Stored on mood_entries as created_day and used
+# as the rollup key so time windows are plain integer ranges.
+EPOCH_DAY_SQL = "CAST(julianday(created_at) - 2440587.5 AS INTEGER)"
+
+
+def _text_day(ref=''):
+    return f"date({ref}created_at)"
+
+
+def _epoch_day(ref=''):
+    return f"{ref}created_day"
+
+
+def _recompute_rollup_day(day_of, ref):
+    return f'''
+    DELETE FROM mood_daily_rollup
+    WHERE user_id = {ref}.user_id AND day = {day_of(ref + '.')};
+    INSERT INTO mood_daily_rollup ({_ROLLUP_COLUMNS})
+    SELECT user_id, {day_of()}, {_ROLLUP_AGGREGATES}
+    FROM mood_entries
+    WHERE user_id = {ref}.user_id AND {day_of()} = {day_of(ref + '.')}
+    GROUP BY user_id;
+    '''
+
+
+def _mood_rollup(day_type, day_of):
+    return [
+        f'''
+        CREATE TABLE IF NOT EXISTS mood_daily_rollup (
+            user_id INTEGER NOT NULL,
+            day {day_type} NOT NULL,
+            mood_sum REAL NOT NULL DEFAULT 0,
+            mood_count INTEGER NOT NULL DEFAULT 0,
+            mood_min REAL,
+            mood_max REAL,
+            stress_sum REAL NOT NULL DEFAULT 0,
+            stress_count INTEGER NOT NULL DEFAULT 0,
+            stress_min REAL,
+            stress_max REAL,
+            entries INTEGER NOT NULL DEFAULT 0,
+            last_entry_at TIMESTAMP,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_mood_rollup_insert
+        AFTER INSERT ON mood_entries
+        BEGIN
+            INSERT INTO mood_daily_rollup ({_ROLLUP_COLUMNS})
+            VALUES (
+                NEW.user_id, {day_of('NEW.')},
+                IFNULL(NEW.combined_score, 0), NEW.combined_score IS NOT NULL,
+                NEW.combined_score, NEW.combined_score,
+                IFNULL(NEW.stress_level, 0), NEW.stress_level IS NOT NULL,
+                NEW.stress_level, NEW.stress_level,
+                1, NEW.created_at
+            )
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                mood_sum = mood_sum + excluded.mood_sum,
+                mood_count = mood_count + excluded.mood_count,
+                mood_min = CASE WHEN mood_min IS NULL OR excluded.mood_min < mood_min
+                                THEN excluded.mood_min ELSE mood_min END,
+                mood_max = CASE WHEN mood_max IS NULL OR excluded.mood_max > mood_max
+                                THEN excluded.mood_max ELSE mood_max END,
+                stress_sum = stress_sum + excluded.stress_sum,
+                stress_count = stress_count + excluded.stress_count,
+                stress_min = CASE WHEN stress_min IS NULL OR excluded.stress_min < stress_min
+                                  THEN excluded.stress_min ELSE stress_min END,
+                stress_max = CASE WHEN stress_max IS NULL OR excluded.stress_max > stress_max
+                                  THEN excluded.stress_max ELSE stress_max END,
+                entries = entries + 1,
+                last_entry_at = CASE WHEN last_entry_at IS NULL OR excluded.last_entry_at > last_entry_at
+                                     THEN excluded.last_entry_at ELSE last_entry_at END;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_mood_rollup_delete
+        AFTER DELETE ON mood_entries
+        BEGIN
+            {_recompute_rollup_day(day_of, 'OLD')}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_mood_rollup_update
+        AFTER UPDATE OF user_id, combined_score, stress_level, created_at ON mood_entries
+        BEGIN
+            {_recompute_rollup_day(day_of, 'OLD')}
+            {_recompute_rollup_day(day_of, 'NEW')}
+        END
+        ''',
+    ]
+
+
+def rebuild_mood_rollup(conn, day_of=_epoch_day):
+    """Recompute mood_daily_rollup from scratch; returns the number of rows"""
+    conn.execute('DELETE FROM mood_daily_rollup')
+    conn.execute(f'''
+    INSERT INTO mood_daily_rollup ({_ROLLUP_COLUMNS})
+    SELECT user_id, {day_of()}, {_ROLLUP_AGGREGATES}
+    FROM mood_entries
+    GROUP BY user_id, {day_of()}
+    ''')
+    return conn.execute('SELECT COUNT(*) FROM mood_daily_rollup').fetchone()[0]
+
+
+def _create_mood_rollup(conn):
+    for statement in _mood_rollup('TEXT', _text_day):
+        conn.execute(statement)
+    rebuild_mood_rollup(conn, _text_day)
+
+
+def _add_mood_created_day(conn):
+    # A virtual generated column is filled on every insert and is already
+    # "backfilled" for existing rows; the index materialises it.
+    conn.execute(f'''
+    ALTER TABLE mood_entries ADD COLUMN created_day INTEGER
+    GENERATED ALWAYS AS ({EPOCH_DAY_SQL}) VIRTUAL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_mood_entries_user_day ON mood_entries (user_id, created_day)')
+
+    # Re-key the rollup on the same integer day
+    for trigger in _ROLLUP_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS mood_daily_rollup')
+    for statement in _mood_rollup('INTEGER', _epoch_day):
+        conn.execute(statement)
+    rebuild_mood_rollup(conn)
+
+
+# Per-team change counters. Any write that can change what a team's
+# dashboard shows bumps the counter of every team it touches, so readers can
+# ask "has team X changed since version V?" with one primary-key lookup.
+def _bump_team(team):
+    return f'''
+    INSERT INTO team_changes (team_id, version)
+    SELECT {team}, 1 WHERE {team} IS NOT NULL
+    ON CONFLICT (team_id) DO UPDATE SET version = version + 1;
+    '''
+
+
+def _team_of(user):
+    return f'(SELECT team_id FROM users WHERE id = {user})'
+
+
+def _team_change_triggers(table, team_of_row):
+    bumps = {
+        'INSERT': _bump_team(team_of_row('NEW')),
+        'DELETE': _bump_team(team_of_row('OLD')),
+        'UPDATE': _bump_team(team_of_row('OLD')) + _bump_team(team_of_row('NEW')),
+    }
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_team_changes_{table}_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN
+            {body}
+        END
+        '''
+        for event, body in bumps.items()
+    ]
+
+
+TEAM_CHANGES = [
+    '''
+    CREATE TABLE IF NOT EXISTS team_changes (
+        team_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    *_team_change_triggers('mood_entries', lambda row: _team_of(f'{row}.user_id')),
+    *_team_change_triggers('tasks', lambda row: _team_of(f'{row}.assigned_to')),
+    *_team_change_triggers('users', lambda row: f'{row}.team_id'),
+]
+
+# Task lists sort on (priority_rank, deadline_key, id). Both keys are virtual
+# generated columns, so existing rows need no backfill and the ordered
+# indexes below hand back sorted pages without a temp b-tree. Tasks without a
+# deadline sort after every dated one.
+PRIORITY_RANK_SQL = '''CASE priority
+    WHEN 'urgent' THEN 1
+    WHEN 'high' THEN 2
+    WHEN 'medium' THEN 3
+    WHEN 'low' THEN 4
+    ELSE 5
+END'''
+
+NO_DEADLINE = '9999-12-31'
+
+TASK_PRIORITY_RANK = [
+    f'''
+    ALTER TABLE tasks ADD COLUMN priority_rank INTEGER
+    GENERATED ALWAYS AS ({PRIORITY_RANK_SQL}) VIRTUAL
+    ''',
+    f'''
+    ALTER TABLE tasks ADD COLUMN deadline_key TEXT
+    GENERATED ALWAYS AS (IFNULL(deadline, '{NO_DEADLINE}')) VIRTUAL
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_assignee_order ON tasks (assigned_to, priority_rank, deadline_key)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_assignee_status_order ON tasks (assigned_to, status, priority_rank, deadline_key)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks (priority_rank, deadline_key)',
+    # Its (assigned_to, status) prefix is covered by the status order index
+    'DROP INDEX IF EXISTS idx_tasks_assignee_status_deadline',
+]
+
+# Full-text indexes over mood notes and task text. They are external
+# content tables, so the text lives only in mood_entries/tasks and triggers
+# keep the index in step. Each row also indexes an owner token ('u' + user
+# id): scoping a search to a user or team is then part of the MATCH itself
+# and never ranks other people's rows. The source views feed 'rebuild' and
+# snippet() the same values the triggers index.
+def owner_token(user_id):
+    return f'u{user_id}'
+
+
+OWNER_TOKEN_SQL = "'u' || IFNULL({}, 0)"
+
+FTS_INDEXES = {
+    # table: (indexed columns, owner column, condition for a row to be indexed)
+    'mood_entries': (('text_entry',), 'user_id', '{row}text_entry IS NOT NULL'),
+    'tasks': (('title', 'description'), 'assigned_to', '1'),
+}
+
+
+def rebuild_search_indexes(conn):
+    """Re-index every row from the source tables and merge the index segments"""
+    for table in FTS_INDEXES:
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+
+
+def _fts_index(table, columns, owner, indexed):
+    fts = f'{table}_fts'
+    names = ', '.join([*columns, 'owner'])
+
+    def write(row, command=''):
+        values = ', '.join([f'{row}.id', *(f'{row}.{column}' for column in columns),
+                            OWNER_TOKEN_SQL.format(f'{row}.{owner}')])
+        target = f"{fts} ({fts}, rowid, {names}) SELECT 'delete', " if command else f"{fts} (rowid, {names}) SELECT "
+        return f"INSERT INTO {target}{values} WHERE {indexed.format(row=row + '.')};"
+
+    return [
+        f'''
+        CREATE VIEW IF NOT EXISTS {fts}_source AS
+        SELECT id, {', '.join(columns)}, {OWNER_TOKEN_SQL.format(owner)} AS owner
+        FROM {table}
+        WHERE {indexed.format(row='')}
+        ''',
+        f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {names},
+            content='{fts}_source', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        ''',
+        # The owner token is a filter, not relevance
+        f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', 'bm25({', '.join(['1.0'] * len(columns))}, 0.0)')",
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+        BEGIN
+            {write('NEW')}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            {write('OLD', 'delete')}
+        END
+        ''',
+        # Old values must leave the index before the new ones go in
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+        AFTER UPDATE OF {', '.join([*columns, owner])} ON {table}
+        BEGIN
+            {write('OLD', 'delete')}
+            {write('NEW')}
+        END
+        ''',
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+FULL_TEXT_SEARCH = [
+    statement
+    for table, (columns, owner, indexed) in FTS_INDEXES.items()
+    for statement in _fts_index(table, columns, owner, indexed)
+]
+
+# Shareable team codes, generated once and looked up through a unique
+# index. Existing teams keep the code the app used to derive from their id,
+# so codes that were already handed out keep working.
+def legacy_team_code(team_id):
+    return 'TEAM-' + hashlib.md5(f'team{team_id}'.encode()).hexdigest()[:8].upper()
+
+
+def _add_team_codes(conn):
+    conn.execute('ALTER TABLE teams ADD COLUMN team_code TEXT')
+    teams = conn.execute('SELECT id FROM teams').fetchall()
+    conn.executemany('UPDATE teams SET team_code = ? WHERE id = ?',
+                     [(legacy_team_code(team_id), team_id) for (team_id,) in teams])
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_teams_team_code ON teams (team_code)')
+
+
+# The Join Team directory lists teams by case-insensitive name and searches
+# by name prefix; both walk this index (rowid breaks ties between names).
+TEAM_DIRECTORY = [
+    'CREATE INDEX IF NOT EXISTS idx_teams_name ON teams (name COLLATE NOCASE)',
+]
+
+
+# Denormalised task and member counters. Triggers keep them exact on every
+# write, so the stats getters read one row by primary key instead of
+# aggregating tasks and users. Tasks feed user_task_counts; changes to a
+# user's counts and moves between teams feed team_counts.
+TASK_STATUSES = ('todo', 'in_progress', 'completed')
+TASK_PRIORITIES = ('urgent', 'high', 'medium', 'low')
+
+_USER_COUNT_COLUMNS = ('total',) + TASK_STATUSES + TASK_PRIORITIES
+
+# Older rows hold stray text ('' or a team name) in users.team_id; those
+# never match a team id, so only integer keys are counted
+_IS_KEY = "typeof({}) = 'integer'"
+_TEAM_COUNT_COLUMNS = ('members', 'total_tasks', 'completed_tasks', 'members_with_tasks')
+
+
+def _upsert(table, key, columns, values, where):
+    """Add `values` (SQL expressions) onto a counter row, creating it if needed"""
+    return f'''
+    INSERT INTO {table} ({key}, {', '.join(columns)})
+    SELECT {', '.join(values)}
+    WHERE {where}
+    ON CONFLICT ({key}) DO UPDATE SET
+        {', '.join(f'{column} = {column} + excluded.{column}' for column in columns)};
+    '''
+
+
+def _count_task(row, sign):
+    values = [f'{row}.assigned_to', sign]
+    values += [f"{sign} * ({row}.status = '{status}')" for status in TASK_STATUSES]
+    values += [f"{sign} * ({row}.priority = '{priority}')" for priority in TASK_PRIORITIES]
+    return _upsert('user_task_counts', 'user_id', _USER_COUNT_COLUMNS, values,
+                   _IS_KEY.format(f'{row}.assigned_to'))
+
+
+def _count_user_tasks(user, new, old=None):
+    """Move a user's task counts (new minus old) onto the user's team"""
+    delta = lambda column: f'{new}.{column} - {old}.{column}' if old else f'{new}.{column}'
+    with_tasks = f'({new}.total > 0) - ({old}.total > 0)' if old else f'{new}.total > 0'
+    team = f'(SELECT team_id FROM users WHERE id = {user})'
+    return _upsert('team_counts', 'team_id', _TEAM_COUNT_COLUMNS,
+                   [team, '0', delta('total'), delta('completed'), with_tasks],
+                   _IS_KEY.format(team))
+
+
+def _count_member(row, sign):
+    """Add (or remove) a member and all of their task counts on the member's team"""
+    return f'''
+    INSERT INTO team_counts (team_id, {', '.join(_TEAM_COUNT_COLUMNS)})
+    SELECT {row}.team_id, {sign}, {sign} * IFNULL(c.total, 0),
+           {sign} * IFNULL(c.completed, 0), {sign} * (IFNULL(c.total, 0) > 0)
+    FROM (SELECT 1) LEFT JOIN user_task_counts c ON c.user_id = {row}.id
+    WHERE {_IS_KEY.format(f'{row}.team_id')}
+    ON CONFLICT (team_id) DO UPDATE SET
+        {', '.join(f'{column} = {column} + excluded.{column}' for column in _TEAM_COUNT_COLUMNS)};
+    '''
+
+
+TASK_COUNTERS = [
+    f'''
+    CREATE TABLE IF NOT EXISTS user_task_counts (
+        user_id INTEGER PRIMARY KEY,
+        {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in _USER_COUNT_COLUMNS)}
+    )
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS team_counts (
+        team_id INTEGER PRIMARY KEY,
+        {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in _TEAM_COUNT_COLUMNS)}
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_counts_insert AFTER INSERT ON tasks
+    BEGIN {_count_task('NEW', '1')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_counts_delete AFTER DELETE ON tasks
+    BEGIN {_count_task('OLD', '-1')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_counts_update
+    AFTER UPDATE OF assigned_to, status, priority ON tasks
+    BEGIN {_count_task('OLD', '-1')} {_count_task('NEW', '1')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_team_task_counts_insert AFTER INSERT ON user_task_counts
+    BEGIN {_count_user_tasks('NEW.user_id', 'NEW')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_team_task_counts_update AFTER UPDATE ON user_task_counts
+    BEGIN {_count_user_tasks('NEW.user_id', 'NEW', 'OLD')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_member_counts_insert AFTER INSERT ON users
+    BEGIN {_count_member('NEW', '1')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_member_counts_delete AFTER DELETE ON users
+    BEGIN {_count_member('OLD', '-1')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_member_counts_update AFTER UPDATE OF id, team_id ON users
+    BEGIN {_count_member('OLD', '-1')} {_count_member('NEW', '1')} END
+    ''',
+]
+
+# What the counters must equal, straight from tasks and users
+EXPECTED_COUNTS = {
+    'user_task_counts': f'''
+    SELECT assigned_to, COUNT(*),
+           {', '.join(f"SUM(status = '{status}')" for status in TASK_STATUSES)},
+           {', '.join(f"SUM(priority = '{priority}')" for priority in TASK_PRIORITIES)}
+    FROM tasks
+    WHERE {_IS_KEY.format('assigned_to')}
+    GROUP BY assigned_to
+    ''',
+    'team_counts': f'''
+    SELECT u.team_id, COUNT(*), IFNULL(SUM(c.total), 0), IFNULL(SUM(c.completed), 0),
+           IFNULL(SUM(c.total > 0), 0)
+    FROM users u
+    LEFT JOIN user_task_counts c ON c.user_id = u.id
+    WHERE {_IS_KEY.format('u.team_id')}
+    GROUP BY u.team_id
+    ''',
+}
+
+COUNTER_COLUMNS = {
+    'user_task_counts': ('user_id',) + _USER_COUNT_COLUMNS,
+    'team_counts': ('team_id',) + _TEAM_COUNT_COLUMNS,
+}
+
+
+def rebuild_counters(conn):
+    """Recompute both counter tables from tasks and users; returns rows per table"""
+    rows = {}
+    # In dependency order: team counts are derived from user task counts, and
+    # the triggers on user_task_counts write into team_counts before it is
+    # itself rebuilt
+    for table, query in EXPECTED_COUNTS.items():
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'INSERT INTO {table} ({", ".join(COUNTER_COLUMNS[table])}) {query}')
+        rows[table] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    return rows
+
+
+def counter_mismatches(conn):
+    """Counter rows that differ from a fresh count, as {table: [(stored, expected)]}.
+
+    Rows whose counts are all zero are the same as no row.
+    """
+    mismatches = {}
+    for table, query in EXPECTED_COUNTS.items():
+        key, *counts = COUNTER_COLUMNS[table]
+        stored = {row[0]: row[1:] for row in conn.execute(
+            f'SELECT {", ".join(COUNTER_COLUMNS[table])} FROM {table}'
+        ) if any(row[1:])}
+        expected = {row[0]: row[1:] for row in conn.execute(query) if any(row[1:])}
+        zeros = (0,) * len(counts)
+        mismatches[table] = [
+            ((key_value, *stored.get(key_value, zeros)), (key_value, *expected.get(key_value, zeros)))
+            for key_value in sorted(stored.keys() | expected.keys())
+            if stored.get(key_value) != expected.get(key_value)
+        ]
+    return mismatches
+
+
+def _add_counters(conn):
+    for statement in TASK_COUNTERS:
+        conn.execute(statement)
+    rebuild_counters(conn)
+
+
+# Task status history and flow metrics. Every status change appends a
+# task_events row; a completion carries its lead time (since the task was
+# created), cycle time (since it was first started) and whether it met the
+# deadline. Triggers on task_events fold completions into per-user weekly
+# sums, and take a completion back out if the task is reopened (or, since
+# version 14, deleted), so the analytics read a handful of rows instead of
+# replaying the history.
+# Weeks are keyed by the epoch day of their Monday (1970-01-01 was a Thursday).
+def _week_of(ref=''):
+    day = f"CAST(julianday({ref}created_at) - 2440587.5 AS INTEGER)"
+    return f"({day} - ({day} + 3) % 7)"
+
+_FLOW_COLUMNS = ('completed', 'lead_seconds', 'cycle_seconds', 'cycle_count', 'on_time', 'with_deadline')
+
+
+def _seconds_since(start):
+    return f"CAST(ROUND((julianday('now') - julianday({start})) * 86400) AS INTEGER)"
+
+
+_FIRST_STARTED = "(SELECT MIN(created_at) FROM task_events WHERE task_id = NEW.id AND to_status = 'in_progress')"
+
+
+def _count_completion(event, sign):
+    return f'''
+    INSERT INTO task_flow_weekly (user_id, week, {', '.join(_FLOW_COLUMNS)})
+    SELECT e.user_id, {_week_of('e.')}, {sign}, {sign} * e.lead_seconds,
+           {sign} * IFNULL(e.cycle_seconds, 0), {sign} * (e.cycle_seconds IS NOT NULL),
+           {sign} * IFNULL(e.on_time, 0), {sign} * (e.on_time IS NOT NULL)
+    FROM task_events e
+    WHERE e.id = {event} AND e.lead_seconds IS NOT NULL AND typeof(e.user_id) = 'integer'
+    ON CONFLICT (user_id, week) DO UPDATE SET
+        {', '.join(f'{column} = {column} + excluded.{column}' for column in _FLOW_COLUMNS)};
+    '''
+
+
+TASK_EVENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS task_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        user_id INTEGER,
+        from_status TEXT,
+        to_status TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        lead_seconds INTEGER,
+        cycle_seconds INTEGER,
+        on_time INTEGER
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_task_events_task_status ON task_events (task_id, to_status)',
+    'CREATE INDEX IF NOT EXISTS idx_task_events_user_created ON task_events (user_id, created_at)',
+    f'''
+    CREATE TABLE IF NOT EXISTS task_flow_weekly (
+        user_id INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in _FLOW_COLUMNS)},
+        PRIMARY KEY (user_id, week)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_events_status
+    AFTER UPDATE OF status ON tasks
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO task_events (task_id, user_id, from_status, to_status,
+                                 lead_seconds, cycle_seconds, on_time)
+        VALUES (
+            NEW.id, NEW.assigned_to, OLD.status, NEW.status,
+            CASE WHEN NEW.status = 'completed' THEN {_seconds_since('NEW.created_at')} END,
+            CASE WHEN NEW.status = 'completed' THEN {_seconds_since(_FIRST_STARTED)} END,
+            CASE WHEN NEW.status = 'completed' AND NEW.deadline IS NOT NULL
+                 THEN date('now') <= NEW.deadline END
+        );
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_flow_completed
+    AFTER INSERT ON task_events
+    WHEN NEW.to_status = 'completed'
+    BEGIN {_count_completion('NEW.id', '1')} END
+    ''',
+    # Reopened: the task's latest completion no longer counts
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_task_flow_reopened
+    AFTER INSERT ON task_events
+    WHEN NEW.from_status = 'completed'
+    BEGIN
+        {_count_completion("(SELECT MAX(id) FROM task_events WHERE task_id = NEW.task_id AND to_status = 'completed')", '-1')}
+    END
+    ''',
+]
+
+
+# A deleted task leaves a 'deleted' event; from_status = 'completed' takes its
+# completion back out of the weekly sums through trg_task_flow_reopened
+TASK_DELETED_TRIGGER = '''
+CREATE TRIGGER IF NOT EXISTS trg_task_events_deleted
+AFTER DELETE ON tasks
+BEGIN
+    INSERT INTO task_events (task_id, user_id, from_status, to_status)
+    VALUES (OLD.id, OLD.assigned_to, OLD.status, 'deleted');
+END
+'''
+
+
+def _add_task_deletions(conn):
+    conn.execute(TASK_DELETED_TRIGGER)
+    # Tasks deleted before the trigger existed: close their history the same way
+    conn.execute('''
+    INSERT INTO task_events (task_id, user_id, from_status, to_status)
+    SELECT e.task_id, e.user_id, e.to_status, 'deleted'
+    FROM task_events e
+    WHERE e.id = (SELECT MAX(id) FROM task_events WHERE task_id = e.task_id)
+      AND e.to_status != 'deleted'
+      AND NOT EXISTS (SELECT 1 FROM tasks WHERE id = e.task_id)
+    ORDER BY e.id
+    ''')
+
+# Append-only change log read by incremental consumers (database.changefeed).
+# seq is AUTOINCREMENT, so it only ever grows, even after compaction deletes
+# the head of the log. Rows name what changed; consumers re-read the row
+# itself if they need more than its owner.
+def _log_change(entity, entity_id, op, user, team=None):
+    team = team or f'(SELECT team_id FROM users WHERE id = {user})'
+    return f'''
+    INSERT INTO change_log (entity, entity_id, op, user_id, team_id)
+    VALUES ('{entity}', {entity_id}, '{op}', {user}, {team});
+    '''
+
+
+def _owned_change_triggers(table, entity, owner):
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_{table}_{op}
+        AFTER {op.upper()} ON {table}
+        BEGIN {_log_change(entity, f'{row}.id', op, f'{row}.{owner}')} END
+        '''
+        for op, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD'))
+    ]
+
+
+CHANGE_LOG = [
+    '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        user_id INTEGER,
+        team_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS change_consumers (
+        name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    *_owned_change_triggers('tasks', 'task', 'assigned_to'),
+    *_owned_change_triggers('mood_entries', 'mood_entry', 'user_id'),
+    # Memberships: moving teams is a leave from the old team and a join to the new
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_change_log_users_insert
+    AFTER INSERT ON users
+    WHEN NEW.team_id IS NOT NULL
+    BEGIN {_log_change('membership', 'NEW.id', 'join', 'NEW.id', 'NEW.team_id')} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_change_log_users_delete
+    AFTER DELETE ON users
+    WHEN OLD.team_id IS NOT NULL
+    BEGIN {_log_change('membership', 'OLD.id', 'leave', 'OLD.id', 'OLD.team_id')} END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_change_log_users_move
+    AFTER UPDATE OF team_id ON users
+    WHEN OLD.team_id IS NOT NEW.team_id
+    BEGIN
+        INSERT INTO change_log (entity, entity_id, op, user_id, team_id)
+        SELECT 'membership', OLD.id, 'leave', OLD.id, OLD.team_id WHERE OLD.team_id IS NOT NULL
+        UNION ALL
+        SELECT 'membership', NEW.id, 'join', NEW.id, NEW.team_id WHERE NEW.team_id IS NOT NULL;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_change_log_users_role
+    AFTER UPDATE OF role ON users
+    WHEN OLD.role IS NOT NEW.role
+    BEGIN {_log_change('membership', 'NEW.id', 'update', 'NEW.id', 'NEW.team_id')} END
+    ''',
+]
+
+
+# Per-team sentiment vocabulary: phrases the text analyzer counts towards a
+# category on top of its built-in lexicon. The unique index doubles as the
+# lookup index for a team's whole lexicon.
+LEXICON_CATEGORIES = ('positive', 'negative', 'stress')
+
+TEAM_LEXICON = [
+    f'''
+    CREATE TABLE IF NOT EXISTS team_lexicon (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team_id INTEGER NOT NULL,
+        phrase TEXT NOT NULL,
+        category TEXT NOT NULL CHECK (category IN {LEXICON_CATEGORIES}),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (team_id) REFERENCES teams (id)
+    )
+    ''',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_team_lexicon_entry ON team_lexicon (team_id, phrase, category)',
+]
+
+
+MIGRATIONS = [
+    (1, 'base tables', BASE_TABLES),
+    (2, 'hot query indexes', HOT_QUERY_INDEXES),
+    (3, 'mood daily rollup', _create_mood_rollup),
+    (4, 'mood entry epoch day', _add_mood_created_day),
+    (5, 'team change counters', TEAM_CHANGES),
+    (6, 'task priority rank', TASK_PRIORITY_RANK),
+    (7, 'full-text search', FULL_TEXT_SEARCH),
+    (8, 'team codes', _add_team_codes),
+    (9, 'team directory', TEAM_DIRECTORY),
+    (10, 'task and member counters', _add_counters),
+    (11, 'task events', TASK_EVENTS),
+    (12, 'change log', CHANGE_LOG),
+    (13, 'team lexicon', TEAM_LEXICON),
+    (14, 'task deletions', _add_task_deletions),
+]
+
+
+def current_version(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations; returns the list of versions applied"""
+    applied = []
+
+    for version, name, step in migrations:
+        if version <= current_version(conn):
+            continue
+
+        # IMMEDIATE takes the write lock up front so two processes starting
+        # at the same time cannot both apply the same step
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= current_version(conn):
+                conn.rollback()
+                continue
+
+            if callable(step):
+                step(conn)
+            else:
+                for statement in step:
+                    conn.execute(statement)
+
+            conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)',
+                         (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+
+    if applied:
+        conn.execute('PRAGMA optimize')
+
+    return applied
+
+
+def schema_capabilities(conn):
+    """Map every table to the set of its column names"""
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+
+    return {
+        table: frozenset(col[1] for col in conn.execute(f'PRAGMA table_xinfo({table})'))
+        for table in tables
+    }
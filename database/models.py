@@ -1,148 +1,108 @@
+import os
+import json
 import sqlite3
 from datetime import datetime
-import hashlib
+import secrets
 import bcrypt
+from .cache import read_cache
+from .changes import ChangeMonitor
+from .connection import ConnectionPool
+from .migrations import migrate, schema_capabilities, rebuild_mood_rollup
+
+DB_NAME = os.environ.get('TEAM_OPTIMIZER_DB', 'team_optimizer.db')
+BUSY_TIMEOUT_MS = int(os.environ.get('TEAM_OPTIMIZER_BUSY_TIMEOUT_MS', '5000'))
+
+TEAM_CODE_PREFIX = 'TEAM-'
+# New codes are random; a clash with the unique index just draws again
+TEAM_CODE_ATTEMPTS = 5
+
+
+def normalize_team_code(team_code):
+    """Canonical form of a code as typed: trimmed, upper-case, with its prefix"""
+    team_code = (team_code or '').strip().upper()
+    if team_code and not team_code.startswith(TEAM_CODE_PREFIX):
+        team_code = TEAM_CODE_PREFIX + team_code
+    return team_code
 
 class Database:
-    def __init__(self, db_name='team_optimizer.db'):
+    def __init__(self, db_name=DB_NAME, busy_timeout_ms=BUSY_TIMEOUT_MS):
         self.db_name = db_name
+        self.pool = ConnectionPool(db_name, busy_timeout_ms=busy_timeout_ms)
+        self.changes = ChangeMonitor(db_name, busy_timeout_ms=busy_timeout_ms)
         self.init_db()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Borrow a pooled connection; close() hands it back to the pool"""
+        return self.pool.acquire()
+    
+    def connection(self):
+        """Context manager that borrows a pooled connection and commits on exit"""
+        return self.pool.connection()
+    
+    def on_commit(self, callback):
+        """Run callback after the current transaction commits"""
+        self.pool.on_commit(callback)
     
     def init_db(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            team_id INTEGER,
-            role TEXT DEFAULT 'member',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            allow_visual_tracking BOOLEAN DEFAULT 1
-        )
-        ''')
-        
-        # Teams table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS teams (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            created_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (created_by) REFERENCES users (id)
-        )
-        ''')
-        
-        # Mood entries table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS mood_entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            text_entry TEXT,
-            text_sentiment REAL,
-            visual_sentiment REAL,
-            combined_score REAL,
-            stress_level INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        ''')
-        
-        # Tasks table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            assigned_to INTEGER,
-            status TEXT DEFAULT 'todo',
-            priority TEXT DEFAULT 'medium',
-            deadline DATE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (assigned_to) REFERENCES users (id)
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Bring the schema up to date and record which columns exist"""
+        with self.connection() as conn:
+            migrate(conn)
+            self.capabilities = schema_capabilities(conn)
+    
+    def has_column(self, table, column):
+        return column in self.capabilities.get(table, ())
+    
+    def team_version(self, team_id):
+        """Change counter of a team; moves on any mood, task or membership write"""
+        return self.changes.team_version(team_id)
+    
+    def has_team_changed(self, team_id, since_version):
+        return self.changes.has_changed(team_id, since_version)
+    
+    def invalidate_membership(self, user_id, *team_ids):
+        """Drop cached reads for a user and the teams they moved between"""
+        tags = [('user', user_id)] + [('team', team_id) for team_id in team_ids]
+        self.on_commit(lambda: read_cache.invalidate(*tags))
+    
+    def rebuild_mood_rollup(self):
+        """Recompute the daily mood rollup from raw mood entries"""
+        with self.connection() as conn:
+            return rebuild_mood_rollup(conn)
     
     def get_team_by_code(self, team_code):
-        """Get team by team code - COMPATIBLE VERSION"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Check what columns actually exist
-        cursor.execute("PRAGMA table_info(teams)")
-        columns = [col[1] for col in cursor.fetchall()]
+        """Get an active team by its code (one lookup on the unique code index)"""
+        # Columns that exist were recorded once at startup
+        columns = self.capabilities['teams']
         
-        # Build query based on available columns
-        select_columns = []
-        
-        # Always available columns
-        select_columns.append("t.id")
-        select_columns.append("t.name")
-        select_columns.append("t.created_by")
-        select_columns.append("t.created_at")
-        select_columns.append("t.team_code")
-        select_columns.append("t.is_active")
+        select_columns = ['t.id', 't.name', 't.created_by', 't.created_at', 't.team_code']
         
         # Optional columns (check if they exist)
-        if 'description' in columns:
-            select_columns.append("t.description")
-        
-        if 'settings' in columns:
-            select_columns.append("t.settings")
-        
-        # Add admin info
-        select_columns.append("u.username as admin_name")
-        select_columns.append("u.email as admin_email")
+        for optional in ('is_active', 'description', 'settings'):
+            if optional in columns:
+                select_columns.append(f't.{optional}')
         
         query = f'''
-        SELECT {', '.join(select_columns)}
+        SELECT {', '.join(select_columns)},
+               u.username as admin_name, u.email as admin_email
         FROM teams t
         LEFT JOIN users u ON t.created_by = u.id
-        WHERE t.team_code = ? AND t.is_active = 1
+        WHERE t.team_code = ?
         '''
         
-        cursor.execute(query, (team_code,))
+        with self.connection() as conn:
+            cursor = conn.execute(query, (normalize_team_code(team_code),))
+            team = cursor.fetchone()
+            names = [desc[0] for desc in cursor.description]
         
-        team = cursor.fetchone()
-        conn.close()
+        if not team:
+            return None
         
-        if team:
-            # Map results to dictionary
-            result = {
-                'id': team[0],
-                'name': team[1],
-                'created_by': team[2],
-                'created_at': team[3],
-                'team_code': team[4],
-                'is_active': bool(team[5]),
-            }
-            
-            # Handle optional columns
-            idx = 6
-            if 'description' in columns:
-                result['description'] = team[idx]
-                idx += 1
-            
-            if 'settings' in columns:
-                result['settings'] = json.loads(team[idx]) if team[idx] else {}
-                idx += 1
-            
-            # Admin info
-            result['admin_name'] = team[idx]
-            result['admin_email'] = team[idx + 1]
-            
-            return result
-        return None
+        result = dict(zip(names, team))
+        result['is_active'] = bool(result.get('is_active', 1))
+        if 'settings' in result:
+            result['settings'] = json.loads(result['settings']) if result['settings'] else {}
+        
+        return result if result['is_active'] else None
 
     def hash_password(self, password):
         return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -152,29 +112,23 @@ class Database:
     
     # User management methods
     def create_user(self, username, email, password, team_id=None):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         password_hash = self.hash_password(password)
         
-        cursor.execute('''
-        INSERT INTO users (username, email, password_hash, team_id)
-        VALUES (?, ?, ?, ?)
-        ''', (username, email, password_hash, team_id))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        conn.close()
+        with self.connection() as conn:
+            user_id = conn.execute('''
+            INSERT INTO users (username, email, password_hash, team_id)
+            VALUES (?, ?, ?, ?)
+            ''', (username, email, password_hash, team_id)).lastrowid
+            if team_id:
+                self.invalidate_membership(user_id, team_id)
         
         return user_id
     
     def authenticate_user(self, email, password):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id, username, email, password_hash, team_id, role FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            user = conn.execute(
+                'SELECT id, username, email, password_hash, team_id, role FROM users WHERE email = ?', (email,)
+            ).fetchone()
         
         if user and self.verify_password(password, user[3]):
             return {
@@ -185,85 +139,62 @@ class Database:
                 'role': user[5]
             }
         return None
+
     def create_team(self, team_name, created_by):
-        """Create a new team and return team info"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """Create a team with a fresh code, move its creator into it and return team info"""
         try:
-            cursor.execute('INSERT INTO teams (name, created_by) VALUES (?, ?)', 
-                        (team_name, created_by))
-            team_id = cursor.lastrowid
-            
-            # Update user's team_id
-            cursor.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, created_by))
-            
-            conn.commit()
-            
-            # Generate team code
-            team_code = self.generate_team_code(team_id)
-            
-            return {
-                'success': True,
-                'team_id': team_id,
-                'team_name': team_name,
-                'team_code': team_code
-            }
-            
-        except Exception as e:
-            conn.rollback()
+            with self.connection() as conn:
+                for attempt in range(TEAM_CODE_ATTEMPTS):
+                    team_code = self.generate_team_code()
+                    try:
+                        team_id = conn.execute(
+                            'INSERT INTO teams (name, created_by, team_code) VALUES (?, ?, ?)',
+                            (team_name, created_by, team_code)
+                        ).lastrowid
+                        break
+                    except sqlite3.IntegrityError:
+                        if attempt == TEAM_CODE_ATTEMPTS - 1:
+                            raise
+                
+                # Update user's team_id
+                conn.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, created_by))
+                self.invalidate_membership(created_by, team_id)
+        except sqlite3.Error as e:
             return {
                 'success': False,
                 'error': str(e)
             }
-        finally:
-            conn.close()
+        
+        return {
+            'success': True,
+            'team_id': team_id,
+            'team_name': team_name,
+            'team_code': team_code
+        }
+
     def add_user_to_team(self, user_id, team_code):
         """Add an existing user to a team using team code"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        team = self.get_team_by_code(team_code)
+        if not team:
+            return False, "Team not found"
         
         try:
-            # Get team by code (we'll use team ID as code for now)
-            cursor.execute('SELECT id FROM teams WHERE id = ?', (team_code,))
-            team = cursor.fetchone()
-            
-            if not team:
-                return False, "Team not found"
-            
-            team_id = team[0]
-            
-            # Update user's team
-            cursor.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, user_id))
-            
-            # Check if user was already in a team
-            cursor.execute('SELECT team_id FROM users WHERE id = ?', (user_id,))
-            old_team = cursor.fetchone()
-            
-            conn.commit()
-            
-            return True, f"Successfully joined team {team_id}"
-            
-        except Exception as e:
-            conn.rollback()
+            self.set_user_team(user_id, team['id'])
+        except sqlite3.Error as e:
             return False, str(e)
-        finally:
-            conn.close()
+        
+        return True, f"Successfully joined team {team['name']}"
 
     def get_team_by_id(self, team_id):
         """Get team information by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT t.*, u.username as admin_name 
-            FROM teams t
-            LEFT JOIN users u ON t.created_by = u.id
-            WHERE t.id = ?
-        ''', (team_id,))
-        
-        team = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            team = conn.execute('''
+                SELECT t.id, t.name, t.created_by, t.created_at, t.team_code,
+                       u.username as admin_name 
+                FROM teams t
+                LEFT JOIN users u ON t.created_by = u.id
+                WHERE t.id = ?
+            ''', (team_id,)).fetchone()
         
         if team:
             return {
@@ -271,63 +202,62 @@ class Database:
                 'name': team[1],
                 'created_by': team[2],
                 'created_at': team[3],
-                'admin_name': team[4]
+                'team_code': team[4],
+                'admin_name': team[5]
             }
         return None
 
-    def generate_team_code(self, team_id):
-        """Generate a shareable team code"""
-        import hashlib
-        # Simple hash-based code
-        code = hashlib.md5(f"team{team_id}".encode()).hexdigest()[:8].upper()
-        return f"TEAM-{code}"
+    def generate_team_code(self):
+        """Draw a new shareable team code; create_team stores it once"""
+        return f"{TEAM_CODE_PREFIX}{secrets.token_hex(4).upper()}"
 
     def remove_user_from_team(self, user_id):
         """Remove user from their team"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('UPDATE users SET team_id = NULL WHERE id = ?', (user_id,))
-            conn.commit()
+            self.set_user_team(user_id, None)
             return True
         except Exception as e:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
+
+    def set_user_team(self, user_id, team_id):
+        """Move a user into a team (or out of one with team_id=None)"""
+        with self.connection() as conn:
+            old_team = conn.execute('SELECT team_id FROM users WHERE id = ?', (user_id,)).fetchone()
+            conn.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, user_id))
+            self.invalidate_membership(user_id, team_id, old_team[0] if old_team else None)
+
+    def update_user_role(self, user_id, role):
+        """Change a user's role within their team"""
+        with self.connection() as conn:
+            team = conn.execute('SELECT team_id FROM users WHERE id = ?', (user_id,)).fetchone()
+            conn.execute('UPDATE users SET role = ? WHERE id = ?', (role, user_id))
+            self.invalidate_membership(user_id, team[0] if team else None)
 
     def get_user_team_info(self, user_id):
         """Get user's team information"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT t.id, t.name, t.created_at, u.username as admin_name
-            FROM teams t
-            JOIN users u ON t.created_by = u.id
-            WHERE t.id = (SELECT team_id FROM users WHERE id = ?)
-        ''', (user_id,))
-        
-        team = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            team = conn.execute('''
+                SELECT t.id, t.name, t.created_at, u.username as admin_name, t.team_code
+                FROM teams t
+                JOIN users u ON t.created_by = u.id
+                WHERE t.id = (SELECT team_id FROM users WHERE id = ?)
+            ''', (user_id,)).fetchone()
         
         if team:
             return {
                 'id': team[0],
                 'name': team[1],
                 'created_at': team[2],
-                'admin_name': team[3]
+                'admin_name': team[3],
+                'team_code': team[4]
             }
         return None
     
     def get_user_by_id(self, user_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id, username, email, team_id, role FROM users WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            user = conn.execute(
+                'SELECT id, username, email, team_id, role FROM users WHERE id = ?', (user_id,)
+            ).fetchone()
         
         if user:
             return {
@@ -338,22 +268,7 @@ class Database:
                 'role': user[4]
             }
         return None
-    
-    def create_team(self, team_name, created_by):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('INSERT INTO teams (name, created_by) VALUES (?, ?)', (team_name, created_by))
-        team_id = cursor.lastrowid
-        
-        # Update user's team_id
-        cursor.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, created_by))
-        
-        conn.commit()
-        conn.close()
-        
-        return team_id
-    
+
 
 # Singleton instance
 db = Database()
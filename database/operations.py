@@ -1,81 +1,401 @@
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+import re
+import string
+import sys
+import time
+import numpy as np
 import pandas as pd
 from .models import db
+from .cache import ReadCache, read_cache, cached
+from .migrations import owner_token, LEXICON_CATEGORIES
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def epoch_day(day=None):
+    """Days since 1970-01-01, the unit of mood_entries.created_day (UTC)"""
+    if day is None:
+        day = datetime.now(timezone.utc).date()
+    elif isinstance(day, datetime):
+        day = day.date()
+    return day.toordinal() - EPOCH_ORDINAL
+
+# Statements shared by the single-purpose getters and the dashboard snapshot.
+# All take named parameters: user_id, team_id, since_day, today.
+TEAM_MOOD_QUERY = '''
+SELECT 
+    SUM(r.mood_sum) / SUM(r.mood_count) as avg_team_mood,
+    SUM(r.stress_sum) / SUM(r.stress_count) as avg_team_stress,
+    COUNT(DISTINCT r.user_id) as active_members
+FROM mood_daily_rollup r
+JOIN users u ON r.user_id = u.id
+WHERE u.team_id = :team_id
+  AND r.day >= :since_day
+'''
+
+# Task and member counts come from the trigger-maintained counter tables
+# (migrations.TASK_COUNTERS): one primary-key row each. The aggregates only
+# turn "no row yet" into a row of NULLs.
+TEAM_TASK_QUERY = '''
+SELECT 
+    SUM(total_tasks) as total_tasks,
+    SUM(completed_tasks) as completed_tasks,
+    SUM(members_with_tasks) as members_with_tasks
+FROM team_counts
+WHERE team_id = :team_id
+'''
+
+TEAM_MEMBER_COUNT_QUERY = '''
+SELECT IFNULL(SUM(members), 0) as total_members FROM team_counts WHERE team_id = :team_id
+'''
+
+TASK_STATS_QUERY = '''
+SELECT 
+    SUM(total) as total_tasks,
+    SUM(completed) as completed,
+    SUM(in_progress) as in_progress,
+    SUM(todo) as todo,
+    SUM(urgent) as urgent
+FROM user_task_counts 
+WHERE user_id = :user_id
+'''
+
+TODAY_MOOD_QUERY = '''
+SELECT 
+    mood_sum / mood_count as avg_mood_today,
+    stress_sum / stress_count as avg_stress_today,
+    entries as entries_today
+FROM mood_daily_rollup 
+WHERE user_id = :user_id 
+  AND day = :today
+'''
+
+DASHBOARD_QUERY = f'''
+WITH team_mood AS ({TEAM_MOOD_QUERY}),
+     team_tasks AS ({TEAM_TASK_QUERY}),
+     team_members AS ({TEAM_MEMBER_COUNT_QUERY}),
+     my_tasks AS ({TASK_STATS_QUERY})
+SELECT team_mood.*, team_tasks.*, team_members.*, my_tasks.*, today.*
+FROM team_mood, team_tasks, team_members, my_tasks
+LEFT JOIN ({TODAY_MOOD_QUERY}) today
+'''
+
+
+# Completions per user and week, kept by the triggers in
+# migrations.TASK_EVENTS. Weeks are the epoch day of their Monday.
+TASK_FLOW_QUERY = '''
+SELECT week, completed, lead_seconds, cycle_seconds, cycle_count, on_time, with_deadline
+FROM task_flow_weekly
+WHERE user_id = ? AND week >= ?
+ORDER BY week
+'''
+
+
+def week_of(day):
+    """Epoch day of the Monday starting the week of an epoch day"""
+    return day - (day + 3) % 7
+
+
+# Task lists are ordered by (priority rank, deadline, id) and paged by keyset:
+# the next page starts strictly after the last row of the previous one, so a
+# page costs the same no matter how deep into the list it is. priority_rank
+# and deadline_key are generated columns (see migrations.TASK_PRIORITY_RANK)
+# covered by the task indexes.
+TASK_COLUMNS = '''
+    t.id, t.title, t.description, t.assigned_to, t.status, t.priority,
+    t.deadline, t.created_at, u.username AS assigned_name,
+    t.priority_rank, t.deadline_key
+'''
+
+TASK_ORDER = 't.priority_rank, t.deadline_key, t.id'
+TASK_AFTER = ' AND (t.priority_rank, t.deadline_key, t.id) > (?, ?, ?)'
+
+
+def task_cursor(task):
+    """Keyset cursor that fetches the tasks listed after `task`"""
+    return (task['priority_rank'], task['deadline_key'], task['id'])
+
+
+def _page_tasks(query, params, after, page_size):
+    """Append the keyset condition, ordering and page size to a task query"""
+    params = list(params)
+    if after:
+        query += TASK_AFTER
+        params.extend(after)
+    
+    query += f" ORDER BY {TASK_ORDER}"
+    
+    if page_size:
+        query += " LIMIT ?"
+        params.append(page_size)
+    
+    return query, params
+
+
+# The team directory is ordered by (name NOCASE, id) and paged by keyset
+# like the task lists. A name search is a prefix range on the same index
+# (migrations.TEAM_DIRECTORY), so any page costs the same however many teams
+# exist. Only the range's lower bound is given to SQLite: with several it
+# may seek on the wrong one and walk the index from the start.
+TEAM_DIRECTORY_PAGE_SIZE = 20
+
+TEAM_DIRECTORY_QUERY = '''
+SELECT t.id, t.name, t.created_at, u.username AS admin_name,
+       IFNULL(c.members, 0) AS member_count
+FROM teams t
+LEFT JOIN users u ON t.created_by = u.id
+LEFT JOIN team_counts c ON c.team_id = t.id
+WHERE t.name >= :low COLLATE NOCASE
+'''
+
+TEAM_NAME_BEFORE = ' AND t.name < :high COLLATE NOCASE'
+TEAM_AFTER = ' AND (t.name COLLATE NOCASE, t.id) > (:after_name, :after_id)'
+TEAM_ORDER = 't.name COLLATE NOCASE, t.id'
+
+# NOCASE only folds ASCII letters, so prefixes are folded the same way
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def team_cursor(team):
+    """Keyset cursor that fetches the teams listed after `team`"""
+    return (team['name'], team['id'])
+
+
+def name_prefix_range(prefix):
+    """(low, high) bounds of the names starting with prefix under NOCASE"""
+    low = prefix.translate(_NOCASE)
+    last = ord(low[-1])
+    if last == sys.maxunicode:
+        return low, None
+    return low, low[:-1] + chr(last + 1)
+
+
+# Full-text search over the FTS5 indexes from migrations.FULL_TEXT_SEARCH.
+# The owner clause is part of MATCH, so FTS5 only ranks the caller's rows
+# and ORDER BY rank ... LIMIT stops after the best `limit` of them.
+SEARCH_KINDS = ('mood', 'task')
+SEARCH_MARK = '**'
+
+SEARCH_QUERIES = {
+    'mood': '''
+    SELECT 'mood' AS kind, m.id, m.created_at,
+           snippet(mood_entries_fts, 0, :mark, :mark, '…', 16) AS snippet,
+           m.combined_score, m.stress_level, {score} AS score
+    FROM mood_entries_fts f
+    JOIN mood_entries m ON m.id = f.rowid
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT :limit
+    ''',
+    'task': '''
+    SELECT 'task' AS kind, t.id, t.created_at,
+           highlight(tasks_fts, 0, :mark, :mark) AS title,
+           snippet(tasks_fts, 1, :mark, :mark, '…', 16) AS snippet,
+           t.status, t.priority, t.deadline, u.username AS assigned_name,
+           {score} AS score
+    FROM tasks_fts f
+    JOIN tasks t ON t.id = f.rowid
+    LEFT JOIN users u ON t.assigned_to = u.id
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT :limit
+    ''',
+}
+
+# Columns each kind is matched against
+SEARCH_COLUMNS = {'mood': 'text_entry', 'task': 'title description'}
+SEARCH_TABLES = {'mood': 'mood_entries_fts', 'task': 'tasks_fts'}
+
+# bm25 sizes up every term by counting all the rows that contain it, across
+# the whole index, so a word found in most rows costs tens of milliseconds at
+# a million rows however few of them the caller owns. FTS5 already gives a
+# word in at least half the rows no weight (its IDF is clamped to ~0), so
+# such words only filter: the rows are ranked on the other words, or listed
+# newest first if every word is that common. Row counts per word are cached;
+# indexes smaller than SEARCH_COMMON_MIN_ROWS are always ranked in full.
+SEARCH_COMMON_SHARE = 0.5
+SEARCH_COMMON_MIN_ROWS = 50_000
+SEARCH_TERM_TTL_SECONDS = 600
+search_term_counts = ReadCache(ttl=SEARCH_TERM_TTL_SECONDS)
+
+
+def search_words(text):
+    """The words of free text a search requires"""
+    return re.findall(r'\w+', text or '')
+
+
+def search_terms(words):
+    """FTS5 query requiring every one of the words.
+
+    Words are quoted, so operators and punctuation typed by the user are
+    never parsed as FTS5 syntax; the porter tokenizer still lets
+    "deadlines" find "deadline".
+    """
+    return ' '.join(f'"{word}"' for word in words)
+
+
+# Rows per transaction in create_mood_entries_bulk
+BULK_CHUNK_SIZE = 5000
+
+BULK_MOOD_INSERT = '''
+INSERT INTO mood_entries
+(user_id, text_entry, text_sentiment, visual_sentiment, combined_score, stress_level, created_at)
+VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+
+def combined_scores(text_sentiment, visual_sentiment):
+    """Vectorised create_mood_entry rule: mean of the scores given, else 5.0"""
+    text = np.asarray(text_sentiment, dtype=float)
+    visual = np.asarray(visual_sentiment, dtype=float)
+    # Like the scalar version, a missing (None/NaN) or zero score counts as absent
+    has_text = np.nan_to_num(text) != 0
+    has_visual = np.nan_to_num(visual) != 0
+    
+    return np.where(has_text & has_visual, (text + visual) / 2,
+                    np.where(has_text, text,
+                             np.where(has_visual, visual, 5.0)))
+
+
+@dataclass
+class DashboardSnapshot:
+    """Everything the sidebar and the dashboard page render"""
+    team_stats: dict
+    task_stats: dict
+    today_mood: dict
+    team_mood_summary: list = field(default_factory=list)
+    active_tasks: list = field(default_factory=list)
+    mood_history: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def _team_stats(mood_stats, task_stats, member_count):
+    return {
+        'avg_mood': round(mood_stats[0], 1) if mood_stats and mood_stats[0] else 0,
+        'avg_stress': round(mood_stats[1], 1) if mood_stats and mood_stats[1] else 0,
+        'active_members': mood_stats[2] if mood_stats and mood_stats[2] else 0,
+        'total_tasks': task_stats[0] if task_stats and task_stats[0] else 0,
+        'completed_tasks': task_stats[1] if task_stats and task_stats[1] else 0,
+        'members_with_tasks': task_stats[2] if task_stats and task_stats[2] else 0,
+        'total_members': member_count if member_count else 0,
+        'completion_rate': round((task_stats[1] / task_stats[0] * 100), 1) if task_stats and task_stats[0] and task_stats[0] > 0 else 0
+    }
+
+
+def _task_stats(result):
+    if not result or result[0] == 0:
+        return {
+            'total': 0,
+            'completed': 0,
+            'in_progress': 0,
+            'todo': 0,
+            'urgent': 0,
+            'completion_rate': 0
+        }
+    
+    total = result[0] if result[0] else 0
+    completed = result[1] if result[1] else 0
+    
+    return {
+        'total': total,
+        'completed': completed,
+        'in_progress': result[2] if result[2] else 0,
+        'todo': result[3] if result[3] else 0,
+        'urgent': result[4] if result[4] else 0,
+        'completion_rate': round((completed / total) * 100, 1) if total > 0 else 0
+    }
+
+
+def _today_mood_stats(result):
+    if result and result[0]:
+        return {
+            'avg_mood': round(result[0], 1),
+            'avg_stress': round(result[1], 1) if result[1] else 0,
+            'entries': result[2] if result[2] else 0
+        }
+    else:
+        return {
+            'avg_mood': None,
+            'avg_stress': None,
+            'entries': 0
+        }
 
 class DatabaseOperations:
-    def __init__(self):
-        self.db = db
+    def __init__(self, database=None, cache=None):
+        self.db = database or db
+        self.cache = cache or read_cache
+    
+    def _invalidate_user(self, conn, user_id, *team_ids):
+        """Evict cached reads for a user, their current team and any given teams"""
+        row = conn.execute('SELECT team_id FROM users WHERE id = ?', (user_id,)).fetchone()
+        teams = set(team_ids) | {row[0] if row else None}
+        tags = [('user', user_id)] + [('team', team) for team in teams]
+        
+        # After commit, so a concurrent reader cannot re-cache the old rows
+        self.db.on_commit(lambda: self.cache.invalidate(*tags))
+    
+    def _invalidate_task(self, conn, task_id):
+        row = conn.execute('SELECT assigned_to FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        if row:
+            self._invalidate_user(conn, row[0])
     
     # ========== MOOD OPERATIONS ==========
     def add_team_member(self, team_id, email, role='member'):
         """Add a member to team by email"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # Find user by email
-            cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-            user = cursor.fetchone()
-            
-            if not user:
-                return False, "User not found"
-            
-            user_id = user[0]
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Find user by email
+                cursor.execute('SELECT id, team_id FROM users WHERE email = ?', (email,))
+                user = cursor.fetchone()
+                
+                if not user:
+                    return False, "User not found"
+                
+                user_id, existing_team = user
+                
+                # Check if already in a team
+                if existing_team:
+                    return False, "User is already in a team"
+                
+                # Add to team
+                cursor.execute('UPDATE users SET team_id = ?, role = ? WHERE id = ?', 
+                            (team_id, role, user_id))
+                self._invalidate_user(conn, user_id)
             
-            # Check if already in a team
-            cursor.execute('SELECT team_id FROM users WHERE id = ?', (user_id,))
-            existing_team = cursor.fetchone()
-            
-            if existing_team and existing_team[0]:
-                return False, "User is already in a team"
-            
-            # Add to team
-            cursor.execute('UPDATE users SET team_id = ?, role = ? WHERE id = ?', 
-                        (team_id, role, user_id))
-            
-            conn.commit()
             return True, f"Successfully added user to team"
             
         except Exception as e:
-            conn.rollback()
             return False, str(e)
-        finally:
-            conn.close()
 
     def get_team_invite_info(self, team_id):
         """Get team info for invitations"""
-        conn = self.db.get_connection()
-        
         query = '''
         SELECT t.name, u.username as admin_name, u.email as admin_email,
-            COUNT(DISTINCT u2.id) as member_count
+            IFNULL(c.members, 0) as member_count, t.team_code
         FROM teams t
         LEFT JOIN users u ON t.created_by = u.id
-        LEFT JOIN users u2 ON u2.team_id = t.id
+        LEFT JOIN team_counts c ON c.team_id = t.id
         WHERE t.id = ?
-        GROUP BY t.id, t.name, u.username, u.email
         '''
         
-        cursor = conn.cursor()
-        cursor.execute(query, (team_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            result = conn.execute(query, (team_id,)).fetchone()
         
         if result:
             return {
                 'name': result[0],
                 'admin_name': result[1],
                 'admin_email': result[2],
-                'member_count': result[3]
+                'member_count': result[3],
+                'team_code': result[4]
             }
         return None
     
     def create_mood_entry(self, user_id, text_entry=None, text_sentiment=None, 
                          visual_sentiment=None, stress_level=5):
         """Create a new mood entry"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         # Calculate combined score if both available
         if text_sentiment and visual_sentiment:
             combined_score = (text_sentiment + visual_sentiment) / 2
@@ -86,61 +406,104 @@ class DatabaseOperations:
         else:
             combined_score = 5.0
         
-        cursor.execute('''
-        INSERT INTO mood_entries 
-        (user_id, text_entry, text_sentiment, visual_sentiment, combined_score, stress_level)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, text_entry, text_sentiment, visual_sentiment, combined_score, stress_level))
-        
-        conn.commit()
-        entry_id = cursor.lastrowid
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.execute('''
+            INSERT INTO mood_entries 
+            (user_id, text_entry, text_sentiment, visual_sentiment, combined_score, stress_level)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, text_entry, text_sentiment, visual_sentiment, combined_score, stress_level))
+            entry_id = cursor.lastrowid
+            self._invalidate_user(conn, user_id)
         
         return entry_id
     
+    def create_mood_entries_bulk(self, entries, chunk_size=BULK_CHUNK_SIZE):
+        """Insert mood entries from any iterable of dicts, one transaction per chunk.
+        
+        Each dict takes the create_mood_entry arguments plus an optional
+        created_at for historical imports. Rollup and change-counter triggers
+        fire per row, so dashboards stay consistent. Returns the inserted
+        count, the id ranges written and the throughput.
+        """
+        entries = iter(entries)
+        inserted = 0
+        id_ranges = []
+        started = time.perf_counter()
+        
+        while True:
+            chunk = list(islice(entries, chunk_size))
+            if not chunk:
+                break
+            
+            scores = combined_scores(
+                [entry.get('text_sentiment') for entry in chunk],
+                [entry.get('visual_sentiment') for entry in chunk]
+            )
+            rows = [
+                (entry['user_id'], entry.get('text_entry'), entry.get('text_sentiment'),
+                 entry.get('visual_sentiment'), float(score), entry.get('stress_level', 5),
+                 entry.get('created_at'))
+                for entry, score in zip(chunk, scores)
+            ]
+            
+            with self.db.connection() as conn:
+                conn.executemany(BULK_MOOD_INSERT, rows)
+                # The chunk holds the write lock, so its AUTOINCREMENT ids are contiguous
+                last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                for user_id in {row[0] for row in rows}:
+                    self._invalidate_user(conn, user_id)
+            
+            first_id = last_id - len(rows) + 1
+            if id_ranges and id_ranges[-1][1] == first_id - 1:
+                id_ranges[-1] = (id_ranges[-1][0], last_id)
+            else:
+                id_ranges.append((first_id, last_id))
+            inserted += len(rows)
+        
+        seconds = time.perf_counter() - started
+        return {
+            'inserted': inserted,
+            'id_ranges': id_ranges,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(inserted / seconds) if seconds > 0 else 0
+        }
+    
     def get_user_mood_history(self, user_id, days=30):
         """Get mood history for a user"""
-        conn = self.db.get_connection()
-        
-        query = f'''
-        SELECT date(created_at) as date, 
-               AVG(combined_score) as avg_mood,
-               AVG(stress_level) as avg_stress,
-               COUNT(*) as entries
-        FROM mood_entries 
+        query = '''
+        SELECT date(day * 86400, 'unixepoch') as date, 
+               mood_sum / mood_count as avg_mood,
+               stress_sum / stress_count as avg_stress,
+               entries
+        FROM mood_daily_rollup 
         WHERE user_id = ? 
-          AND created_at >= date('now', '-{days} days')
-        GROUP BY date(created_at)
-        ORDER BY date DESC
+          AND day >= ?
+        ORDER BY day DESC
         '''
         
-        df = pd.read_sql_query(query, conn, params=(user_id,))
-        conn.close()
+        with self.db.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(user_id, epoch_day() - int(days)))
         
         return df
     
     def get_team_mood_summary(self, team_id):
         """Get team mood summary for dashboard"""
-        conn = self.db.get_connection()
-        
         query = '''
         SELECT 
             u.username,
-            AVG(me.combined_score) as avg_mood,
-            AVG(me.stress_level) as avg_stress,
-            COUNT(me.id) as total_entries,
-            MAX(me.created_at) as last_entry
+            SUM(r.mood_sum) / SUM(r.mood_count) as avg_mood,
+            SUM(r.stress_sum) / SUM(r.stress_count) as avg_stress,
+            SUM(r.entries) as total_entries,
+            MAX(r.last_entry_at) as last_entry
         FROM users u
-        LEFT JOIN mood_entries me ON u.id = me.user_id
+        JOIN mood_daily_rollup r ON u.id = r.user_id
         WHERE u.team_id = ? 
-          AND me.created_at >= date('now', '-7 days')
+          AND r.day >= ?
         GROUP BY u.id, u.username
         '''
         
-        cursor = conn.cursor()
-        cursor.execute(query, (team_id,))
-        results = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            results = conn.execute(query, (team_id, epoch_day() - 7)).fetchall()
         
         return [
             {
@@ -155,76 +518,48 @@ class DatabaseOperations:
     
     def get_today_mood_stats(self, user_id):
         """Get today's mood stats for a user"""
-        conn = self.db.get_connection()
+        with self.db.connection() as conn:
+            result = conn.execute(TODAY_MOOD_QUERY, {'user_id': user_id, 'today': epoch_day()}).fetchone()
         
-        query = '''
-        SELECT 
-            AVG(combined_score) as avg_mood_today,
-            AVG(stress_level) as avg_stress_today,
-            COUNT(*) as entries_today
-        FROM mood_entries 
-        WHERE user_id = ? 
-          AND date(created_at) = date('now')
-        '''
-        
-        cursor = conn.cursor()
-        cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result and result[0]:
-            return {
-                'avg_mood': round(result[0], 1),
-                'avg_stress': round(result[1], 1) if result[1] else 0,
-                'entries': result[2] if result[2] else 0
-            }
-        else:
-            return {
-                'avg_mood': None,
-                'avg_stress': None,
-                'entries': 0
-            }
+        return _today_mood_stats(result)
     
     # ========== TASK OPERATIONS ==========
     def create_task(self, title, description, assigned_to=None, 
                    priority='medium', deadline=None):
         """Create a new task"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO tasks (title, description, assigned_to, priority, deadline)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (title, description, assigned_to, priority, deadline))
-        
-        conn.commit()
-        task_id = cursor.lastrowid
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.execute('''
+            INSERT INTO tasks (title, description, assigned_to, priority, deadline)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (title, description, assigned_to, priority, deadline))
+            task_id = cursor.lastrowid
+            if assigned_to:
+                self._invalidate_user(conn, assigned_to)
         
         return task_id
     
-    def get_user_tasks(self, user_id, status_filter=None):
-        """Get tasks for a user"""
-        conn = self.db.get_connection()
-        
-        query = '''
-        SELECT t.*, u.username as assigned_name
+    def get_user_tasks(self, user_id, status_filter=None, page_size=None, after=None):
+        """Get a page of tasks for a user; pass task_cursor(last task) as `after` for the next"""
+        query = f'''
+        SELECT {TASK_COLUMNS}
         FROM tasks t
         LEFT JOIN users u ON t.assigned_to = u.id
         WHERE t.assigned_to = ?
         '''
+        params = [user_id]
         
         if status_filter:
-            query += f" AND t.status = '{status_filter}'"
-        
-        query += " ORDER BY t.priority DESC, t.deadline ASC"
+            query += " AND t.status = ?"
+            params.append(status_filter)
         
-        cursor = conn.cursor()
-        cursor.execute(query, (user_id,))
+        query, params = _page_tasks(query, params, after, page_size)
         
-        columns = [desc[0] for desc in cursor.description]
-        tasks = []
-        rows = cursor.fetchall()
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            
+            columns = [desc[0] for desc in cursor.description]
+            tasks = []
+            rows = cursor.fetchall()
         
         for row in rows:
             task_dict = {}
@@ -232,34 +567,25 @@ class DatabaseOperations:
                 task_dict[col] = row[i]
             tasks.append(task_dict)
         
-        conn.close()
         return tasks
     
-    def get_team_tasks(self, team_id):
-        """Get all tasks for a team"""
-        conn = self.db.get_connection()
-        
-        query = '''
-        SELECT t.*, u.username as assigned_name
+    @cached('team')
+    def get_team_tasks(self, team_id, page_size=None, after=None):
+        """Get a page of tasks for a team; pass task_cursor(last task) as `after` for the next"""
+        query = f'''
+        SELECT {TASK_COLUMNS}
         FROM tasks t
         JOIN users u ON t.assigned_to = u.id
         WHERE u.team_id = ?
-        ORDER BY 
-            CASE t.priority 
-                WHEN 'urgent' THEN 1
-                WHEN 'high' THEN 2
-                WHEN 'medium' THEN 3
-                WHEN 'low' THEN 4
-            END,
-            t.deadline ASC
         '''
+        query, params = _page_tasks(query, [team_id], after, page_size)
         
-        cursor = conn.cursor()
-        cursor.execute(query, (team_id,))
-        
-        columns = [desc[0] for desc in cursor.description]
-        tasks = []
-        rows = cursor.fetchall()
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            
+            columns = [desc[0] for desc in cursor.description]
+            tasks = []
+            rows = cursor.fetchall()
         
         for row in rows:
             task_dict = {}
@@ -267,78 +593,170 @@ class DatabaseOperations:
                 task_dict[col] = row[i]
             tasks.append(task_dict)
         
-        conn.close()
         return tasks
     
     def update_task_status(self, task_id, new_status):
         """Update task status"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', (new_status, task_id))
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            conn.execute('UPDATE tasks SET status = ? WHERE id = ?', (new_status, task_id))
+            self._invalidate_task(conn, task_id)
         
         return True
     
     def delete_task(self, task_id):
         """Delete a task"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            self._invalidate_task(conn, task_id)
+            conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
         
         return True
     
     def get_task_stats(self, user_id):
         """Get task statistics for dashboard"""
-        conn = self.db.get_connection()
+        with self.db.connection() as conn:
+            result = conn.execute(TASK_STATS_QUERY, {'user_id': user_id}).fetchone()
         
-        query = '''
-        SELECT 
-            COUNT(*) as total_tasks,
-            SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-            SUM(CASE WHEN status = 'in_progress' THEN 1 ELSE 0 END) as in_progress,
-            SUM(CASE WHEN status = 'todo' THEN 1 ELSE 0 END) as todo,
-            SUM(CASE WHEN priority = 'urgent' THEN 1 ELSE 0 END) as urgent
-        FROM tasks 
-        WHERE assigned_to = ?
-        '''
+        return _task_stats(result)
+    
+    def get_task_flow(self, user_id, weeks=12):
+        """Cycle time, lead time, on-time rate and weekly throughput of a user's
+        completions over the last `weeks` weeks (including this one)"""
+        since = week_of(epoch_day()) - 7 * (weeks - 1)
         
-        cursor = conn.cursor()
-        cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            rows = conn.execute(TASK_FLOW_QUERY, (user_id, since)).fetchall()
         
-        if not result or result[0] == 0:
-            return {
-                'total': 0,
-                'completed': 0,
-                'in_progress': 0,
-                'todo': 0,
-                'urgent': 0,
-                'completion_rate': 0
-            }
+        weekly = pd.DataFrame(rows, columns=['week', 'completed', 'lead_seconds', 'cycle_seconds',
+                                             'cycle_count', 'on_time', 'with_deadline'])
+        totals = {column: int(total) for column, total in weekly.sum().items()}
+        completed = totals['completed']
         
-        total = result[0] if result[0] else 0
-        completed = result[1] if result[1] else 0
+        # Every week of the window, including those without completions
+        throughput = (weekly.set_index('week')['completed']
+                      .reindex(range(since, since + 7 * weeks, 7), fill_value=0))
+        throughput.index = [date.fromordinal(EPOCH_ORDINAL + week) for week in throughput.index]
         
         return {
-            'total': total,
             'completed': completed,
-            'in_progress': result[2] if result[2] else 0,
-            'todo': result[3] if result[3] else 0,
-            'urgent': result[4] if result[4] else 0,
-            'completion_rate': round((completed / total) * 100, 1) if total > 0 else 0
+            'avg_lead_days': round(totals['lead_seconds'] / completed / 86400, 1) if completed else None,
+            'avg_cycle_days': (round(totals['cycle_seconds'] / totals['cycle_count'] / 86400, 1)
+                               if totals['cycle_count'] else None),
+            'on_time_rate': (round(totals['on_time'] / totals['with_deadline'] * 100, 1)
+                             if totals['with_deadline'] else None),
+            'throughput': throughput.rename_axis('week').rename('completed').reset_index()
         }
     
+    # ========== SEARCH ==========
+    def _rare_search_words(self, conn, kind, words):
+        """The words found in less than SEARCH_COMMON_SHARE of a kind's indexed rows"""
+        fts = SEARCH_TABLES[kind]
+        rows = search_term_counts.get_or_load(
+            (self.db.db_name, kind), [],
+            # One docsize row per indexed row: the row count bm25 itself uses
+            lambda: conn.execute(f'SELECT COUNT(*) FROM {fts}_docsize').fetchone()[0]
+        )
+        if rows < SEARCH_COMMON_MIN_ROWS:
+            return words
+        
+        def hits(word):
+            return search_term_counts.get_or_load(
+                (self.db.db_name, kind, word.lower()), [],
+                lambda: conn.execute(
+                    f'SELECT COUNT(*) FROM {fts} WHERE {fts} MATCH ?',
+                    (f'{{{SEARCH_COLUMNS[kind]}}} : "{word}"',)
+                ).fetchone()[0]
+            )
+        
+        return [word for word in words if hits(word) < SEARCH_COMMON_SHARE * rows]
+    
+    def search(self, query, user_id=None, team_id=None, limit=20, kinds=SEARCH_KINDS):
+        """Rank mood notes and tasks matching `query`, best first.
+
+        With user_id: that user's notes and tasks. With team_id: tasks
+        assigned to anyone on the team; mood notes stay private and are
+        only searched per user. Matches are wrapped in SEARCH_MARK.
+        """
+        words = search_words(query)
+        if not words or (user_id is None and team_id is None):
+            return []
+        
+        with self.db.connection() as conn:
+            if team_id is not None:
+                owners = [row[0] for row in conn.execute(
+                    'SELECT id FROM users WHERE team_id = ?', (team_id,)
+                )]
+                kinds = [kind for kind in kinds if kind == 'task']
+            else:
+                owners = [user_id]
+            
+            if not owners:
+                return []
+            owner_clause = ' OR '.join(owner_token(owner) for owner in owners)
+            
+            results = []
+            for kind in kinds:
+                def match(words):
+                    return f'{{{SEARCH_COLUMNS[kind]}}} : ({search_terms(words)}) AND owner : ({owner_clause})'
+                
+                fts = SEARCH_TABLES[kind]
+                params = {'match': match(words), 'mark': SEARCH_MARK, 'limit': limit}
+                rare = self._rare_search_words(conn, kind, words)
+                if rare == words:
+                    where, order, score = f'{fts} MATCH :match', 'f.rank', '-f.rank'
+                elif rare:
+                    # Every word filters; only the rare ones are ranked
+                    where = (f'{fts} MATCH :ranked AND f.rowid IN '
+                             f'(SELECT rowid FROM {fts} WHERE {fts} MATCH :match)')
+                    order, score = 'f.rank', '-f.rank'
+                    params['ranked'] = match(rare)
+                else:
+                    where, order, score = f'{fts} MATCH :match', 'f.rowid DESC', '0.0'
+                
+                cursor = conn.execute(SEARCH_QUERIES[kind].format(where=where, order=order, score=score),
+                                      params)
+                columns = [desc[0] for desc in cursor.description]
+                results.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+        
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results[:limit]
+    
     # ========== TEAM OPERATIONS ==========
+    def get_team_directory(self, search=None, page_size=TEAM_DIRECTORY_PAGE_SIZE, after=None):
+        """Get a page of teams, optionally those whose name starts with `search`;
+        pass team_cursor(last team) as `after` for the next"""
+        query = TEAM_DIRECTORY_QUERY
+        params = {'low': '', 'limit': page_size}
+        
+        search = (search or '').strip()
+        if search:
+            params['low'], params['high'] = name_prefix_range(search)
+            if params['high'] is not None:
+                query += TEAM_NAME_BEFORE
+        
+        if after:
+            # Every later name sorts at or after the cursor's, which is
+            # already past the prefix's own lower bound
+            params['low'] = after[0]
+            params['after_name'], params['after_id'] = after
+            query += TEAM_AFTER
+        
+        query += f" ORDER BY {TEAM_ORDER} LIMIT :limit"
+        
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+        
+        return [dict(zip(columns, row)) for row in rows]
+    
+    @cached('user')
+    def get_user_by_id(self, user_id):
+        """Get a user's profile"""
+        return self.db.get_user_by_id(user_id)
+    
+    @cached('team')
     def get_team_members(self, team_id):
         """Get all members of a team"""
-        conn = self.db.get_connection()
-        
         query = '''
         SELECT id, username, email, role, created_at
         FROM users
@@ -346,12 +764,12 @@ class DatabaseOperations:
         ORDER BY role DESC, username
         '''
         
-        cursor = conn.cursor()
-        cursor.execute(query, (team_id,))
-        
-        columns = [desc[0] for desc in cursor.description]
-        members = []
-        rows = cursor.fetchall()
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, (team_id,))
+            
+            columns = [desc[0] for desc in cursor.description]
+            members = []
+            rows = cursor.fetchall()
         
         for row in rows:
             member_dict = {}
@@ -359,67 +777,103 @@ class DatabaseOperations:
                 member_dict[col] = row[i]
             members.append(member_dict)
         
-        conn.close()
         return members
     
+    @cached('team')
     def get_team_stats(self, team_id):
         """Get team statistics"""
-        conn = self.db.get_connection()
-        
-        # Team mood stats
-        mood_query = '''
-        SELECT 
-            AVG(me.combined_score) as avg_team_mood,
-            AVG(me.stress_level) as avg_team_stress,
-            COUNT(DISTINCT me.user_id) as active_members
-        FROM mood_entries me
-        JOIN users u ON me.user_id = u.id
-        WHERE u.team_id = ?
-          AND me.created_at >= date('now', '-7 days')
-        '''
-        
-        # Task stats
-        task_query = '''
-        SELECT 
-            COUNT(*) as total_tasks,
-            SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_tasks,
-            COUNT(DISTINCT assigned_to) as members_with_tasks
-        FROM tasks t
-        JOIN users u ON t.assigned_to = u.id
-        WHERE u.team_id = ?
-        '''
-        
-        cursor = conn.cursor()
-        
-        # Get mood stats
-        cursor.execute(mood_query, (team_id,))
-        mood_stats = cursor.fetchone()
+        params = {'team_id': team_id, 'since_day': epoch_day() - 7}
         
-        # Get task stats
-        cursor.execute(task_query, (team_id,))
-        task_stats = cursor.fetchone()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get mood stats
+            cursor.execute(TEAM_MOOD_QUERY, params)
+            mood_stats = cursor.fetchone()
+            
+            # Get task stats
+            cursor.execute(TEAM_TASK_QUERY, params)
+            task_stats = cursor.fetchone()
+            
+            # Get member count
+            cursor.execute(TEAM_MEMBER_COUNT_QUERY, params)
+            member_count = cursor.fetchone()[0]
         
-        # Get member count
-        cursor.execute('SELECT COUNT(*) FROM users WHERE team_id = ?', (team_id,))
-        member_count = cursor.fetchone()[0]
+        return _team_stats(mood_stats, task_stats, member_count)
+    
+    # ========== TEAM VOCABULARY ==========
+    @cached('team')
+    def get_team_lexicon(self, team_id):
+        """A team's custom (phrase, category) sentiment vocabulary"""
+        with self.db.connection() as conn:
+            rows = conn.execute('''
+            SELECT phrase, category FROM team_lexicon
+            WHERE team_id = ?
+            ORDER BY phrase, category
+            ''', (team_id,)).fetchall()
+        
+        return [(phrase, category) for phrase, category in rows]
+    
+    def add_lexicon_entry(self, team_id, phrase, category):
+        """Count `phrase` towards `category` in this team's text analysis"""
+        phrase = ' '.join(phrase.lower().split())
+        if not phrase:
+            return False, "Phrase is empty"
+        if category not in LEXICON_CATEGORIES:
+            return False, f"Category must be one of {', '.join(LEXICON_CATEGORIES)}"
+        
+        with self.db.connection() as conn:
+            cursor = conn.execute('''
+            INSERT OR IGNORE INTO team_lexicon (team_id, phrase, category)
+            VALUES (?, ?, ?)
+            ''', (team_id, phrase, category))
+            if cursor.rowcount == 0:
+                return False, f"'{phrase}' is already a {category} phrase"
+            self.db.on_commit(lambda: self.cache.invalidate(('team', team_id)))
+        
+        return True, f"Added '{phrase}' as {category}"
+    
+    def remove_lexicon_entry(self, team_id, phrase, category):
+        """Stop counting a team phrase; returns whether it existed"""
+        with self.db.connection() as conn:
+            cursor = conn.execute('''
+            DELETE FROM team_lexicon WHERE team_id = ? AND phrase = ? AND category = ?
+            ''', (team_id, phrase, category))
+            if cursor.rowcount:
+                self.db.on_commit(lambda: self.cache.invalidate(('team', team_id)))
+        
+        return cursor.rowcount > 0
+    
+    # ========== DASHBOARD ==========
+    def get_dashboard_snapshot(self, user_id, team_id, detailed=True):
+        """All sidebar and dashboard metrics over one connection.
+        
+        The headline numbers (team stats, task stats, today's mood) come from
+        a single statement; detailed=True adds the team mood summary, the
+        top active tasks and the 7-day mood history for the dashboard page.
+        """
+        params = {
+            'user_id': user_id,
+            'team_id': team_id,
+            'since_day': epoch_day() - 7,
+            'today': epoch_day()
+        }
         
-        conn.close()
+        with self.db.connection() as conn:
+            row = conn.execute(DASHBOARD_QUERY, params).fetchone()
+            
+            snapshot = DashboardSnapshot(
+                team_stats=_team_stats(row[0:3], row[3:6], row[6]),
+                task_stats=_task_stats(row[7:12]),
+                today_mood=_today_mood_stats(row[12:15] if row[12] is not None else None)
+            )
+            
+            if detailed:
+                snapshot.team_mood_summary = self.get_team_mood_summary(team_id)
+                snapshot.active_tasks = self.get_user_tasks(user_id, page_size=5)
+                snapshot.mood_history = self.get_user_mood_history(user_id, days=7)
         
-        return {
-            'avg_mood': round(mood_stats[0], 1) if mood_stats and mood_stats[0] else 0,
-            'avg_stress': round(mood_stats[1], 1) if mood_stats and mood_stats[1] else 0,
-            'active_members': mood_stats[2] if mood_stats and mood_stats[2] else 0,
-            'total_tasks': task_stats[0] if task_stats and task_stats[0] else 0,
-            'completed_tasks': task_stats[1] if task_stats and task_stats[1] else 0,
-            'members_with_tasks': task_stats[2] if task_stats and task_stats[2] else 0,
-            'total_members': member_count if member_count else 0,
-            'completion_rate': round((task_stats[1] / task_stats[0] * 100), 1) if task_stats and task_stats[0] and task_stats[0] > 0 else 0
-        }
+        return snapshot
 
 # Create singleton instance
 db_ops = DatabaseOperations()
-
-
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Columnar snapshots of the analytics tables (Parquet or Arrow IPC).
+
+mood_entries is appended incrementally: each export only reads rows past
+the id watermark recorded in manifest.json and writes them as new files
+partitioned by month. tasks, users and teams have no modification
+timestamp, so they are small full rewrites. Entries edited or deleted after
+they were exported stay as exported until the next full export.
+
+Needs pyarrow; without it available() is False and the app keeps reading
+SQLite. The Analytics page queries snapshots through database.analytics.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:
+    pa = None
+
+SNAPSHOT_DIR = os.environ.get('TEAM_OPTIMIZER_SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}  # format -> file extension
+EXPORT_BATCH_ROWS = 100_000
+
+# Bump when SCHEMAS changes; a snapshot written under another version is
+# re-exported in full so its parts never mix column types
+SNAPSHOT_VERSION = 2
+
+# Column name -> arrow type per snapshot table. Free text and credentials
+# stay out; mood_entries gains the month it is partitioned by. stress_level
+# is declared INTEGER but holds fractional values, so it is exported as float.
+SCHEMAS = {
+    'mood_entries': [
+        ('id', 'int64'), ('user_id', 'int64'), ('text_sentiment', 'float64'),
+        ('visual_sentiment', 'float64'), ('combined_score', 'float64'), ('stress_level', 'float64'),
+        ('created_at', 'string'), ('created_day', 'int64'), ('month', 'string'),
+    ],
+    'tasks': [
+        ('id', 'int64'), ('assigned_to', 'int64'), ('status', 'string'), ('priority', 'string'),
+        ('priority_rank', 'int64'), ('deadline', 'string'), ('created_at', 'string'),
+    ],
+    'users': [
+        ('id', 'int64'), ('username', 'string'), ('team_id', 'int64'), ('role', 'string'),
+        ('created_at', 'string'),
+    ],
+    'teams': [
+        ('id', 'int64'), ('name', 'string'), ('created_by', 'int64'), ('created_at', 'string'),
+    ],
+}
+
+# Source expression for columns that are not stored as-is. Foreign keys can
+# hold legacy text such as '' (see migrations.TASK_COUNTERS); those export as null.
+COLUMN_SQL = {'month': 'substr(created_at, 1, 7)'}
+COLUMN_SQL.update({
+    key: f"CASE WHEN typeof({key}) = 'integer' THEN {key} END"
+    for key in ('user_id', 'assigned_to', 'team_id', 'created_by')
+})
+
+DIMENSION_TABLES = ('tasks', 'users', 'teams')
+
+
+def _schema(table):
+    return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in SCHEMAS[table]])
+
+
+def _select(table):
+    columns = ', '.join(f'{COLUMN_SQL[name]} AS {name}' if name in COLUMN_SQL else name
+                        for name, _ in SCHEMAS[table])
+    return f'SELECT {columns} FROM {table}'
+
+
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_DIR, fmt='parquet'):
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format '{fmt}', expected one of {', '.join(SNAPSHOT_FORMATS)}")
+        self.root = root
+        self.format = fmt
+
+    # ========== MANIFEST ==========
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, 'manifest.json')
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        # Written last and atomically: a crash mid-export leaves the previous
+        # watermark, and the rerun overwrites the same part files
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def available(self):
+        """pyarrow is installed and an export has been written"""
+        return pa is not None and bool(self.manifest())
+
+    def exported_at(self):
+        return self.manifest().get('exported_at')
+
+    # ========== EXPORT ==========
+    def export(self, db, full=False):
+        """Append new mood entries and rewrite the dimension tables"""
+        if pa is None:
+            raise RuntimeError("Snapshot export needs pyarrow (pip install pyarrow)")
+
+        manifest = self.manifest()
+        if manifest.get('format') != self.format or manifest.get('version') != SNAPSHOT_VERSION:
+            full = True
+
+        os.makedirs(self.root, exist_ok=True)
+        watermark = 0 if full else manifest.get('tables', {}).get('mood_entries', {}).get('watermark', 0)
+        if full:
+            shutil.rmtree(self._table_dir('mood_entries'), ignore_errors=True)
+
+        tables = {}
+        with db.connection() as conn:
+            # One read transaction, so every table is exported as of the same moment
+            began = not conn.in_transaction
+            if began:
+                conn.execute('BEGIN')
+            try:
+                tables['mood_entries'] = self._export_moods(conn, watermark, manifest)
+                for table in DIMENSION_TABLES:
+                    tables[table] = self._export_dimension(conn, table)
+            finally:
+                if began:
+                    conn.rollback()
+
+        self._save_manifest({
+            'format': self.format,
+            'version': SNAPSHOT_VERSION,
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'tables': tables
+        })
+        return tables
+
+    def _table_dir(self, table):
+        return os.path.join(self.root, table)
+
+    def _write(self, table, data, basename, partitioning=None):
+        ds.write_dataset(
+            data,
+            self._table_dir(table),
+            format=self.format,
+            partitioning=partitioning,
+            partitioning_flavor='hive' if partitioning else None,
+            basename_template=f"{basename}-{{i}}.{SNAPSHOT_FORMATS[self.format]}",
+            existing_data_behavior='overwrite_or_ignore'
+        )
+
+    def _export_moods(self, conn, watermark, manifest):
+        previous = manifest.get('tables', {}).get('mood_entries', {}) if watermark else {}
+        rows = previous.get('rows', 0)
+
+        schema = _schema('mood_entries')
+        cursor = conn.execute(_select('mood_entries') + ' WHERE id > ? ORDER BY id', (watermark,))
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not batch:
+                break
+            data = pa.Table.from_pydict(dict(zip(schema.names, map(list, zip(*batch)))), schema=schema)
+            self._write('mood_entries', data, f'part-{batch[0][0]}', partitioning=['month'])
+            watermark = batch[-1][0]
+            rows += len(batch)
+
+        return {'watermark': watermark, 'rows': rows}
+
+    def _export_dimension(self, conn, table):
+        schema = _schema(table)
+        rows = conn.execute(_select(table) + ' ORDER BY id').fetchall()
+
+        shutil.rmtree(self._table_dir(table), ignore_errors=True)
+        data = pa.Table.from_pydict(
+            {name: [row[i] for row in rows] for i, name in enumerate(schema.names)}, schema=schema
+        )
+        self._write(table, data, 'part')
+        return {'rows': len(rows)}
+
+    # ========== READ ==========
+    def dataset(self, table):
+        """pyarrow dataset over a snapshot table's files"""
+        schema = _schema(table)
+        if not os.path.isdir(self._table_dir(table)):
+            return ds.dataset(schema.empty_table())
+
+        # Arrow IPC files are memory-mapped rather than read into memory
+        filesystem = fs.LocalFileSystem(use_mmap=self.format == 'arrow')
+        return ds.dataset(self._table_dir(table), schema=schema, format=self.format,
+                          partitioning=ds.partitioning(flavor='hive'), filesystem=filesystem)
+
+    def read(self, table, columns=None, filter=None):
+        """Load (part of) a snapshot table as a DataFrame"""
+        return self.dataset(table).to_table(columns=columns, filter=filter).to_pandas()
+
+
+# Create singleton instance
+snapshots = SnapshotStore()
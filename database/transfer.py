@@ -0,0 +1,187 @@
+"""Streaming CSV/JSONL import and export for users, tasks and mood entries.
+
+Rows move one at a time through generators, so memory stays flat however
+large the file is. Imports commit every IMPORT_BATCH_SIZE rows.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+from .cache import read_cache
+from .operations import combined_scores
+
+FORMATS = ('csv', 'jsonl')
+IMPORT_BATCH_SIZE = 5000
+
+# Columns that move in and out; generated columns are rebuilt on insert
+COLUMNS = {
+    'users': ('id', 'username', 'email', 'password_hash', 'team_id', 'role',
+              'created_at', 'allow_visual_tracking'),
+    'tasks': ('id', 'title', 'description', 'assigned_to', 'status', 'priority',
+              'deadline', 'created_at'),
+    'mood_entries': ('id', 'user_id', 'text_entry', 'text_sentiment', 'visual_sentiment',
+                     'combined_score', 'stress_level', 'created_at'),
+}
+
+# Column that ties a row to one user, for per-user exports and imports
+OWNER_COLUMN = {'users': 'id', 'tasks': 'assigned_to', 'mood_entries': 'user_id'}
+
+# Left out of exports unless asked for, and never accepted from a user's upload
+SECRET_COLUMNS = {'password_hash'}
+
+# Parsed in Python: SQLite's own text-to-real conversion can be off by an ulp
+REAL_COLUMNS = {'text_sentiment', 'visual_sentiment', 'combined_score'}
+
+# Column defaults applied when a record leaves the column empty
+DEFAULTS = {
+    'created_at': 'CURRENT_TIMESTAMP',
+    'status': "'todo'",
+    'priority': "'medium'",
+    'role': "'member'",
+    'allow_visual_tracking': '1',
+}
+
+# NOT NULL columns without a default
+REQUIRED_COLUMNS = {
+    'users': ('username', 'email', 'password_hash'),
+    'tasks': ('title',),
+    'mood_entries': ('user_id',),
+}
+
+
+def format_for(path):
+    """Guess the file format from its extension (CSV unless .jsonl/.ndjson)"""
+    return 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+
+
+def _check(table, fmt):
+    if table not in COLUMNS:
+        raise ValueError(f"Unknown table '{table}', expected one of {', '.join(COLUMNS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+
+
+def read_rows(fp, fmt='csv'):
+    """Yield one dict per record of a CSV (with header) or JSONL text stream"""
+    if fmt == 'csv':
+        for row in csv.DictReader(fp):
+            # CSV cannot tell NULL from an empty string; empty means NULL
+            yield {key: (value if value != '' else None) for key, value in row.items()}
+    else:
+        for number, line in enumerate(fp, start=1):
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"line {number}: expected a JSON object")
+                yield record
+
+
+def write_rows(fp, rows, columns, fmt='csv'):
+    """Write row tuples to a text stream; returns the number written"""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(fp)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            fp.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+            count += 1
+    return count
+
+
+def export_table(db, table, fp, fmt='csv', user_id=None, include_secrets=False):
+    """Stream a table (or one user's rows of it) to fp; returns the row count"""
+    _check(table, fmt)
+    columns = [column for column in COLUMNS[table]
+               if include_secrets or column not in SECRET_COLUMNS]
+
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    params = []
+    if user_id is not None:
+        query += f" WHERE {OWNER_COLUMN[table]} = ?"
+        params.append(user_id)
+    query += " ORDER BY id"
+
+    with db.connection() as conn:
+        # Iterating the cursor steps SQLite row by row instead of fetchall()
+        return write_rows(fp, conn.execute(query, params), columns, fmt)
+
+
+def _import_rows(table, records, user_id, keep_ids):
+    """Turn input records into insert tuples, validating as they stream past"""
+    columns = [column for column in COLUMNS[table]
+               if (keep_ids or column != 'id')
+               and not (user_id is not None and column in SECRET_COLUMNS)]
+
+    for number, record in enumerate(records, start=1):
+        if user_id is not None:
+            record[OWNER_COLUMN[table]] = user_id
+        missing = [column for column in REQUIRED_COLUMNS[table] if record.get(column) is None]
+        if missing:
+            raise ValueError(f"{table} record {number}: missing {', '.join(missing)}")
+        yield columns, tuple(
+            float(record[column]) if column in REAL_COLUMNS and isinstance(record.get(column), str)
+            else record.get(column)
+            for column in columns
+        )
+
+
+def import_table(db, table, fp, fmt='csv', user_id=None, keep_ids=False,
+                 batch_size=IMPORT_BATCH_SIZE):
+    """Stream records from fp into a table in batched transactions.
+
+    New rows get fresh ids unless keep_ids is set (restoring into an empty
+    database). With user_id every row is assigned to that user. Missing
+    mood scores are computed like create_mood_entry does. Batches committed
+    before a bad record stay committed; the error names the record.
+    """
+    _check(table, fmt)
+    if table == 'users' and user_id is not None:
+        raise ValueError("Users cannot be imported on behalf of a single user")
+
+    rows = _import_rows(table, read_rows(fp, fmt), user_id, keep_ids)
+    imported = 0
+    batches = 0
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        columns = batch[0][0]
+        values = [row for _, row in batch]
+        if table == 'mood_entries':
+            values = _fill_combined_scores(columns, values)
+
+        placeholders = ', '.join(f'COALESCE(?, {DEFAULTS[column]})' if column in DEFAULTS else '?'
+                                 for column in columns)
+        with db.connection() as conn:
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                values
+            )
+            # Imports can touch any user or team, so drop every cached read
+            db.on_commit(read_cache.clear)
+
+        imported += len(values)
+        batches += 1
+
+    return {'table': table, 'imported': imported, 'batches': batches}
+
+
+def _fill_combined_scores(columns, values):
+    score_at = columns.index('combined_score')
+    text_at = columns.index('text_sentiment')
+    visual_at = columns.index('visual_sentiment')
+
+    scores = combined_scores([row[text_at] for row in values],
+                             [row[visual_at] for row in values])
+    return [
+        row if row[score_at] is not None
+        else row[:score_at] + (float(score),) + row[score_at + 1:]
+        for row, score in zip(values, scores)
+    ]
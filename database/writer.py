@@ -0,0 +1,121 @@
+"""Single-writer queue for interactive mood and task writes.
+
+Sessions hand their writes to one background thread instead of each
+opening its own write transaction. The thread takes everything queued
+while it was busy and runs it as one group commit, so concurrent sessions
+queue in memory rather than contending for SQLite's write lock:
+
+    entry_id = write_queue.write(db_ops.create_mood_entry, user_id, text_sentiment=7)
+    future = write_queue.submit(db_ops.update_task_status, task_id, 'completed')
+
+A job is any callable that writes through db.connection() without
+committing itself (the DatabaseOperations methods do). Each job runs in its
+own savepoint: one that raises is rolled back and fails only its own
+future. Futures resolve after the commit, once on_commit cache evictions
+have run, so a rerun that waits on one reads its own write.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from .models import db
+
+MAX_BATCH = 256
+WRITE_TIMEOUT_SECONDS = 30
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, database=None, max_batch=MAX_BATCH):
+        self.db = database or db
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.writes = 0
+        self.batches = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns a Future of its result"""
+        future = Future()
+        self._start()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def write(self, fn, *args, **kwargs):
+        """Queue a job and wait until it has committed"""
+        return self.submit(fn, *args, **kwargs).result(WRITE_TIMEOUT_SECONDS)
+
+    def flush(self, timeout=WRITE_TIMEOUT_SECONDS):
+        """Wait until everything queued so far has committed"""
+        self.submit(lambda: None).result(timeout)
+
+    def close(self, timeout=WRITE_TIMEOUT_SECONDS):
+        """Commit what is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self):
+        return {'writes': self.writes, 'batches': self.batches, 'pending': self._queue.qsize()}
+
+    # ========== WRITER THREAD ==========
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Whatever arrived while the last batch was committing joins this one
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in batch
+            jobs = [job for job in batch
+                    if job is not _STOP and job[0].set_running_or_notify_cancel()]
+            if jobs:
+                self._commit(jobs)
+            if stop:
+                return
+
+    def _commit(self, jobs):
+        outcomes = []
+        try:
+            with self.db.connection() as conn:
+                # Take the write lock up front rather than upgrading mid-batch
+                conn.execute('BEGIN IMMEDIATE')
+                for future, fn, args, kwargs in jobs:
+                    conn.execute('SAVEPOINT write_job')
+                    try:
+                        outcomes.append((future, fn(*args, **kwargs), None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write_job')
+                        outcomes.append((future, None, e))
+                    conn.execute('RELEASE write_job')
+        except Exception as e:
+            for future, *_ in jobs:
+                future.set_exception(e)
+            return
+
+        self.writes += len(jobs)
+        self.batches += 1
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+# Create singleton instance
+write_queue = WriteQueue()
@@ -1,5 +1,7 @@
 import streamlit as st
 from database.models import db
+from database.operations import db_ops, team_cursor, TEAM_DIRECTORY_PAGE_SIZE
+from database.migrations import LEXICON_CATEGORIES
 import time
 
 st.set_page_config(page_title="Team Management", page_icon="👥")
@@ -18,89 +20,123 @@ def show_create_team(user_id):
         with st.spinner("Creating..."):
             try:
                 # Simple create team call
-                team_id = db.create_team(team_name, user_id)
+                result = db.create_team(team_name, user_id)
                 
-                if team_id:
-                    st.session_state.user['team_id'] = team_id
+                if result['success']:
+                    st.session_state.user['team_id'] = result['team_id']
                     st.success(f"✅ Team '{team_name}' created!")
-                    
-                    # Generate simple code
-                    code = f"TEAM{team_id}"
-                    st.info(f"**Team ID:** `{team_id}`")
-                    st.info(f"**Share this ID with members**")
+                    st.info(f"**Team Code:** `{result['team_code']}`")
+                    st.info(f"**Share this code with members**")
                     
                     time.sleep(1)
                     st.rerun()
                 else:
-                    st.error("Failed to create team")
+                    st.error(f"Failed to create team: {result['error']}")
             except Exception as e:
                 st.error(f"Error: {str(e)}")
 
 def show_join_team(user_id):
-    """Join team - ULTRA SIMPLE"""
+    """Join team by the code its admin shared, or from the team directory"""
     st.subheader("Join Team")
     
-    # Get all teams (simple query)
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name FROM teams')
-    teams = cursor.fetchall()
-    conn.close()
+    team_code = st.text_input("Team Code", placeholder="TEAM-XXXXXXXX",
+                              help="Ask your team admin for the team code")
+    
+    if st.button("Join Team", type="primary"):
+        if not team_code:
+            st.error("Team code required")
+            return
+        
+        # One lookup on the unique team code index
+        team = db.get_team_by_code(team_code)
+        if not team:
+            st.error("No team found with that code")
+            return
+        
+        join_team_simple(user_id, team['id'], team['name'])
+    
+    st.markdown("---")
+    show_team_directory(user_id)
+
+def show_team_directory(user_id):
+    """One page of the team directory at a time, searchable by name"""
+    st.subheader("Browse Teams")
+    
+    search = st.text_input("Search teams", placeholder="Start of a team name",
+                           key="team_directory_search")
+    
+    # Cursors of the pages visited so far, so Previous needs no offset
+    state = st.session_state.get('team_directory')
+    if not state or state['search'] != search:
+        state = {'search': search, 'cursors': [None]}
+        st.session_state.team_directory = state
+    
+    # One extra row tells whether there is a next page
+    teams = db_ops.get_team_directory(search, page_size=TEAM_DIRECTORY_PAGE_SIZE + 1,
+                                      after=state['cursors'][-1])
+    has_next = len(teams) > TEAM_DIRECTORY_PAGE_SIZE
+    teams = teams[:TEAM_DIRECTORY_PAGE_SIZE]
     
     if not teams:
-        st.info("No teams exist yet. Create one!")
-        if st.button("Create Team Instead"):
-            st.session_state.active_tab = "Create Team"
-            st.rerun()
+        if search:
+            st.info(f"No teams start with '{search}'.")
+        else:
+            st.info("No teams exist yet. Create one!")
         return
     
-    st.write(f"**Available Teams ({len(teams)}):**")
-    
-    for team_id, team_name in teams:
+    for team in teams:
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            st.write(f"**{team_name}**")
-            st.caption(f"ID: {team_id}")
+            st.write(f"**{team['name']}**")
+            members = team['member_count']
+            st.caption(f"{members} member{'s' if members != 1 else ''}"
+                       + (f" · 👑 {team['admin_name']}" if team['admin_name'] else ""))
         
         with col2:
-            if st.button("Join", key=f"join_{team_id}"):
-                join_team_simple(user_id, team_id, team_name)
+            if st.button("Join", key=f"join_{team['id']}"):
+                join_team_simple(user_id, team['id'], team['name'])
         
         st.markdown("---")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(state['cursors']) > 1 and st.button("⬅️ Previous"):
+            state['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(state['cursors'])}")
+    with col3:
+        if has_next and st.button("Next ➡️"):
+            state['cursors'].append(team_cursor(teams[-1]))
+            st.rerun()
 
 def join_team_simple(user_id, team_id, team_name):
     """Simple team join"""
     with st.spinner("Joining..."):
         # Check if already in a team
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT team_id FROM users WHERE id = ?', (user_id,))
-        current_team = cursor.fetchone()
+        with db.connection() as conn:
+            current_team = conn.execute('SELECT team_id FROM users WHERE id = ?', (user_id,)).fetchone()
         
         if current_team and current_team[0]:
             if current_team[0] == team_id:
                 st.warning("You're already in this team!")
-                conn.close()
                 return
             else:
                 st.warning(f"You're already in another team (ID: {current_team[0]})")
-                conn.close()
                 return
         
         # Join team
-        cursor.execute('UPDATE users SET team_id = ? WHERE id = ?', (team_id, user_id))
-        conn.commit()
+        db.set_user_team(user_id, team_id)
         
         # Get admin info
-        cursor.execute('''
-            SELECT u.username 
-            FROM teams t
-            JOIN users u ON t.created_by = u.id
-            WHERE t.id = ?
-        ''', (team_id,))
-        admin = cursor.fetchone()
-        conn.close()
+        with db.connection() as conn:
+            admin = conn.execute('''
+                SELECT u.username 
+                FROM teams t
+                JOIN users u ON t.created_by = u.id
+                WHERE t.id = ?
+            ''', (team_id,)).fetchone()
         
         st.session_state.user['team_id'] = team_id
         st.success(f"✅ Joined **{team_name}**!")
@@ -114,10 +150,21 @@ def join_team_simple(user_id, team_id, team_name):
 def show_team_overview(team_id, user_id):
     """Simple team overview"""
     # Get team info
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT name, created_at FROM teams WHERE id = ?', (team_id,))
-    team = cursor.fetchone()
+    with db.connection() as conn:
+        team = conn.execute('SELECT name, created_at FROM teams WHERE id = ?', (team_id,)).fetchone()
+        
+        # Get members
+        members = conn.execute('''
+            SELECT id, username, email, role 
+            FROM users 
+            WHERE team_id = ? 
+            ORDER BY 
+                CASE role 
+                    WHEN 'admin' THEN 1
+                    ELSE 2
+                END,
+                username
+        ''', (team_id,)).fetchall()
     
     if not team:
         st.error("Team not found")
@@ -125,22 +172,6 @@ def show_team_overview(team_id, user_id):
     
     team_name, created_at = team
     
-    # Get members
-    cursor.execute('''
-        SELECT id, username, email, role 
-        FROM users 
-        WHERE team_id = ? 
-        ORDER BY 
-            CASE role 
-                WHEN 'admin' THEN 1
-                ELSE 2
-            END,
-            username
-    ''', (team_id,))
-    
-    members = cursor.fetchall()
-    conn.close()
-    
     # Display
     st.subheader(f"🏢 {team_name}")
     st.caption(f"Created: {created_at}")
@@ -171,22 +202,20 @@ def show_invite_members(team_id):
     """Simple invite page"""
     st.subheader("Invite Members")
     
-    # Get team name
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT name FROM teams WHERE id = ?', (team_id,))
-    team_name = cursor.fetchone()[0]
-    conn.close()
+    # Get team name and code
+    team = db.get_team_by_id(team_id)
+    team_name = team['name']
+    team_code = team['team_code']
     
     st.write(f"**Team:** {team_name}")
-    st.write(f"**Team ID:** `{team_id}`")
+    st.write(f"**Team Code:** `{team_code}`")
     
     st.markdown("---")
     
     st.info("**How to invite:**")
-    st.write("1. Share the **Team ID** above with members")
+    st.write("1. Share the **Team Code** above with members")
     st.write("2. They go to **Team Management → Join Team**")
-    st.write("3. They click 'Join' next to your team")
+    st.write("3. They enter the code and click 'Join Team'")
     
     st.markdown("---")
     
@@ -194,9 +223,9 @@ def show_invite_members(team_id):
     st.write("**Quick share message:**")
     share_text = f"""Join my team '{team_name}' on Team Optimizer AI!
 
-Team ID: {team_id}
+Team Code: {team_code}
 
-Go to Team Management → Join Team and select our team."""
+Go to Team Management → Join Team and enter the code (or use it when signing up)."""
     
     st.code(share_text, language="")
     
@@ -208,27 +237,23 @@ def show_member_management(team_id, user_id):
     st.subheader("Manage Members")
     
     # Check if user is admin
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT role FROM users WHERE id = ? AND team_id = ?', (user_id, team_id))
-    user_role = cursor.fetchone()
+    with db.connection() as conn:
+        user_role = conn.execute(
+            'SELECT role FROM users WHERE id = ? AND team_id = ?', (user_id, team_id)
+        ).fetchone()
+        
+        # Get members
+        members = conn.execute('''
+            SELECT id, username, email, role 
+            FROM users 
+            WHERE team_id = ?
+            ORDER BY username
+        ''', (team_id,)).fetchall()
     
     if not user_role or user_role[0] != 'admin':
         st.warning("Only admins can manage members")
-        conn.close()
         return
     
-    # Get members
-    cursor.execute('''
-        SELECT id, username, email, role 
-        FROM users 
-        WHERE team_id = ?
-        ORDER BY username
-    ''', (team_id,))
-    
-    members = cursor.fetchall()
-    conn.close()
-    
     if not members:
         st.info("No members")
         return
@@ -250,12 +275,7 @@ def show_member_management(team_id, user_id):
                     
                     if new_role != role:
                         if st.button("Update", key=f"update_{member_id}"):
-                            conn = db.get_connection()
-                            cursor = conn.cursor()
-                            cursor.execute('UPDATE users SET role = ? WHERE id = ?', 
-                                         (new_role, member_id))
-                            conn.commit()
-                            conn.close()
+                            db.update_user_role(member_id, new_role)
                             st.success(f"Updated {username} to {new_role}")
                             time.sleep(1)
                             st.rerun()
@@ -264,16 +284,55 @@ def show_member_management(team_id, user_id):
                 if member_id != user_id:
                     if st.button("Remove", type="secondary", key=f"remove_{member_id}"):
                         if st.checkbox(f"Remove {username}?", key=f"confirm_{member_id}"):
-                            conn = db.get_connection()
-                            cursor = conn.cursor()
-                            cursor.execute('UPDATE users SET team_id = NULL WHERE id = ?', 
-                                         (member_id,))
-                            conn.commit()
-                            conn.close()
+                            db.remove_user_from_team(member_id)
                             st.success(f"Removed {username}")
                             time.sleep(1)
                             st.rerun()
 
+def show_team_vocabulary(team_id, user_id):
+    """Team-specific phrases for text mood analysis"""
+    st.subheader("Team Vocabulary")
+    st.caption("Words and phrases (e.g. \"behind schedule\", \"on fire\") that count as positive, "
+               "negative or stressful in your team's mood notes, on top of the built-in ones.")
+    
+    user = db_ops.get_user_by_id(user_id)
+    is_admin = user and user['role'] == 'admin'
+    
+    lexicon = db_ops.get_team_lexicon(team_id)
+    if not lexicon:
+        st.info("No team phrases yet")
+    
+    for phrase, category in lexicon:
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            st.write(f"**{phrase}**")
+        with col2:
+            st.caption(category.title())
+        with col3:
+            if is_admin and st.button("Remove", key=f"lexicon_{category}_{phrase}"):
+                db_ops.remove_lexicon_entry(team_id, phrase, category)
+                st.rerun()
+    
+    if not is_admin:
+        st.caption("Only admins can change the team vocabulary")
+        return
+    
+    with st.form("add_lexicon_entry", clear_on_submit=True):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            phrase = st.text_input("Word or phrase")
+        with col2:
+            category = st.selectbox("Counts as", LEXICON_CATEGORIES)
+        
+        if st.form_submit_button("Add"):
+            ok, message = db_ops.add_lexicon_entry(team_id, phrase, category)
+            if ok:
+                st.success(message)
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.error(message)
+
 def main():
     if not st.session_state.get("authenticated", False):
         st.warning("Please login")
@@ -297,7 +356,7 @@ def main():
     else:
         # In a team
         option = st.selectbox("Team Options",
-                             ["Team Overview", "Invite Members", "Manage Members", "Leave Team"])
+                             ["Team Overview", "Invite Members", "Manage Members", "Team Vocabulary", "Leave Team"])
         
         if option == "Team Overview":
             show_team_overview(team_id, user_id)
@@ -305,16 +364,14 @@ def main():
             show_invite_members(team_id)
         elif option == "Manage Members":
             show_member_management(team_id, user_id)
+        elif option == "Team Vocabulary":
+            show_team_vocabulary(team_id, user_id)
         elif option == "Leave Team":
             st.subheader("Leave Team")
             st.warning("Are you sure you want to leave the team?")
             
             if st.button("Yes, leave team", type="primary"):
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('UPDATE users SET team_id = NULL WHERE id = ?', (user_id,))
-                conn.commit()
-                conn.close()
+                db.remove_user_from_team(user_id)
                 
                 st.session_state.user['team_id'] = None
                 st.success("Left team")
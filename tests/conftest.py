@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.models opens a singleton on import; keep it off the repo's file
+os.environ.setdefault('TEAM_OPTIMIZER_DB', os.path.join(tempfile.mkdtemp(), 'tests.db'))
+
+
+@pytest.fixture
+def database(tmp_path):
+    from database.models import Database
+    database = Database(str(tmp_path / 'team_optimizer.db'))
+    yield database
+    database.pool.close_all()
+
+
+@pytest.fixture
+def ops(database):
+    from database.cache import ReadCache
+    from database.operations import DatabaseOperations
+    return DatabaseOperations(database, cache=ReadCache())
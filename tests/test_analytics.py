@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from database.analytics import SQLiteEngine, duckdb, DuckDBEngine
+
+
+def _engines(database, tmp_path):
+    yield SQLiteEngine(database)
+    if duckdb is None:
+        return
+    try:
+        yield DuckDBEngine.over_sqlite(database.db_name)
+    except duckdb.Error:
+        pass  # sqlite extension not downloadable here
+    try:
+        from database.snapshots import SnapshotStore
+    except ImportError:
+        return
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    store.export(database)
+    yield DuckDBEngine.over_snapshots(store)
+
+
+def _seed(database, user_id, moods):
+    """One entry per day, newest today"""
+    with database.connection() as conn:
+        conn.executemany(
+            "INSERT INTO mood_entries (user_id, combined_score, stress_level, created_at) "
+            "VALUES (?, ?, 5, datetime('now', ?))",
+            [(user_id, mood, f'-{day} days') for day, mood in enumerate(moods)]
+        )
+
+
+@pytest.mark.parametrize('mood', [0.1, 1.1, 8.9])
+def test_constant_series_has_zero_std(database, tmp_path, mood):
+    user_id = database.create_user('ann', 'ann@x', 'secret1')
+    _seed(database, user_id, [mood] * 24)
+
+    for engine in _engines(database, tmp_path):
+        stats = engine.mood_stats(user_id, days=30)
+        assert stats['std'] == pytest.approx(0.0, abs=1e-9), engine.name
+        assert stats['mean'] == pytest.approx(mood), engine.name
+        engine.close()
+
+
+def test_engines_agree(database, tmp_path):
+    user_id = database.create_user('ann', 'ann@x', 'secret1')
+    moods = [3.0, 7.5, 6.0, 9.0, 4.5, 5.0, 8.0, 2.5]
+    _seed(database, user_id, moods)
+
+    mean = sum(moods) / len(moods)
+    std = math.sqrt(sum((m - mean) ** 2 for m in moods) / (len(moods) - 1))
+    histogram = None
+    for engine in _engines(database, tmp_path):
+        stats = engine.mood_stats(user_id, days=30)
+        assert stats['mean'] == pytest.approx(mean), engine.name
+        assert stats['std'] == pytest.approx(std), engine.name
+        assert stats['p50'] == pytest.approx(5.5), engine.name
+        histogram = histogram or engine.mood_histogram(user_id, days=30)
+        assert engine.mood_histogram(user_id, days=30) == histogram, engine.name
+        engine.close()
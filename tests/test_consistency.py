@@ -0,0 +1,168 @@
+"""Trigger-maintained tables against a fresh recount after a mix of writes"""
+import pytest
+
+from database.changefeed import ChangeFeed
+from database.migrations import counter_mismatches
+from database.operations import task_cursor
+
+ROLLUP_QUERY = '''
+SELECT user_id, day, mood_sum, mood_count, mood_min, mood_max,
+       stress_sum, stress_count, stress_min, stress_max, entries
+FROM mood_daily_rollup
+WHERE entries > 0
+ORDER BY user_id, day
+'''
+
+EXPECTED_ROLLUP_QUERY = '''
+SELECT user_id, created_day, IFNULL(SUM(combined_score), 0), COUNT(combined_score),
+       MIN(combined_score), MAX(combined_score),
+       IFNULL(SUM(stress_level), 0), COUNT(stress_level), MIN(stress_level), MAX(stress_level),
+       COUNT(*)
+FROM mood_entries
+GROUP BY user_id, created_day
+ORDER BY user_id, created_day
+'''
+
+
+@pytest.fixture
+def team(database, ops):
+    """Two members of one team and an outsider, with tasks and mood entries
+    written, edited and deleted"""
+    ann = database.create_user('ann', 'ann@x', 'secret1')
+    bob = database.create_user('bob', 'bob@x', 'secret1')
+    cy = database.create_user('cy', 'cy@x', 'secret1')
+    team_id = database.create_team('Core', ann)['team_id']
+    database.set_user_team(bob, team_id)
+
+    tasks = {
+        name: ops.create_task(name, 'details to follow', assigned_to=owner, priority=priority,
+                              deadline=deadline)
+        for name, owner, priority, deadline in [
+            ('release checklist', ann, 'urgent', '2030-01-01'),
+            ('budget review', ann, 'high', None),
+            ('hiring plan', ann, 'medium', '2030-02-01'),
+            ('onboarding docs', ann, 'medium', '2030-02-01'),
+            ('office move', bob, 'low', None),
+            ('vendor call', bob, 'high', '2030-03-01'),
+            ('garden party', cy, 'medium', None),
+        ]
+    }
+    for name in ('release checklist', 'budget review', 'office move', 'vendor call'):
+        ops.update_task_status(tasks[name], 'in_progress')
+    for name in ('release checklist', 'budget review', 'office move'):
+        ops.update_task_status(tasks[name], 'completed')
+    ops.update_task_status(tasks['budget review'], 'in_progress')   # reopened
+    ops.delete_task(tasks['office move'])                           # deleted once completed
+    ops.delete_task(tasks['garden party'])
+    with database.connection() as conn:
+        conn.execute("UPDATE tasks SET assigned_to = ?, priority = 'urgent' WHERE id = ?",
+                     (bob, tasks['hiring plan']))
+        conn.execute("UPDATE tasks SET title = 'staffing plan' WHERE id = ?", (tasks['hiring plan'],))
+
+    entries = []
+    with database.connection() as conn:
+        for user_id, day, score, stress in [
+            (ann, 0, 7.5, 3), (ann, 0, 6.0, 4), (ann, 1, 4.5, 7), (ann, 3, 8.0, 2),
+            (bob, 0, 5.0, 5), (bob, 2, 3.5, 8), (cy, 1, 6.5, None),
+        ]:
+            entries.append(conn.execute(
+                "INSERT INTO mood_entries (user_id, text_entry, combined_score, stress_level, created_at) "
+                "VALUES (?, ?, ?, ?, datetime('now', ?))",
+                (user_id, f'note {len(entries)} about the roadmap', score, stress, f'-{day} days')
+            ).lastrowid)
+        conn.execute("UPDATE mood_entries SET combined_score = 9.0 WHERE id = ?", (entries[1],))
+        conn.execute("UPDATE mood_entries SET created_at = datetime('now', '-5 days') WHERE id = ?",
+                     (entries[2],))
+        conn.execute("DELETE FROM mood_entries WHERE id = ?", (entries[5],))
+
+    database.set_user_team(bob, None)
+    database.set_user_team(bob, team_id)
+    return {'ann': ann, 'bob': bob, 'cy': cy, 'team_id': team_id, 'tasks': tasks, 'entries': entries}
+
+
+def test_counters_match_a_recount(database, team):
+    with database.connection() as conn:
+        assert counter_mismatches(conn) == {'user_task_counts': [], 'team_counts': []}
+        members, total, completed = conn.execute(
+            "SELECT members, total_tasks, completed_tasks FROM team_counts WHERE team_id = ?",
+            (team['team_id'],)
+        ).fetchone()
+    assert (members, total, completed) == (2, 5, 1)
+
+
+def test_mood_rollup_matches_a_recount(database, team):
+    with database.connection() as conn:
+        stored = conn.execute(ROLLUP_QUERY).fetchall()
+        expected = conn.execute(EXPECTED_ROLLUP_QUERY).fetchall()
+        averages = conn.execute(
+            "SELECT user_id, created_day, AVG(combined_score) FROM mood_entries "
+            "GROUP BY user_id, created_day ORDER BY user_id, created_day"
+        ).fetchall()
+
+    assert [row[:2] for row in stored] == [row[:2] for row in expected]
+    for row, fresh, (_, _, average) in zip(stored, expected, averages):
+        assert row[2:] == pytest.approx(fresh[2:])
+        assert row[2] / row[3] == pytest.approx(average)
+
+
+def test_flow_counts_only_standing_completions(database, ops, team):
+    with database.connection() as conn:
+        stored = dict(conn.execute(
+            "SELECT user_id, SUM(completed) FROM task_flow_weekly GROUP BY user_id HAVING SUM(completed)"
+        ).fetchall())
+        expected = dict(conn.execute(
+            "SELECT assigned_to, COUNT(*) FROM tasks WHERE status = 'completed' GROUP BY assigned_to"
+        ).fetchall())
+    assert stored == expected == {team['ann']: 1}
+    assert ops.get_task_flow(team['ann'])['completed'] == 1
+    assert ops.get_task_flow(team['bob'])['completed'] == 0
+
+
+def test_change_log_names_every_write(database, team):
+    changes = ChangeFeed(database).read_changes(limit=1000)
+    counts = {}
+    for change in changes:
+        key = (change['entity'], change['op'])
+        counts[key] = counts.get(key, 0) + 1
+
+    assert counts == {
+        ('membership', 'join'): 3,       # ann, bob, bob again
+        ('membership', 'leave'): 1,
+        ('task', 'insert'): 7,
+        ('task', 'update'): 10,          # 4 started, 3 completed, reopened, moved, renamed
+        ('task', 'delete'): 2,
+        ('mood_entry', 'insert'): 7,
+        ('mood_entry', 'update'): 2,
+        ('mood_entry', 'delete'): 1,
+    }
+    assert [change['seq'] for change in changes] == sorted(change['seq'] for change in changes)
+    moved = [change for change in changes
+             if change['entity'] == 'task' and change['entity_id'] == team['tasks']['hiring plan']]
+    assert moved[-1]['user_id'] == team['bob']
+
+
+def test_keyset_pages_match_the_full_list(ops, team):
+    for list_tasks, owner in ((ops.get_user_tasks, team['ann']), (ops.get_team_tasks, team['team_id'])):
+        everything = list_tasks(owner)
+        pages, after = [], None
+        while True:
+            page = list_tasks(owner, page_size=2, after=after)
+            if not page:
+                break
+            pages.extend(page)
+            after = task_cursor(page[-1])
+        assert [task['id'] for task in pages] == [task['id'] for task in everything]
+
+
+def test_search_follows_edits_and_deletes(ops, team):
+    def task_hits(query, **owner):
+        return {result['id'] for result in ops.search(query, kinds=('task',), **owner)}
+
+    assert task_hits('staffing', user_id=team['bob']) == {team['tasks']['hiring plan']}
+    assert task_hits('hiring', user_id=team['bob']) == set()
+    assert task_hits('staffing', user_id=team['ann']) == set()
+    assert task_hits('garden', user_id=team['cy']) == set()
+    assert task_hits('review', team_id=team['team_id']) == {team['tasks']['budget review']}
+
+    notes = {result['id'] for result in ops.search('roadmap', user_id=team['bob'])}
+    assert notes == {team['entries'][4]}
@@ -0,0 +1,22 @@
+from utils.lexicon_matcher import LexiconMatcher
+
+
+def test_matches_phrases_and_overlaps_in_one_pass():
+    matcher = LexiconMatcher([
+        ('behind schedule', 'stress'), ('schedule', 'plan'), ('on fire', 'positive'),
+    ])
+
+    hits = matcher.count('we are behind schedule but on fire'.split())
+
+    assert hits == {'stress': 1, 'plan': 1, 'positive': 1}
+
+
+def test_duplicate_entries_count_once():
+    matcher = LexiconMatcher([
+        ('tired', 'stress'), ('Tired', 'stress'), ('behind  schedule', 'stress'),
+        ('behind schedule', 'stress'), ('tired', 'negative'),
+    ])
+
+    hits = matcher.count('tired and behind schedule'.split())
+
+    assert hits == {'stress': 2, 'negative': 1}
@@ -0,0 +1,32 @@
+import pytest
+
+from database import operations
+
+
+@pytest.fixture
+def notes(database, ops):
+    user_id = database.create_user('ann', 'ann@x', 'secret1')
+    ids = [ops.create_mood_entry(user_id, text_entry=text) for text in [
+        'today was fine',
+        'today the deadline moved, deadline stress all day',
+        'quiet today',
+        'today I shipped the release',
+    ]]
+    return user_id, ids
+
+
+def _search(ops, user_id, query):
+    return [(result['id'], result['score']) for result in ops.search(query, user_id=user_id, kinds=('mood',))]
+
+
+def test_common_words_filter_without_ranking(monkeypatch, ops, notes):
+    user_id, ids = notes
+    ranked = _search(ops, user_id, 'today deadline')
+
+    monkeypatch.setattr(operations, 'SEARCH_COMMON_MIN_ROWS', 0)
+    # "today" is in every note: it still has to match, newest first
+    assert _search(ops, user_id, 'today') == [(entry_id, 0.0) for entry_id in reversed(ids)]
+    (release, score), = _search(ops, user_id, 'release')
+    assert _search(ops, user_id, 'TODAY release') == [(release, pytest.approx(score))]
+    # bm25 gives "today" no weight, so leaving it out of the ranking changes nothing
+    assert _search(ops, user_id, 'today deadline') == [(ids[1], pytest.approx(ranked[0][1], abs=1e-4))]
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('vaderSentiment')
+pytest.importorskip('textblob')
+
+from utils.sentiment_analyzer import TextSentimentAnalyzer
+from utils.sentiment_cache import SentimentCache
+
+
+@pytest.fixture
+def analyzer():
+    # Memory-only cache, whatever TEAM_OPTIMIZER_SENTIMENT_CACHE says
+    return TextSentimentAnalyzer(cache=SentimentCache('test', path=None),
+                                 lexicon_source=lambda team_id: [])
+
+
+def test_keywords_next_to_punctuation_count(analyzer):
+    # A whitespace split would see 'deadline,' and 'overwhelmed!' and miss both
+    text = "I am so stressed about the deadline, overwhelmed!"
+
+    assert analyzer.calculate_stress_level(text, 5) == 6.5
+    assert 'deadline' in analyzer.analyze_sentiment(text)['keywords']
+
+
+def test_emotions_next_to_punctuation_count(analyzer):
+    result = analyzer.analyze_sentiment("Stuck on a blocked issue. Worried.")
+
+    assert 'anxious' in result['emotions']
+
+
+def test_analyze_matches_separate_calls(analyzer):
+    text = "Great progress today but the release is behind schedule"
+    result = analyzer.analyze(text)
+    stress = result.pop('stress')
+
+    assert result == analyzer.analyze_sentiment(text)
+    assert stress == analyzer.calculate_stress_level(text, result['score'])
+
+
+def test_team_phrase_already_built_in_counts_once(analyzer):
+    text = "So stressed out"
+    team = TextSentimentAnalyzer(cache=SentimentCache('test', path=None),
+                                 lexicon_source=lambda team_id: [('stressed', 'stress')])
+
+    assert team.analyze(text, team_id=1) == analyzer.analyze(text)
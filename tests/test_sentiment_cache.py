@@ -0,0 +1,51 @@
+import sqlite3
+
+from utils.sentiment_cache import DISK_BATCH_SIZE, SentimentCache
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SentimentCache('v1', path=path)
+    cache.put('quick mood entry', {'score': 6.0})
+    cache.flush()
+
+    reopened = SentimentCache('v1', path=path)
+    assert reopened.get('quick mood entry') == {'score': 6.0}
+    assert reopened.stats()['disk_hits'] == 1
+
+    # A new analyzer version never sees the old results
+    assert SentimentCache('v2', path=path).get('quick mood entry') is None
+
+
+def test_writes_are_batched(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SentimentCache('v1', path=path)
+    cache.get('warm up')  # opens the file
+
+    for i in range(DISK_BATCH_SIZE - 1):
+        cache.put(f'note {i}', {'score': i})
+    on_disk = sqlite3.connect(path).execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0]
+    assert on_disk == 0
+
+    cache.put('one more', {'score': 0})
+    on_disk = sqlite3.connect(path).execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0]
+    assert on_disk == DISK_BATCH_SIZE
+
+
+def test_locked_disk_tier_is_a_miss_not_an_error(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SentimentCache('v1', path=path).get('create the file')
+
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute('BEGIN EXCLUSIVE')
+    try:
+        cache = SentimentCache('v1', path=path, busy_timeout_ms=50)
+        assert cache.get('tired') is None
+        cache.put('tired', {'score': 3.0})
+        cache.flush()
+
+        assert cache.get('tired') == {'score': 3.0}  # still served from memory
+        assert cache.stats()['disk_errors'] >= 2
+    finally:
+        holder.rollback()
+        holder.close()
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from database.connection import ConnectionPool
+from database.migrations import MIGRATIONS, migrate
+from database.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'snapshot.db'))
+    yield pool
+    pool.close_all()
+
+
+def test_export_nulls_non_integer_foreign_keys(pool, tmp_path):
+    # Rows written before the later migrations: team_id holding '' or a team
+    # name, fractional stress levels
+    with pool.connection() as conn:
+        migrate(conn, MIGRATIONS[:1])
+        conn.execute("INSERT INTO teams (name, created_by) VALUES ('Core', 1)")
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, team_id) VALUES (?, ?, 'x', ?)",
+            [('ann', 'ann@x', 1), ('bob', 'bob@x', ''), ('cy', 'cy@x', 'Arg1')]
+        )
+        conn.execute("INSERT INTO tasks (title, assigned_to) VALUES ('t', '')")
+        conn.execute("INSERT INTO mood_entries (user_id, combined_score, stress_level) VALUES (1, 6.0, 6.5)")
+        conn.commit()
+        migrate(conn)
+
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    tables = store.export(pool)
+
+    assert tables['users'] == {'rows': 3}
+    users = store.read('users').sort_values('id')
+    assert users['team_id'].isna().tolist() == [False, True, True]
+    assert store.read('tasks')['assigned_to'].isna().all()
+    assert store.read('mood_entries')['stress_level'].tolist() == [6.5]
+
+
+def test_schema_change_forces_full_export(pool, tmp_path):
+    with pool.connection() as conn:
+        migrate(conn)
+        conn.execute("INSERT INTO mood_entries (user_id, combined_score, stress_level) VALUES (1, 5.0, 4)")
+
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    store.export(pool)
+    manifest = store.manifest()
+    manifest['version'] = 1
+    store._save_manifest(manifest)
+
+    assert store.export(pool)['mood_entries'] == {'watermark': 1, 'rows': 1}
@@ -0,0 +1,45 @@
+from database.connection import ConnectionPool
+from database.migrations import MIGRATIONS, _add_task_deletions, migrate
+
+
+def _completed(ops, user_id):
+    return ops.get_task_flow(user_id)['completed']
+
+
+def test_deleting_a_completed_task_takes_it_out_of_the_flow(database, ops):
+    user_id = database.create_user('ann', 'ann@x', 'secret1')
+    done = ops.create_task('done', '', assigned_to=user_id)
+    open_task = ops.create_task('open', '', assigned_to=user_id)
+    ops.update_task_status(done, 'completed')
+    ops.update_task_status(open_task, 'in_progress')
+    assert _completed(ops, user_id) == 1
+
+    ops.delete_task(open_task)
+    assert _completed(ops, user_id) == 1
+
+    ops.delete_task(done)
+    assert _completed(ops, user_id) == 0
+    with database.connection() as conn:
+        events = conn.execute(
+            "SELECT from_status, to_status FROM task_events WHERE task_id = ? ORDER BY id", (done,)
+        ).fetchall()
+    assert events[-1] == ('completed', 'deleted')
+
+
+def test_migration_closes_tasks_deleted_before_it(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'flow.db'))
+    with pool.connection() as conn:
+        migrate(conn, [step for step in MIGRATIONS if step[0] < 14])
+        conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('ann', 'ann@x', 'x')")
+        conn.execute("INSERT INTO tasks (title, assigned_to) VALUES ('done', 1)")
+        conn.execute("UPDATE tasks SET status = 'completed'")
+        conn.execute("DELETE FROM tasks")
+        conn.commit()
+        assert conn.execute("SELECT SUM(completed) FROM task_flow_weekly").fetchone() == (1,)
+
+        migrate(conn)
+        assert conn.execute("SELECT SUM(completed) FROM task_flow_weekly").fetchone() == (0,)
+        # Already closed: running the step again subtracts nothing
+        _add_task_deletions(conn)
+        assert conn.execute("SELECT SUM(completed) FROM task_flow_weekly").fetchone() == (0,)
+    pool.close_all()
@@ -8,9 +8,11 @@ class FusionEngine:
         self.text_weight = 0.6  # Weight for text analysis
         self.visual_weight = 0.4  # Weight for visual analysis
     
-    def analyze_combined(self, text_input=None, image_file=None, manual_mood=None, manual_stress=None):
+    def analyze_combined(self, text_input=None, image_file=None, manual_mood=None, manual_stress=None,
+                         team_id=None):
         """
-        Combine text and visual analysis for comprehensive mood assessment
+        Combine text and visual analysis for comprehensive mood assessment.
+        Text is matched against the team's vocabulary when team_id is given.
         """
         results = {
             'text_analysis': None,
@@ -24,16 +26,8 @@ class FusionEngine:
         
         # Analyze text if provided
         if text_input:
-            text_result = text_analyzer.analyze_sentiment(text_input)
-            results['text_analysis'] = text_result
-            
-            # Calculate stress from text
-            text_stress = text_analyzer.calculate_stress_level(
-                text_input, 
-                text_result['score']
-            )
-            
-            results['text_analysis']['stress'] = text_stress
+            # Sentiment and stress from text, in one pass
+            results['text_analysis'] = text_analyzer.analyze(text_input, team_id=team_id)
         
         # Analyze image if provided
         if image_file:
@@ -0,0 +1,75 @@
+"""Multi-word lexicon matching in one pass over a note's words.
+
+Lexicon entries are phrases of one or more words ("tired", "behind
+schedule", "on fire"), each counting towards a category. LexiconMatcher
+compiles them into an Aho-Corasick automaton whose transitions are whole
+words, so a list of words is matched against every entry in a single
+left-to-right walk, however many entries there are. Overlapping matches
+all count: "behind schedule" hits both that phrase and "schedule" if both
+are entries.
+"""
+from collections import Counter, deque
+import re
+
+# Same cleaning and word split as TextSentimentAnalyzer applies to notes, so
+# "don't" in a phrase matches "dont" in a cleaned note
+PHRASE_DROP_PATTERN = re.compile(r'[^a-z\s.,!?]')
+PHRASE_WORD_PATTERN = re.compile(r'[a-z]+')
+
+
+def phrase_words(phrase):
+    """A phrase as the lowercase words the analyzer tokenizes notes into"""
+    return tuple(PHRASE_WORD_PATTERN.findall(PHRASE_DROP_PATTERN.sub('', phrase.lower())))
+
+
+class LexiconMatcher:
+    def __init__(self, entries):
+        """entries: (phrase, category) pairs; a phrase may appear under several categories"""
+        self._goto = [{}]      # node -> {word: next node}
+        self._fail = [0]
+
+        outputs = [[]]         # node -> categories of every entry ending here
+        # An entry listed twice (a team phrase the built-in lexicon already has)
+        # must still count once per match
+        unique = dict.fromkeys((phrase_words(phrase), category) for phrase, category in entries)
+        for words, category in unique:
+            if not words:
+                continue
+            node = 0
+            for word in words:
+                if word not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                    self._goto[node][word] = len(self._goto) - 1
+                node = self._goto[node][word]
+            outputs[node].append(category)
+
+        self._output = self._link(outputs)
+
+    def _link(self, outputs):
+        """Breadth-first failure links; each node also emits what its failure node emits"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                outputs[child] = outputs[child] + outputs[self._fail[child]]
+                queue.append(child)
+        return [tuple(categories) for categories in outputs]
+
+    def count(self, words):
+        """Category -> number of entry matches in the word sequence"""
+        goto, fail, output = self._goto, self._fail, self._output
+        hits = Counter()
+        node = 0
+        for word in words:
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for category in output[node]:
+                hits[category] += 1
+        return hits
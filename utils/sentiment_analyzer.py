@@ -1,33 +1,98 @@
-import nltk
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from collections import Counter
+import hashlib
+import json
+from itertools import chain, islice
+import multiprocessing
+import multiprocessing.util
+import os
 import re
+import threading
 
-# Download NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    try:
-        nltk.download('punkt')
-        nltk.download('averaged_perceptron_tagger')
-    except:
-        print("NLTK download may require additional setup")
+from .lexicon_matcher import LexiconMatcher
+from .sentiment_cache import SentimentCache
+
+# NLTK data TextBlob's tokenizer and tagger use; reported by missing_corpora(),
+# never downloaded while the app is starting
+NLTK_CORPORA = {
+    'tokenizers/punkt': 'punkt',
+    'taggers/averaged_perceptron_tagger': 'averaged_perceptron_tagger'
+}
+
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+')
+# Special characters and numbers (basic punctuation is kept)
+NON_TEXT_PATTERN = re.compile(r'[^a-zA-Z\s.,!?]')
+WORD_PATTERN = re.compile(r'[a-z]+')
+
+STOP_WORDS = frozenset({
+    'i', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will',
+    'would', 'should', 'could', 'can', 'may', 'might',
+    'the', 'a', 'an', 'and', 'but', 'or', 'for', 'nor',
+    'on', 'at', 'by', 'to', 'in', 'of', 'with', 'about'
+})
+
+EMOTION_KEYWORDS = {
+    'happy': ['happy', 'joy', 'excited', 'great', 'good'],
+    'stressed': ['stress', 'stressed', 'pressure', 'busy'],
+    'tired': ['tired', 'exhausted', 'fatigued', 'sleepy'],
+    'anxious': ['anxious', 'worried', 'nervous', 'concerned'],
+    'frustrated': ['frustrated', 'annoyed', 'angry', 'mad'],
+    'productive': ['productive', 'focused', 'efficient', 'progress'],
+    'motivated': ['motivated', 'energized', 'inspired', 'determined'],
+    'neutral': ['okay', 'fine', 'alright', 'normal']
+}
+
+# Words that raise calculate_stress_level above the mood-derived baseline
+STRESS_LEVEL_KEYWORDS = ['stress', 'stressed', 'pressure', 'deadline', 'rush',
+                         'overwhelmed', 'burnout', 'anxious', 'worried', 'behind schedule']
+
+# Categories a team vocabulary entry counts towards; team stress phrases
+# raise the stress level as well as lowering the keyword score
+TEAM_LEXICON_CATEGORIES = {
+    'positive': ('positive',),
+    'negative': ('negative',),
+    'stress': ('stress', 'stress_level')
+}
+
+MAX_EMOTIONS = 3
+MAX_KEYWORDS = 5
+
+# Share of each method in the combined 1-10 score
+TEXTBLOB_WEIGHT = 0.4
+VADER_WEIGHT = 0.4
+KEYWORD_WEIGHT = 0.2
+
+# Bump when scoring code changes in a way the lexicon and weights don't show;
+# either change gives cached results a new key.
+# 2: words are split on punctuation, so "deadline," counts as "deadline"
+ANALYZER_VERSION = 2
+
+# analyze_batch stays in-process below this many texts; a worker pool costs
+# more to start than it saves on a few hundred entries
+SERIAL_BATCH_SIZE = 500
+BATCH_CHUNKSIZE = 64
 
 class TextSentimentAnalyzer:
-    def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
-        
-        # Keywords for stress detection
+    def __init__(self, cache=None, lexicon_source=None):
+        # VADER and TextBlob are loaded by _models() on first use or by warm_up()
+        self._vader = None
+        self._polarity = None
+        self._models_lock = threading.Lock()
+        self._warm_up_thread = None
+        
+        # Keywords and phrases for stress detection
         self.stress_keywords = [
             'stress', 'stressed', 'overwhelmed', 'busy', 'tired', 'exhausted',
             'anxious', 'worried', 'pressure', 'deadline', 'rush', 'hectic',
-            'burnout', 'drained', 'fatigued', 'swamped', 'crazy', 'insane'
+            'burnout', 'drained', 'fatigued', 'swamped', 'crazy', 'insane',
+            'behind schedule', 'running late'
         ]
         
         self.positive_keywords = [
             'happy', 'great', 'good', 'excellent', 'awesome', 'fantastic',
             'productive', 'progress', 'achieved', 'completed', 'success',
-            'excited', 'motivated', 'energized', 'optimistic', 'positive'
+            'excited', 'motivated', 'energized', 'optimistic', 'positive',
+            'on fire', 'on track', 'ahead of schedule'
         ]
         
         self.negative_keywords = [
@@ -35,84 +100,216 @@ class TextSentimentAnalyzer:
             'angry', 'frustrated', 'annoyed', 'disappointed', 'failure',
             'stuck', 'blocked', 'problem', 'issue', 'difficult', 'hard'
         ]
+        
+        self.lexicon = self._build_lexicon()
+        self.matcher = LexiconMatcher(self.lexicon)
+        self.version = self._version()
+        self.cache = cache or SentimentCache(self.version)
+        
+        # team_id -> [(phrase, category)] of the team's own vocabulary
+        self.lexicon_source = lexicon_source or _team_lexicon
+        self._team_matchers = {}  # team_id -> (entries, matcher, cache variant)
+    
+    def _models(self):
+        """(TextBlob pattern analyzer, VADER), loaded once"""
+        if self._vader is None:
+            with self._models_lock:
+                if self._vader is None:
+                    from textblob.sentiments import PatternAnalyzer
+                    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                    
+                    self._polarity = PatternAnalyzer()  # what TextBlob(text).sentiment uses
+                    self._vader = SentimentIntensityAnalyzer()
+        return self._polarity, self._vader
+    
+    def warm_up(self, background=True):
+        """Load the models now, by default on a daemon thread so startup doesn't wait.
+        
+        Safe to call on every Streamlit rerun: only the first call starts a thread.
+        """
+        def load():
+            try:
+                self._models()
+            except Exception as e:
+                print(f"Sentiment models could not be loaded: {e}")
+            missing = missing_corpora()
+            if missing:
+                print("NLTK data missing: " + ", ".join(missing) +
+                      " (install with: python -m textblob.download_corpora)")
+        
+        if not background:
+            load()
+            return None
+        
+        with self._models_lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=load, name='sentiment-warm-up', daemon=True)
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+    
+    def _build_lexicon(self):
+        """(phrase, category) pairs of the built-in lexicon"""
+        categories = {
+            'positive': self.positive_keywords,
+            'negative': self.negative_keywords,
+            'stress': self.stress_keywords,
+            'stress_level': STRESS_LEVEL_KEYWORDS
+        }
+        categories.update({f'emotion:{emotion}': words for emotion, words in EMOTION_KEYWORDS.items()})
+        
+        return tuple((phrase, category) for category, phrases in categories.items()
+                     for phrase in phrases)
+    
+    def _matcher_for(self, team_id):
+        """(matcher, cache variant) for a team; compiled again only when its vocabulary changes"""
+        if team_id is None:
+            return self.matcher, ''
+        
+        entries = tuple(tuple(entry) for entry in self.lexicon_source(team_id))
+        if not entries:
+            return self.matcher, ''
+        
+        compiled = self._team_matchers.get(team_id)
+        if compiled is None or compiled[0] != entries:
+            variant = hashlib.sha256(json.dumps(entries).encode('utf-8')).hexdigest()[:16]
+            team_entries = tuple((phrase, counted) for phrase, category in entries
+                                 for counted in TEAM_LEXICON_CATEGORIES.get(category, ()))
+            compiled = (entries, LexiconMatcher(self.lexicon + team_entries), variant)
+            self._team_matchers[team_id] = compiled
+        return compiled[1], compiled[2]
+    
+    def _version(self):
+        """Fingerprint of everything that decides a result, for cache keys"""
+        fingerprint = json.dumps({
+            'code': ANALYZER_VERSION,
+            'lexicon': sorted(self.lexicon),
+            'stop_words': sorted(STOP_WORDS),
+            'weights': [TEXTBLOB_WEIGHT, VADER_WEIGHT, KEYWORD_WEIGHT],
+            'limits': [MAX_EMOTIONS, MAX_KEYWORDS]
+        })
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]
     
     def clean_text(self, text):
         """Clean and preprocess text"""
         if not text:
             return ""
         
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text)
-        
-        # Remove special characters and numbers (keep basic punctuation)
-        text = re.sub(r'[^a-zA-Z\s.,!?]', '', text)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text
+        text = URL_PATTERN.sub('', text.lower())
+        text = NON_TEXT_PATTERN.sub('', text)
+        return ' '.join(text.split())
     
-    def analyze_sentiment(self, text):
-        """Analyze sentiment using multiple methods"""
+    def _tokenize(self, cleaned_text, matcher):
+        """Word counts and per-category phrase hit counts from one pass over the words"""
+        tokens = WORD_PATTERN.findall(cleaned_text)
+        return Counter(tokens), matcher.count(tokens)
+    
+    def analyze(self, text, mood_score=None, team_id=None):
+        """analyze_sentiment plus the calculate_stress_level result under 'stress'.
+        
+        The text is cleaned, tokenized and scored once; stress is derived from
+        mood_score if given, otherwise from the sentiment score. With a team_id
+        the team's own vocabulary is matched alongside the built-in lexicon.
+        """
         if not text or len(text.strip()) < 3:
-            return {
+            result = {
                 'score': 5.0,
                 'label': 'neutral',
                 'confidence': 0.0,
                 'keywords': [],
                 'emotions': []
             }
+            stress_hits = 0
+        else:
+            cleaned_text = self.clean_text(text)
+            matcher, variant = self._matcher_for(team_id)
+            cached = self.cache.get(cleaned_text, variant)
+            if cached:
+                result, stress_hits = cached['result'], cached['stress_hits']
+            else:
+                words, hits = self._tokenize(cleaned_text, matcher)
+                result = self._score(cleaned_text, words, hits)
+                stress_hits = hits['stress_level']
+                self.cache.put(cleaned_text, {'result': result, 'stress_hits': stress_hits}, variant)
         
-        cleaned_text = self.clean_text(text)
+        if not text:
+            result['stress'] = 5
+        else:
+            score = result['score'] if mood_score is None else mood_score
+            result['stress'] = self._stress_level(stress_hits, score)
+        return result
+    
+    def analyze_sentiment(self, text, team_id=None):
+        """Analyze sentiment using multiple methods"""
+        result = self.analyze(text, team_id=team_id)
+        del result['stress']
+        return result
+    
+    def analyze_batch(self, texts, workers=None, chunksize=BATCH_CHUNKSIZE, team_id=None):
+        """analyze_sentiment over many texts, yielded in input order.
+        
+        Batches of up to SERIAL_BATCH_SIZE texts, or workers <= 1, run in this
+        process. Larger ones are spread over a pool of `workers` processes
+        (default: one per CPU) that each build their own analyzer once, sent in
+        chunks of `chunksize` texts. Stopping iteration early shuts the pool down.
+        """
+        texts = iter(texts)
+        head = list(islice(texts, SERIAL_BATCH_SIZE + 1))
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        if workers <= 1 or len(head) <= SERIAL_BATCH_SIZE:
+            for text in chain(head, texts):
+                yield self.analyze_sentiment(text, team_id)
+            return
+        
+        # Workers get the team's vocabulary up front rather than each reading the database
+        team_lexicon = list(self.lexicon_source(team_id)) if team_id is not None else []
+        with multiprocessing.Pool(workers, initializer=_init_batch_worker,
+                                  initargs=(team_id, team_lexicon)) as pool:
+            yield from pool.imap(_analyze_in_worker, chain(head, texts), chunksize)
+            # Let workers exit normally so they flush their cache writes
+            pool.close()
+            pool.join()
+    
+    def _score(self, cleaned_text, words, hits):
+        polarity_analyzer, vader = self._models()
         
-        # 1. TextBlob Analysis
+        # 1. TextBlob (pattern) polarity, computed once for the score and the emotions
         try:
-            blob = TextBlob(cleaned_text)
-            blob_polarity = blob.sentiment.polarity  # -1 to 1
-            blob_subjectivity = blob.sentiment.subjectivity  # 0 to 1
+            blob_polarity, blob_subjectivity = polarity_analyzer.analyze(cleaned_text)  # -1 to 1, 0 to 1
         except:
             blob_polarity = 0
             blob_subjectivity = 0
         
         # 2. VADER Analysis
         try:
-            vader_scores = self.vader.polarity_scores(cleaned_text)
-            vader_compound = vader_scores['compound']  # -1 to 1
+            vader_compound = vader.polarity_scores(cleaned_text)['compound']  # -1 to 1
         except:
             vader_compound = 0
         
         # 3. Keyword Analysis
-        keyword_score = self._keyword_analysis(cleaned_text)
+        keyword_score = self._keyword_analysis(hits)
         
         # Combine scores (weighted average)
-        # TextBlob: 40%, VADER: 40%, Keywords: 20%
+        # TextBlob: 40%, VADER: 40%, Keywords: 20% by default
         combined_score = (
-            (blob_polarity + 1) * 5 * 0.4 +  # Convert -1:1 to 0:10 scale
-            (vader_compound + 1) * 5 * 0.4 +  # Convert -1:1 to 0:10 scale
-            keyword_score * 0.2
+            (blob_polarity + 1) * 5 * TEXTBLOB_WEIGHT +  # Convert -1:1 to 0:10 scale
+            (vader_compound + 1) * 5 * VADER_WEIGHT +  # Convert -1:1 to 0:10 scale
+            keyword_score * KEYWORD_WEIGHT
         )
         
         # Ensure score is between 1-10
         combined_score = max(1, min(10, combined_score))
         
-        # Detect emotions
-        emotions = self._detect_emotions(cleaned_text)
-        
-        # Get sentiment label
-        label = self._get_sentiment_label(combined_score)
-        
         # Calculate confidence
         confidence = (abs(blob_polarity) + abs(vader_compound)) / 2
         
         return {
             'score': round(combined_score, 1),
-            'label': label,
+            'label': self._get_sentiment_label(combined_score),
             'confidence': round(confidence, 2),
-            'keywords': self._extract_keywords(cleaned_text),
-            'emotions': emotions,
+            'keywords': self._extract_keywords(words),
+            'emotions': self._detect_emotions(hits, blob_polarity),
             'raw_scores': {
                 'textblob': blob_polarity,
                 'vader': vader_compound,
@@ -120,13 +317,11 @@ class TextSentimentAnalyzer:
             }
         }
     
-    def _keyword_analysis(self, text):
-        """Analyze text for stress/positive/negative keywords"""
-        words = text.split()
-        
-        positive_count = sum(1 for word in words if word in self.positive_keywords)
-        negative_count = sum(1 for word in words if word in self.negative_keywords)
-        stress_count = sum(1 for word in words if word in self.stress_keywords)
+    def _keyword_analysis(self, hits):
+        """Score stress/positive/negative keyword hits"""
+        positive_count = hits['positive']
+        negative_count = hits['negative']
+        stress_count = hits['stress']
         
         total_keywords = positive_count + negative_count + stress_count
         
@@ -147,60 +342,25 @@ class TextSentimentAnalyzer:
         
         return max(1, min(10, score))
     
-    def _detect_emotions(self, text):
-        """Detect emotions from text"""
-        emotions = []
-        words = text.split()
-        
-        emotion_map = {
-            'happy': ['happy', 'joy', 'excited', 'great', 'good'],
-            'stressed': ['stress', 'stressed', 'pressure', 'busy'],
-            'tired': ['tired', 'exhausted', 'fatigued', 'sleepy'],
-            'anxious': ['anxious', 'worried', 'nervous', 'concerned'],
-            'frustrated': ['frustrated', 'annoyed', 'angry', 'mad'],
-            'productive': ['productive', 'focused', 'efficient', 'progress'],
-            'motivated': ['motivated', 'energized', 'inspired', 'determined'],
-            'neutral': ['okay', 'fine', 'alright', 'normal']
-        }
-        
-        for emotion, keywords in emotion_map.items():
-            if any(keyword in words for keyword in keywords):
-                emotions.append(emotion)
+    def _detect_emotions(self, hits, polarity):
+        """Emotions with a keyword hit, else one inferred from the polarity"""
+        emotions = [emotion for emotion in EMOTION_KEYWORDS if hits[f'emotion:{emotion}']]
         
-        # If no emotions detected, try to infer from sentiment
         if not emotions:
-            try:
-                blob = TextBlob(text)
-                if blob.sentiment.polarity > 0.3:
-                    emotions.append('positive')
-                elif blob.sentiment.polarity < -0.3:
-                    emotions.append('negative')
-                else:
-                    emotions.append('neutral')
-            except:
+            if polarity > 0.3:
+                emotions.append('positive')
+            elif polarity < -0.3:
+                emotions.append('negative')
+            else:
                 emotions.append('neutral')
         
-        return list(set(emotions))[:3]  # Return max 3 unique emotions
+        return emotions[:MAX_EMOTIONS]
     
-    def _extract_keywords(self, text):
-        """Extract important keywords from text"""
-        words = text.split()
-        
-        # Filter out common stop words
-        stop_words = {'i', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
-                     'have', 'has', 'had', 'do', 'does', 'did', 'will',
-                     'would', 'should', 'could', 'can', 'may', 'might',
-                     'the', 'a', 'an', 'and', 'but', 'or', 'for', 'nor',
-                     'on', 'at', 'by', 'to', 'in', 'of', 'with', 'about'}
-        
-        keywords = [word for word in words if word not in stop_words and len(word) > 2]
-        
-        # Count frequency and get top 5
-        from collections import Counter
-        word_counts = Counter(keywords)
-        top_keywords = [word for word, count in word_counts.most_common(5)]
-        
-        return top_keywords
+    def _extract_keywords(self, words):
+        """Most frequent words that are not stop words"""
+        keywords = Counter({word: count for word, count in words.items()
+                            if word not in STOP_WORDS and len(word) > 2})
+        return [word for word, count in keywords.most_common(MAX_KEYWORDS)]
     
     def _get_sentiment_label(self, score):
         """Convert score to sentiment label"""
@@ -215,23 +375,10 @@ class TextSentimentAnalyzer:
         else:
             return "very negative"
     
-    def calculate_stress_level(self, text, mood_score):
-        """Calculate stress level from text and mood"""
-        if not text:
-            return 5
-        
-        cleaned_text = self.clean_text(text)
-        
+    def _stress_level(self, stress_word_count, mood_score):
         # Base stress from mood (inverse relationship)
         stress_from_mood = max(1, 10 - mood_score)
         
-        # Stress from keywords
-        stress_words = ['stress', 'stressed', 'pressure', 'deadline', 'rush', 
-                       'overwhelmed', 'burnout', 'anxious', 'worried']
-        
-        words = cleaned_text.split()
-        stress_word_count = sum(1 for word in words if word in stress_words)
-        
         # Adjust stress based on keywords
         if stress_word_count > 0:
             stress_level = min(10, stress_from_mood + (stress_word_count * 0.5))
@@ -239,6 +386,55 @@ class TextSentimentAnalyzer:
             stress_level = stress_from_mood
         
         return round(stress_level, 1)
+    
+    def calculate_stress_level(self, text, mood_score, team_id=None):
+        """Calculate stress level from text and mood"""
+        if not text:
+            return 5
+        
+        cleaned_text = self.clean_text(text)
+        matcher, variant = self._matcher_for(team_id)
+        cached = self.cache.get(cleaned_text, variant)
+        if cached:
+            stress_word_count = cached['stress_hits']
+        else:
+            _, hits = self._tokenize(cleaned_text, matcher)
+            stress_word_count = hits['stress_level']
+        return self._stress_level(stress_word_count, mood_score)
+
+def missing_corpora():
+    """Names of NLTK_CORPORA that are not installed"""
+    try:
+        import nltk
+    except ImportError:
+        return list(NLTK_CORPORA.values())
+    
+    missing = []
+    for path, name in NLTK_CORPORA.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+def _team_lexicon(team_id):
+    # Imported here so loading the analyzer doesn't open the database
+    from database.operations import db_ops
+    return db_ops.get_team_lexicon(team_id)
+
+# Per-process analyzer for analyze_batch workers
+_worker_analyzer = None
+_worker_team_id = None
+
+def _init_batch_worker(team_id, team_lexicon):
+    global _worker_analyzer, _worker_team_id
+    _worker_analyzer = TextSentimentAnalyzer(lexicon_source=lambda _: team_lexicon)
+    _worker_analyzer._models()
+    _worker_team_id = team_id
+    multiprocessing.util.Finalize(_worker_analyzer, _worker_analyzer.cache.flush, exitpriority=10)
+
+def _analyze_in_worker(text):
+    return _worker_analyzer.analyze_sentiment(text, _worker_team_id)
 
 # Create singleton instance
-text_analyzer = TextSentimentAnalyzer()
\ No newline at end of file
+text_analyzer = TextSentimentAnalyzer()
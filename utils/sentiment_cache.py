@@ -0,0 +1,187 @@
+"""Memoized text sentiment results, keyed by content.
+
+Entries are keyed by a hash of the analyzer version, the team vocabulary in
+use (if any) and the cleaned text, so "Quick mood entry" and
+" quick  MOOD entry " share one entry, and any change to the lexicon or
+weights (which changes the version) misses every old one.
+The in-memory tier is an LRU bounded by the approximate size of the stored
+results; an optional SQLite file keeps results across restarts:
+
+    TEAM_OPTIMIZER_SENTIMENT_CACHE=sentiment_cache.db streamlit run app.py
+
+The file is shared by every process (analyze_batch workers included), so it
+runs in WAL mode and new results are written in batches. A file that stays
+locked past the busy timeout only costs cache misses and skipped writes.
+"""
+import atexit
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAX_BYTES = int(os.environ.get('TEAM_OPTIMIZER_SENTIMENT_CACHE_BYTES', str(16 * 1024 * 1024)))
+CACHE_PATH = os.environ.get('TEAM_OPTIMIZER_SENTIMENT_CACHE') or None
+DISK_BUSY_TIMEOUT_MS = 2000
+# New results are written once this many are pending or this long has passed
+DISK_BATCH_SIZE = 64
+DISK_FLUSH_SECONDS = 2.0
+
+
+class SentimentCache:
+    def __init__(self, version, max_bytes=CACHE_MAX_BYTES, path=CACHE_PATH,
+                 busy_timeout_ms=DISK_BUSY_TIMEOUT_MS):
+        self.version = version
+        self.max_bytes = max_bytes
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._entries = OrderedDict()  # key -> (size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending = []             # (key, encoded value) not yet on disk
+        self._flushed_at = time.monotonic()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+        if path:
+            atexit.register(self.flush)
+
+    def key(self, cleaned_text, variant=''):
+        """variant separates results for the same text under different team vocabularies"""
+        digest = hashlib.sha256(f'{self.version}\0{variant}\0{cleaned_text}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, cleaned_text, variant=''):
+        """The stored value for this text, or None"""
+        key = self.key(cleaned_text, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+            row = self._disk_read(key)
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            value = json.loads(row[0])
+            self._store(key, value, len(row[0]))
+            return copy.deepcopy(value)
+
+    def put(self, cleaned_text, value, variant=''):
+        key = self.key(cleaned_text, variant)
+        encoded = json.dumps(value)
+
+        with self._lock:
+            self._store(key, copy.deepcopy(value), len(encoded))
+            if self.path:
+                self._pending.append((key, encoded))
+                if (len(self._pending) >= DISK_BATCH_SIZE or
+                        time.monotonic() - self._flushed_at >= DISK_FLUSH_SECONDS):
+                    self._flush()
+
+    def flush(self):
+        """Write pending results to the disk tier"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flushed_at = time.monotonic()
+        if not pending:
+            return
+
+        now = int(time.time())
+        try:
+            conn = self._disk()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, version, value, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(key, self.version, encoded, now) for key, encoded in pending]
+                )
+        except sqlite3.OperationalError:
+            # Locked by another process for too long: these stay memory-only
+            self.disk_errors += 1
+
+    def _disk_read(self, key):
+        if not self.path:
+            return None
+        try:
+            return self._disk().execute(
+                "SELECT value FROM sentiment_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            self.disk_errors += 1
+            return None
+
+    def _store(self, key, value, size):
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= old[0]
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (oldest_size, _) = self._entries.popitem(last=False)
+            self._bytes -= oldest_size
+            self.evictions += 1
+
+    def _disk(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                   check_same_thread=False)
+            try:
+                conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+                conn.execute('PRAGMA journal_mode = WAL')
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+                        "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                        "value TEXT NOT NULL, created_at INTEGER NOT NULL)"
+                    )
+                    # Results from an older lexicon or weights can never hit again
+                    conn.execute("DELETE FROM sentiment_cache WHERE version != ?", (self.version,))
+            except sqlite3.OperationalError:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._pending = []
+            if self.path:
+                with self._disk() as conn:
+                    conn.execute("DELETE FROM sentiment_cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'disk_errors': self.disk_errors,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }